@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Header
+from typing import Optional
 from app.models import (
     AcionarLogInstitucionalActionAPIPayload, LogAcionadoInstitucionalmenteData,
     ActionResponseAPI, LogEvent, TokenData, CurrentUser
@@ -23,7 +24,8 @@ async def action_acionar_log_institucional(
     token_data: TokenData = Depends(),
     current_user: CurrentUser = Depends(),
     log_service: LogService = Depends(get_log_service),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=200)
 ):
     author_id_acionamento = str(current_user.id)
     intent_type_log_acionado_inst = "log_acionado_institucionalmente"
@@ -59,7 +61,7 @@ async def action_acionar_log_institucional(
     )
 
     # 5. Record Event
-    persisted_event = await log_service.record_event(log_event_draft, background_tasks)
+    persisted_event = await log_service.record_event(log_event_draft, background_tasks, idempotency_key=idempotency_key)
     return ActionResponseAPI(
         status="success",
         message=f"Acionamento institucional tipo '{payload.acionamento_type}' para Log '{payload.target_log_id}' registrado. Log do Acionamento: {persisted_event.id}",
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 
 from loguru import logger
@@ -8,6 +8,12 @@ from prometheus_client import Counter
 from app.api.dependencies import get_current_user
 from app.schemas.user import UserOut
 from app.core.db import mongo_connector
+from app.core.indexes import ensure_indexes
+from app.api.timeline import _build_timeline_filter
+from app.utils.cursors import encode_cursor, keyset_filter
+from app.services.name_search import name_match_filter
+from app.services.state_updater import STATE_HANDLER_REGISTRY
+from app.utils.index_manager import explain_find
 
 ADMIN_COUNT = Counter("admin_requests_total", "Total de requisições administrativas", ["route"])
 
@@ -71,4 +77,102 @@ async def admin_stats(
     recent_logs = await db.log_events.count_documents({"timestamp": {"$gte": since}})
 
     logger.info("admin.stats | email=%s | users=%d | logs=%d | days=%d", user.email, total_users, recent_logs, days)
-    return {"total_users": total_users, "recent_logs": recent_logs}
\ No newline at end of file
+    return {"total_users": total_users, "recent_logs": recent_logs}
+
+_TIMELINE_SORT = [("timestamp", -1), ("id", -1)]
+_ORDERS_SORT = [("last_updated_at", -1)]
+
+
+def _explain_query_shapes() -> List[Tuple[str, str, Dict[str, Any], Optional[List[Tuple[str, int]]]]]:
+    """(name, collection, filter, sort) of the queries the read APIs actually issue."""
+    probe = "__explain__"
+    cursor_page = keyset_filter(encode_cursor(datetime.utcnow(), probe))
+    return [
+        ("timeline", "logs", _build_timeline_filter(), _TIMELINE_SORT),
+        ("timeline_by_type", "logs", _build_timeline_filter(event_type=probe), _TIMELINE_SORT),
+        ("timeline_by_author", "logs", _build_timeline_filter(author=probe), _TIMELINE_SORT),
+        ("timeline_by_witness", "logs", _build_timeline_filter(witness=probe), _TIMELINE_SORT),
+        ("timeline_by_type_cursor", "logs", {"$and": [_build_timeline_filter(event_type=probe), cursor_page]}, _TIMELINE_SORT),
+        ("timeline_changes", "logs", {"seq": {"$gt": 0}}, [("seq", 1)]),
+        ("log_by_id", "logs", {"id": probe}, None),
+        ("logs_by_trace", "logs", {"meta.trace_id": probe}, [("timestamp", 1), ("id", 1)]),
+        ("logs_by_conversation", "logs", {"meta.conversation_id": probe}, [("timestamp", 1), ("id", 1)]),
+        ("orders", "current_state_orders", {}, _ORDERS_SORT),
+        ("orders_by_customer", "current_state_orders", {"customer_id": probe}, _ORDERS_SORT),
+        ("orders_by_status", "current_state_orders", {"status": probe}, _ORDERS_SORT),
+        ("orders_by_ref", "current_state_orders", name_match_filter("order_ref", probe), _ORDERS_SORT),
+        ("inventory", "current_state_inventory", {}, [("name", 1)]),
+        ("inventory_by_name", "current_state_inventory", name_match_filter("name", probe), [("name", 1)]),
+        ("inventory_by_name_prefix", "current_state_inventory", name_match_filter("name", probe, "prefix"), [("name", 1)]),
+    ]
+
+@router.get(
+    "/indexes",
+    response_model=Dict[str, List[str]],
+    summary="Estado dos índices em relação ao registro"
+)
+async def admin_indexes(user=Depends(get_current_user)) -> Dict[str, List[str]]:
+    """
+    Compara os índices existentes com o registro declarativo (sem alterar nada):
+    faltando, divergentes, fora do registro e em dia.
+    """
+    ADMIN_COUNT.labels(route="/indexes").inc()
+    if not user.email.endswith("@admin.com"):
+        logger.warning("admin.indexes | denied | email=%s", user.email)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    db = await mongo_connector.get_database()
+    report = await ensure_indexes(db, dry_run=True)
+    return {
+        "missing": report.created,
+        "mismatched": report.mismatched,
+        "unmanaged": report.unmanaged,
+        "up_to_date": report.up_to_date,
+    }
+
+@router.get(
+    "/indexes/explain",
+    response_model=List[Dict[str, Any]],
+    summary="Explain das consultas de timeline e query, apontando COLLSCAN"
+)
+async def admin_indexes_explain(user=Depends(get_current_user)) -> List[Dict[str, Any]]:
+    """
+    Roda `explain` (queryPlanner) sobre os filtros e ordenações usados pelos
+    endpoints de timeline e query e marca os planos com varredura de coleção
+    (`collscan`) ou ordenação em memória (`in_memory_sort`).
+    """
+    ADMIN_COUNT.labels(route="/indexes/explain").inc()
+    if not user.email.endswith("@admin.com"):
+        logger.warning("admin.indexes.explain | denied | email=%s", user.email)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    db = await mongo_connector.get_database()
+    results = []
+    for name, collection_name, query_filter, sort in _explain_query_shapes():
+        explained = await explain_find(db, collection_name, query_filter, sort)
+        explained["query"] = name
+        explained["filter"] = str(explained["filter"])
+        if explained["collscan"]:
+            logger.warning("admin.indexes.explain | COLLSCAN | query=%s | collection=%s", name, collection_name)
+        results.append(explained)
+    return results
+
+@router.get(
+    "/handlers/slowest",
+    response_model=List[Dict[str, Any]],
+    summary="Handlers de estado mais lentos neste processo"
+)
+async def admin_slowest_handlers(
+    user=Depends(get_current_user),
+    limit: int = Query(10, ge=1, le=100),
+) -> List[Dict[str, Any]]:
+    """
+    Latência (média, p95 das últimas execuções, máxima), erros e eventos/s de cada
+    handler do StateUpdaterService que já rodou neste processo, do p95 mais alto
+    para o mais baixo.
+    """
+    ADMIN_COUNT.labels(route="/handlers/slowest").inc()
+    if not user.email.endswith("@admin.com"):
+        logger.warning("admin.handlers.slowest | denied | email=%s", user.email)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return STATE_HANDLER_REGISTRY.slowest(limit)
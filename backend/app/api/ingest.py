@@ -0,0 +1,96 @@
+import logging
+from typing import AsyncIterator, List, Tuple
+
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.settings import settings
+from app.models import LogEvent
+from app.services.log_service import LogService, get_log_service
+from app.utils.auth import CurrentUser, require_role
+from app.utils.ndjson import NDJSONLineTooLong, iter_ndjson_lines
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/ingest", tags=["Ingest"])
+
+
+def _result_line(line_no: int, status: str, **extra) -> bytes:
+    return orjson.dumps({"line": line_no, "status": status, **extra}) + b"\n"
+
+
+async def _record_chunk(
+    log_service: LogService,
+    chunk: List[Tuple[int, LogEvent]],
+    background_tasks: BackgroundTasks,
+) -> Tuple[int, List[bytes]]:
+    """Records one chunk and returns (events created, result lines)."""
+    drafts = [draft for _, draft in chunk]
+    try:
+        errors = await log_service.record_events_chunk(drafts, background_tasks)
+    except Exception as e:
+        logger.exception(f"Bulk ingestion chunk of {len(chunk)} events failed.")
+        return 0, [_result_line(line_no, "failed", error=str(e)) for line_no, _ in chunk]
+    lines = [
+        _result_line(line_no, "created", id=draft.id) if error is None
+        else _result_line(line_no, "failed", id=draft.id, error=error)
+        for (line_no, draft), error in zip(chunk, errors)
+    ]
+    return errors.count(None), lines
+
+
+@router.post(
+    "/logs",
+    dependencies=[Depends(require_role(["admin", "system"]))],
+    summary="Bulk-ingest LogEvent drafts from an NDJSON body",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "One result object per input line"}},
+)
+async def ingest_log_events_ndjson(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    current_user: CurrentUser = Depends(),
+    log_service: LogService = Depends(get_log_service),
+    chunk_size: int = Query(settings.INGEST_CHUNK_SIZE, ge=1, le=5000, description="LogEvents written per chunk."),
+):
+    """
+    Reads one `LogEvent` draft per line, validates each line as it arrives and
+    records valid drafts in chunks of `chunk_size` through `LogService`.
+    The response streams back one JSON object per input line:
+    `{"line": n, "status": "created" | "invalid" | "failed", "id"?: ..., "error"?: ...}`.
+    Drafts with `meta.idempotency_key` are not deduplicated here: they fail, to be
+    sent one by one through the single-event endpoint.
+    """
+    log = logger.bind(user_id=str(current_user.id), chunk_size=chunk_size)
+    log.info("Bulk NDJSON ingestion started.")
+
+    async def results() -> AsyncIterator[bytes]:
+        chunk: List[Tuple[int, LogEvent]] = []
+        line_no = 0
+        created = 0
+        try:
+            async for raw_line in iter_ndjson_lines(request.stream(), settings.INGEST_MAX_LINE_BYTES):
+                line_no += 1
+                if not raw_line.strip():
+                    continue
+                try:
+                    chunk.append((line_no, LogEvent(**orjson.loads(raw_line))))
+                except Exception as e:
+                    yield _result_line(line_no, "invalid", error=str(e))
+                    continue
+                if len(chunk) >= chunk_size:
+                    chunk_created, lines = await _record_chunk(log_service, chunk, background_tasks)
+                    created += chunk_created
+                    for out in lines:
+                        yield out
+                    chunk = []
+        except NDJSONLineTooLong as e:
+            yield _result_line(line_no + 1, "invalid", error=str(e))
+        if chunk:
+            chunk_created, lines = await _record_chunk(log_service, chunk, background_tasks)
+            created += chunk_created
+            for out in lines:
+                yield out
+        log.info(f"Bulk NDJSON ingestion finished: {line_no} lines read, {created} events created.")
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
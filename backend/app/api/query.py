@@ -1,19 +1,66 @@
 import logging
-from typing import List, Optional, Any, Dict, Literal
+from datetime import datetime
+from typing import List, Optional, Any, Dict, Literal, Set
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import BaseModel
 
 from app.core.database import get_database
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.utils.auth import CurrentUser, require_role
-from app.models import CurrentStateInventoryItem, CurrentStateOrderStatus
+from app.models import (
+    CurrentStateInventoryItem, CurrentStateOrderStatus, BatchGetRequest, BatchGetResponse
+)
+from app.services.name_search import name_match_filter
+from app.services.state_cache import state_cache
 from app.services.state_updater import (
-    CS_INVENTORY_COLLECTION, CS_ORDERS_COLLECTION
+    CS_INVENTORY_COLLECTION, CS_ORDERS_COLLECTION, load_state_as_of
 )
+from app.core.settings import settings
+from app.utils.projection import InvalidFieldSelection, build_projection, model_field_roots, raw_json_response
+from app.utils.trusted_read import trusted_row, trusted_rows
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+INVENTORY_ITEM_FIELDS = model_field_roots(CurrentStateInventoryItem) | {"_id"}
+ORDER_STATUS_FIELDS = model_field_roots(CurrentStateOrderStatus) | {"_id"}
+
+def _projection_or_400(fields: Optional[str], allowed_roots: Set[str]) -> Optional[Dict[str, int]]:
+    try:
+        return build_projection(fields, allowed_roots, always=("_id",))
+    except InvalidFieldSelection as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def _batch_ids_or_400(request: BatchGetRequest) -> List[str]:
+    ids = list(dict.fromkeys(request.ids))
+    if len(ids) > settings.QUERY_BATCH_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.QUERY_BATCH_GET_MAX_IDS} ids per batchGet call (got {len(ids)}).",
+        )
+    return ids
+
+def _find_by_ids(db: AsyncIOMotorDatabase, collection_name: str):
+    async def load(ids: List[str]) -> List[Dict[str, Any]]:
+        return await db[collection_name].find({"_id": {"$in": ids}}).to_list(length=len(ids))
+    return load
+
+def _batch_result(model_cls, doc: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if doc is None:
+        return {"status": "not_found", "item": None}
+    row = trusted_row(model_cls, doc, settings.READ_VALIDATION_SAMPLE_RATE)
+    if row is None:
+        return {"status": "error", "item": None}
+    return {"status": "found", "item": row}
+
+def _may_view_order(current_user: CurrentUser, order_state_doc: Dict[str, Any]) -> bool:
+    """Customers only see their own orders (by user id or email); staff and admins see all."""
+    is_staff_or_admin = "staff" in current_user.roles or "admin" in current_user.roles
+    if "customer" in current_user.roles and not is_staff_or_admin:
+        customer_identifier_in_order = order_state_doc.get("customer_id")
+        return customer_identifier_in_order == str(current_user.id) or customer_identifier_in_order == current_user.email
+    return True
+
 @router.get(
     "/inventory/{product_id}",
     response_model=CurrentStateInventoryItem,
@@ -23,19 +70,25 @@ router = APIRouter()
 async def query_inventory_item_state(
     product_id: str,
     current_user: CurrentUser = Depends(),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    as_of: Optional[datetime] = Query(None, description="Return the state as it was at this moment (ISO 8601), rebuilt from the nearest earlier snapshot and the item's later events")
 ):
     log = logger.bind(user_id=str(current_user.id), product_id=product_id)
     log.info("Querying current inventory item state.")
-    item_state_doc = await db[CS_INVENTORY_COLLECTION].find_one({"_id": product_id})
+    if as_of is not None:
+        item_state_doc = await load_state_as_of(db, CS_INVENTORY_COLLECTION, product_id, as_of)
+    else:
+        item_state_doc = await state_cache.read_through(
+            CS_INVENTORY_COLLECTION, product_id,
+            lambda: db[CS_INVENTORY_COLLECTION].find_one({"_id": product_id}),
+        )
     if not item_state_doc:
         log.warning("Inventory item state not found.")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Inventory item state not found.")
-    try:
-        return CurrentStateInventoryItem(**item_state_doc)
-    except Exception as e:
-        log.error(f"Error parsing inventory item state from DB: {e}", exc_info=True)
+    row = trusted_row(CurrentStateInventoryItem, item_state_doc, settings.READ_VALIDATION_SAMPLE_RATE)
+    if row is None:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error retrieving inventory data.")
+    return raw_json_response(row)
 
 @router.get(
     "/inventory",
@@ -48,17 +101,20 @@ async def query_list_inventory_items(
     db: AsyncIOMotorDatabase = Depends(get_database),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    name_contains: Optional[str] = Query(None, description="Filter by product name (case-insensitive contains)"),
+    name_contains: Optional[str] = Query(None, description="Filter by product name (case- and accent-insensitive, see match_mode)"),
+    match_mode: Optional[Literal["contains", "prefix", "regex"]] = Query(None, description="How name_contains matches: 'contains' (n-gram index), 'prefix' (prefix index) or 'regex' (legacy unindexed $regex). Defaults to the NAME_SEARCH_MATCH_MODE setting."),
     min_stock: Optional[int] = Query(None, description="Filter items with stock >= this value"),
     max_stock: Optional[int] = Query(None, description="Filter items with stock <= this value"),
     sort_by: Optional[str] = Query("name", description="Field to sort by (e.g., 'name', 'current_stock', 'last_updated_at')"),
-    sort_order: Optional[Literal["asc", "desc"]] = Query("asc", description="'asc' or 'desc'")
+    sort_order: Optional[Literal["asc", "desc"]] = Query("asc", description="'asc' or 'desc'"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (e.g. 'name,current_stock'). Only CurrentStateInventoryItem fields (400 otherwise); '_id' is always included; items are returned as plain objects with only these fields.")
 ):
     log = logger.bind(user_id=str(current_user.id))
     log.info("Querying list of current inventory item states.")
+    projection = _projection_or_400(fields, INVENTORY_ITEM_FIELDS)
     query_filter: Dict[str, Any] = {}
     if name_contains:
-        query_filter["name"] = {"$regex": name_contains, "$options": "i"}
+        query_filter.update(name_match_filter("name", name_contains, match_mode or settings.NAME_SEARCH_MATCH_MODE))
     stock_filter_parts = {}
     if min_stock is not None:
         stock_filter_parts["$gte"] = min_stock
@@ -68,15 +124,29 @@ async def query_list_inventory_items(
         query_filter["current_stock"] = stock_filter_parts
 
     sort_direction = 1 if sort_order == "asc" else -1
-    cursor = db[CS_INVENTORY_COLLECTION].find(query_filter).sort(sort_by, sort_direction).skip(skip).limit(limit)
+    cursor = db[CS_INVENTORY_COLLECTION].find(query_filter, projection).sort(sort_by, sort_direction).skip(skip).limit(limit)
     item_state_docs = await cursor.to_list(length=limit)
-    parsed_items = []
-    for doc in item_state_docs:
-        try:
-            parsed_items.append(CurrentStateInventoryItem(**doc))
-        except Exception as e:
-            log.warning(f"Skipping inventory item parse error: {doc.get('_id')}, Error: {e}")
-    return parsed_items
+    if projection is not None:
+        return raw_json_response(item_state_docs)
+    return raw_json_response(trusted_rows(CurrentStateInventoryItem, item_state_docs, settings.READ_VALIDATION_SAMPLE_RATE))
+
+@router.post(
+    "/inventory:batchGet",
+    response_model=BatchGetResponse,
+    dependencies=[Depends(require_role(["staff", "admin", "manager"]))],
+    summary="Get Current State of Several Inventory Items"
+)
+async def batch_get_inventory_items(
+    request: BatchGetRequest,
+    current_user: CurrentUser = Depends(),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    ids = _batch_ids_or_400(request)
+    log = logger.bind(user_id=str(current_user.id))
+    log.info(f"Batch-querying {len(ids)} inventory item states.")
+    docs = await state_cache.read_many(CS_INVENTORY_COLLECTION, ids, _find_by_ids(db, CS_INVENTORY_COLLECTION))
+    results = {product_id: _batch_result(CurrentStateInventoryItem, docs.get(product_id)) for product_id in ids}
+    return raw_json_response({"results": results})
 
 @router.get(
     "/orders/{order_id}/status",
@@ -87,26 +157,54 @@ async def query_list_inventory_items(
 async def query_order_status(
     order_id: str,
     current_user: CurrentUser = Depends(),
-    db: AsyncIOMotorDatabase = Depends(get_database)
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    as_of: Optional[datetime] = Query(None, description="Return the state as it was at this moment (ISO 8601), rebuilt from the nearest earlier snapshot and the order's later events")
 ):
     log = logger.bind(user_id=str(current_user.id), order_id=order_id)
     log.info("Querying current order status.")
-    order_state_doc = await db[CS_ORDERS_COLLECTION].find_one({"_id": order_id})
+    if as_of is not None:
+        order_state_doc = await load_state_as_of(db, CS_ORDERS_COLLECTION, order_id, as_of)
+    else:
+        order_state_doc = await state_cache.read_through(
+            CS_ORDERS_COLLECTION, order_id,
+            lambda: db[CS_ORDERS_COLLECTION].find_one({"_id": order_id}),
+        )
     if not order_state_doc:
         log.warning("Order state not found.")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order state not found.")
 
-    is_staff_or_admin = "staff" in current_user.roles or "admin" in current_user.roles
-    if "customer" in current_user.roles and not is_staff_or_admin:
-        customer_identifier_in_order = order_state_doc.get("customer_id")
-        if customer_identifier_in_order != str(current_user.id) and customer_identifier_in_order != current_user.email:
-            log.warning(f"Customer {current_user.email} (ID: {str(current_user.id)}) tried to access order {order_id} not belonging to them (Order CustID: {customer_identifier_in_order}).")
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this order status.")
-    try:
-        return CurrentStateOrderStatus(**order_state_doc)
-    except Exception as e:
-        log.error(f"Error parsing order state from DB: {e}", exc_info=True)
+    if not _may_view_order(current_user, order_state_doc):
+        log.warning(f"Customer {current_user.email} (ID: {str(current_user.id)}) tried to access order {order_id} not belonging to them (Order CustID: {order_state_doc.get('customer_id')}).")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to view this order status.")
+    row = trusted_row(CurrentStateOrderStatus, order_state_doc, settings.READ_VALIDATION_SAMPLE_RATE)
+    if row is None:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error retrieving order data.")
+    return raw_json_response(row)
+
+@router.post(
+    "/orders:batchGet",
+    response_model=BatchGetResponse,
+    dependencies=[Depends(require_role(["staff", "admin", "customer"]))],
+    summary="Get Current State of Several Orders"
+)
+async def batch_get_orders(
+    request: BatchGetRequest,
+    current_user: CurrentUser = Depends(),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    ids = _batch_ids_or_400(request)
+    log = logger.bind(user_id=str(current_user.id))
+    log.info(f"Batch-querying {len(ids)} order states.")
+    docs = await state_cache.read_many(CS_ORDERS_COLLECTION, ids, _find_by_ids(db, CS_ORDERS_COLLECTION))
+    results: Dict[str, Dict[str, Any]] = {}
+    for order_id in ids:
+        order_state_doc = docs.get(order_id)
+        if order_state_doc is not None and not _may_view_order(current_user, order_state_doc):
+            log.warning(f"Customer {current_user.email} (ID: {str(current_user.id)}) tried to access order {order_id} not belonging to them (Order CustID: {order_state_doc.get('customer_id')}).")
+            results[order_id] = {"status": "forbidden", "item": None}
+        else:
+            results[order_id] = _batch_result(CurrentStateOrderStatus, order_state_doc)
+    return raw_json_response({"results": results})
 
 @router.get(
     "/orders",
@@ -121,12 +219,15 @@ async def query_list_orders(
     limit: int = Query(100, ge=1, le=1000),
     customer_id_filter: Optional[str] = Query(None, alias="customerId"),
     status_filter: Optional[str] = Query(None, alias="status"),
-    order_ref_filter: Optional[str] = Query(None, alias="orderRef"),
+    order_ref_filter: Optional[str] = Query(None, alias="orderRef", description="Filter by order reference (case-insensitive, see match_mode)"),
+    match_mode: Optional[Literal["contains", "prefix", "regex"]] = Query(None, description="How orderRef matches: 'contains' (n-gram index), 'prefix' (prefix index) or 'regex' (legacy unindexed $regex). Defaults to the NAME_SEARCH_MATCH_MODE setting."),
     sort_by: Optional[str] = Query("last_updated_at", description="Field to sort by (e.g., 'created_at', 'last_updated_at', 'status')"),
-    sort_order: Optional[Literal["asc", "desc"]] = Query("desc", description="'asc' or 'desc'")
+    sort_order: Optional[Literal["asc", "desc"]] = Query("desc", description="'asc' or 'desc'"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (e.g. 'status,customer_id,last_updated_at'). Only CurrentStateOrderStatus fields (400 otherwise); '_id' is always included; orders are returned as plain objects with only these fields.")
 ):
     log = logger.bind(user_id=str(current_user.id))
     log.info("Querying list of current order states.")
+    projection = _projection_or_400(fields, ORDER_STATUS_FIELDS)
     query_filter: Dict[str, Any] = {}
     is_staff_or_admin = "staff" in current_user.roles or "admin" in current_user.roles
 
@@ -142,15 +243,11 @@ async def query_list_orders(
     if status_filter:
         query_filter["status"] = status_filter
     if order_ref_filter:
-        query_filter["order_ref"] = {"$regex": order_ref_filter, "$options": "i"}
+        query_filter.update(name_match_filter("order_ref", order_ref_filter, match_mode or settings.NAME_SEARCH_MATCH_MODE))
 
     sort_direction = 1 if sort_order == "asc" else -1
-    cursor = db[CS_ORDERS_COLLECTION].find(query_filter).sort(sort_by, sort_direction).skip(skip).limit(limit)
+    cursor = db[CS_ORDERS_COLLECTION].find(query_filter, projection).sort(sort_by, sort_direction).skip(skip).limit(limit)
     order_state_docs = await cursor.to_list(length=limit)
-    parsed_orders = []
-    for doc in order_state_docs:
-        try:
-            parsed_orders.append(CurrentStateOrderStatus(**doc))
-        except Exception as e:
-            log.warning(f"Skipping order state parse error: {doc.get('_id')}, Error: {e}")
-    return parsed_orders
\ No newline at end of file
+    if projection is not None:
+        return raw_json_response(order_state_docs)
+    return raw_json_response(trusted_rows(CurrentStateOrderStatus, order_state_docs, settings.READ_VALIDATION_SAMPLE_RATE))
\ No newline at end of file
@@ -1,41 +1,56 @@
 import logging
-from typing import List, Optional, Any, Dict
+from typing import List, Literal, Optional, Any, Dict
 from fastapi import APIRouter, Depends, Query, HTTPException, status
-from datetime import datetime
+from fastapi.responses import Response, StreamingResponse
+from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
 
 from app.core.database import get_database
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.utils.auth import CurrentUser, require_role
-from app.models import LogEvent, TimelineQueryResponse
+from app.core.settings import settings
+from app.models import LogEvent, LineageResponse, TimelineQueryResponse, TimelineChangesResponse, TimelineStatsResponse
+from app.services.lineage import traverse_lineage
+from app.services.rollups import DEFAULT_STATS_WINDOWS, GRANULARITIES, ROLLUP_DIMENSIONS, ROLLUPS_COLLECTION, stats_pipeline
+from app.services.search_tokens import InvalidSearchQuery, parse_search_query
+from app.services.sequence import settled_prefix
+from app.services.timeline_cache import TimelineResponseCache, response_cache_key, timeline_generations
+from app.services.timeline_counts import count_timeline
+from app.utils.cache import TTLCache
+from app.utils.cursors import InvalidCursor, encode_cursor, keyset_filter
+from app.utils.export import iter_csv_export, iter_ndjson_export
+from app.utils.projection import InvalidFieldSelection, build_projection, raw_json_response
+from app.utils.trusted_read import trusted_row, trusted_rows
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-@router.get(
-    "",
-    response_model=TimelineQueryResponse,
-    dependencies=[Depends(require_role(["admin", "manager", "auditor"]))],
-    summary="Query the full LogLine history (Audit Trail)"
+LOG_EVENT_FIELDS = {
+    "id", "seq", "timestamp", "recorded_at", "type", "author", "witness",
+    "channel", "origin", "data", "consequence", "meta",
+}
+
+_count_cache: TTLCache = TTLCache(
+    max_entries=settings.TIMELINE_COUNT_CACHE_SIZE,
+    ttl_seconds=settings.TIMELINE_COUNT_CACHE_TTL_SECONDS,
+)
+_response_cache = TimelineResponseCache(
+    timeline_generations,
+    max_entries=settings.TIMELINE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.TIMELINE_CACHE_TTL_SECONDS,
 )
-async def get_log_timeline(
-    current_user: CurrentUser = Depends(),
-    db: AsyncIOMotorDatabase = Depends(get_database),
-    skip: int = Query(0, ge=0, description="Number of events to skip."),
-    limit: int = Query(100, ge=1, le=500, description="Maximum number of events to return."),
-    event_type: Optional[str] = Query(None, alias="type", description="Filter by event type (e.g., 'registrar_venda')."),
-    author: Optional[str] = Query(None, description="Filter by author ID (e.g., 'user:email@...')."),
-    witness: Optional[str] = Query(None, description="Filter by witness ID."),
-    channel: Optional[str] = Query(None, description="Filter by channel."),
-    origin: Optional[str] = Query(None, description="Filter by origin."),
-    start_timestamp: Optional[datetime] = Query(None, alias="start_ts", description="Filter events from this UTC timestamp (inclusive). ISO format."),
-    end_timestamp: Optional[datetime] = Query(None, alias="end_ts", description="Filter events up to this UTC timestamp (exclusive). ISO format."),
-    data_contains_key: Optional[str] = Query(None, description="Filter if 'data' field contains this key (dot notation for nested, e.g., 'order_details.customer_id')."),
-    data_value_match: Optional[str] = Query(None, description="If 'data_contains_key' is set, its value must match this string (exact match).")
-):
-    log = logger.bind(user_id=str(current_user.id), trace_id=logger.extra.get("trace_id"))
-    log.info("Querying immutable LogLine timeline.")
 
+def _build_timeline_filter(
+    event_type: Optional[str] = None,
+    author: Optional[str] = None,
+    witness: Optional[str] = None,
+    channel: Optional[str] = None,
+    origin: Optional[str] = None,
+    start_timestamp: Optional[datetime] = None,
+    end_timestamp: Optional[datetime] = None,
+    data_contains_key: Optional[str] = None,
+    data_value_match: Optional[str] = None,
+) -> Dict[str, Any]:
     query_filter: Dict[str, Any] = {}
     if event_type: query_filter["type"] = event_type
     if author: query_filter["author"] = author
@@ -61,26 +76,350 @@ async def get_log_timeline(
             query_filter[key_path] = query_value
         else:
             query_filter[key_path] = {"$exists": True}
+    return query_filter
+
+@router.get(
+    "",
+    response_model=TimelineQueryResponse,
+    dependencies=[Depends(require_role(["admin", "manager", "auditor"]))],
+    summary="Query the full LogLine history (Audit Trail)"
+)
+async def get_log_timeline(
+    current_user: CurrentUser = Depends(),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    skip: int = Query(0, ge=0, description="Number of events to skip. Ignored when 'cursor' is given; prefer 'cursor' for deep pages."),
+    cursor: Optional[str] = Query(None, description="Opaque 'next_cursor' of the previous page (keyset pagination)."),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of events to return."),
+    count_mode: Literal["exact", "estimated", "none"] = Query("exact", description="How 'total_count' is computed: exact (full count), estimated (metadata or short-lived cached count) or none (no count; rely on 'has_more')."),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (e.g. 'id,type,timestamp,author' or 'data.order_id'). 'id' and 'timestamp' are always included; events are returned as plain objects with only these fields."),
+    event_type: Optional[str] = Query(None, alias="type", description="Filter by event type (e.g., 'registrar_venda')."),
+    author: Optional[str] = Query(None, description="Filter by author ID (e.g., 'user:email@...')."),
+    witness: Optional[str] = Query(None, description="Filter by witness ID."),
+    channel: Optional[str] = Query(None, description="Filter by channel."),
+    origin: Optional[str] = Query(None, description="Filter by origin."),
+    start_timestamp: Optional[datetime] = Query(None, alias="start_ts", description="Filter events from this UTC timestamp (inclusive). ISO format."),
+    end_timestamp: Optional[datetime] = Query(None, alias="end_ts", description="Filter events up to this UTC timestamp (exclusive). ISO format."),
+    data_contains_key: Optional[str] = Query(None, description="Filter if 'data' field contains this key (dot notation for nested, e.g., 'order_details.customer_id')."),
+    data_value_match: Optional[str] = Query(None, description="If 'data_contains_key' is set, its value must match this string (exact match).")
+):
+    log = logger.bind(user_id=str(current_user.id), trace_id=logger.extra.get("trace_id"))
+    log.info("Querying immutable LogLine timeline.")
 
-    log.debug(f"Timeline query filter constructed: {query_filter}")
+    query_filter = _build_timeline_filter(
+        event_type, author, witness, channel, origin,
+        start_timestamp, end_timestamp, data_contains_key, data_value_match,
+    )
+    try:
+        projection = build_projection(fields, LOG_EVENT_FIELDS, always=("id", "timestamp"))
+    except InvalidFieldSelection as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    page_filter = query_filter
+    if cursor:
+        try:
+            keyset = keyset_filter(cursor)
+        except InvalidCursor:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+        page_filter = {"$and": [query_filter, keyset]} if query_filter else keyset
+        skip = 0
+
+    log.debug(f"Timeline query filter constructed: {page_filter}")
+    cache_key = response_cache_key(page_filter, projection, skip, limit, count_mode)
+    if settings.TIMELINE_CACHE_ENABLED:
+        cached_body = _response_cache.get(cache_key, event_type)
+        if cached_body is not None:
+            return Response(cached_body, media_type="application/json")
+    generation = timeline_generations.current(event_type)
     try:
         logs_collection = db["logs"]
-        total_count = await logs_collection.count_documents(query_filter)
-        cursor = logs_collection.find(query_filter).sort("timestamp", -1).skip(skip).limit(limit)
-        log_docs = await cursor.to_list(length=limit)
+        total_count = await count_timeline(logs_collection, query_filter, count_mode, _count_cache)
+        find_cursor = logs_collection.find(page_filter, projection).sort([("timestamp", -1), ("id", -1)]).skip(skip).limit(limit + 1)
+        log_docs = await find_cursor.to_list(length=limit + 1)
 
-        events = []
-        for doc in log_docs:
-            try:
-                events.append(LogEvent(**doc))
-            except Exception as e:
-                log.warning(f"Skipping LogEvent parse error: ID {doc.get('id')}, Type {doc.get('type')}, Error: {e}")
+        next_cursor = None
+        has_more = len(log_docs) > limit
+        if has_more:
+            log_docs = log_docs[:limit]
+            next_cursor = encode_cursor(log_docs[-1]["timestamp"], log_docs[-1]["id"])
 
-        return TimelineQueryResponse(events=events, total_count=total_count, limit=limit, skip=skip)
+        events = log_docs if projection is not None else trusted_rows(LogEvent, log_docs, settings.READ_VALIDATION_SAMPLE_RATE)
+        response = raw_json_response({
+            "events": events, "total_count": total_count, "count_mode": count_mode,
+            "has_more": has_more, "limit": limit, "skip": skip, "next_cursor": next_cursor,
+        })
+        if settings.TIMELINE_CACHE_ENABLED:
+            _response_cache.set(cache_key, generation, response.body)
+        return response
     except Exception as e:
         log.exception("Error querying timeline logs.")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve timeline data.")
 
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(require_role(["admin", "manager", "auditor"]))],
+    responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}, "description": "Every matching event, newest first"}},
+    summary="Stream the full filtered LogLine history as NDJSON or CSV"
+)
+async def export_log_timeline(
+    current_user: CurrentUser = Depends(),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format", description="Output format."),
+    event_type: Optional[str] = Query(None, alias="type", description="Filter by event type (e.g., 'registrar_venda')."),
+    author: Optional[str] = Query(None, description="Filter by author ID (e.g., 'user:email@...')."),
+    witness: Optional[str] = Query(None, description="Filter by witness ID."),
+    channel: Optional[str] = Query(None, description="Filter by channel."),
+    origin: Optional[str] = Query(None, description="Filter by origin."),
+    start_timestamp: Optional[datetime] = Query(None, alias="start_ts", description="Filter events from this UTC timestamp (inclusive). ISO format."),
+    end_timestamp: Optional[datetime] = Query(None, alias="end_ts", description="Filter events up to this UTC timestamp (exclusive). ISO format."),
+    data_contains_key: Optional[str] = Query(None, description="Filter if 'data' field contains this key (dot notation for nested, e.g., 'order_details.customer_id')."),
+    data_value_match: Optional[str] = Query(None, description="If 'data_contains_key' is set, its value must match this string (exact match).")
+):
+    log = logger.bind(user_id=str(current_user.id), trace_id=logger.extra.get("trace_id"))
+    query_filter = _build_timeline_filter(
+        event_type, author, witness, channel, origin,
+        start_timestamp, end_timestamp, data_contains_key, data_value_match,
+    )
+    log.info(f"Exporting LogLine timeline as {export_format}. Filter: {query_filter}")
+
+    batch_size = settings.TIMELINE_EXPORT_BATCH_SIZE
+    cursor = (
+        db["logs"].find(query_filter, {"_id": 0, "search_tokens": 0})
+        .sort([("timestamp", -1), ("id", -1)])
+        .batch_size(batch_size)
+    )
+    if export_format == "csv":
+        body, media_type = iter_csv_export(cursor, rows_per_chunk=batch_size), "text/csv"
+    else:
+        body, media_type = iter_ndjson_export(cursor, rows_per_chunk=batch_size), "application/x-ndjson"
+    filename = f"timeline-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{export_format}"
+    return StreamingResponse(body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.get(
+    "/search",
+    response_model=TimelineQueryResponse,
+    dependencies=[Depends(require_role(["admin", "manager", "auditor"]))],
+    summary="Full-text search over LogEvent data and meta, most recent first"
+)
+async def search_log_timeline(
+    current_user: CurrentUser = Depends(),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    q: str = Query(..., min_length=1, max_length=500, description="Terms are ANDed; 'OR' separates alternatives; 'term*' matches a prefix. Case and accents are ignored."),
+    cursor: Optional[str] = Query(None, description="Opaque 'next_cursor' of the previous page."),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of events to return."),
+    event_type: Optional[str] = Query(None, alias="type", description="Filter by event type (e.g., 'registrar_venda')."),
+    author: Optional[str] = Query(None, description="Filter by author ID (e.g., 'user:email@...')."),
+    witness: Optional[str] = Query(None, description="Filter by witness ID."),
+    channel: Optional[str] = Query(None, description="Filter by channel."),
+    origin: Optional[str] = Query(None, description="Filter by origin."),
+    start_timestamp: Optional[datetime] = Query(None, alias="start_ts", description="Filter events from this UTC timestamp (inclusive). ISO format."),
+    end_timestamp: Optional[datetime] = Query(None, alias="end_ts", description="Filter events up to this UTC timestamp (exclusive). ISO format.")
+):
+    log = logger.bind(user_id=str(current_user.id), trace_id=logger.extra.get("trace_id"))
+    try:
+        clauses = [parse_search_query(q)]
+        if cursor:
+            clauses.append(keyset_filter(cursor))
+    except InvalidSearchQuery as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except InvalidCursor:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+    query_filter = _build_timeline_filter(event_type, author, witness, channel, origin, start_timestamp, end_timestamp)
+    if query_filter:
+        clauses.append(query_filter)
+    search_filter = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+    log.debug(f"Timeline search filter: {search_filter}")
+
+    try:
+        find_cursor = db["logs"].find(search_filter, {"search_tokens": 0}).sort([("timestamp", -1), ("id", -1)]).limit(limit + 1)
+        log_docs = await find_cursor.to_list(length=limit + 1)
+    except Exception as e:
+        log.exception("Error searching timeline logs.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to search timeline data.")
+
+    has_more = len(log_docs) > limit
+    log_docs = log_docs[:limit]
+    next_cursor = encode_cursor(log_docs[-1]["timestamp"], log_docs[-1]["id"]) if has_more else None
+    return raw_json_response({
+        "events": trusted_rows(LogEvent, log_docs, settings.READ_VALIDATION_SAMPLE_RATE),
+        "total_count": None, "count_mode": "none",
+        "has_more": has_more, "limit": limit, "skip": 0, "next_cursor": next_cursor,
+    })
+
+async def _page_by_meta(
+    db: AsyncIOMotorDatabase,
+    meta_field: str,
+    value: str,
+    cursor: Optional[str],
+    limit: int,
+    order: str,
+    log,
+) -> Any:
+    """One page of the events sharing `meta.<meta_field>`, in time order, via its dedicated index."""
+    descending = order == "desc"
+    query_filter: Dict[str, Any] = {f"meta.{meta_field}": value}
+    if cursor:
+        try:
+            query_filter = {"$and": [query_filter, keyset_filter(cursor, descending=descending)]}
+        except InvalidCursor:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+    direction = -1 if descending else 1
+    try:
+        find_cursor = db["logs"].find(query_filter, {"search_tokens": 0}).sort([("timestamp", direction), ("id", direction)]).limit(limit + 1)
+        log_docs = await find_cursor.to_list(length=limit + 1)
+    except Exception as e:
+        log.exception(f"Error querying events by meta.{meta_field}.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve timeline data.")
+
+    has_more = len(log_docs) > limit
+    log_docs = log_docs[:limit]
+    next_cursor = encode_cursor(log_docs[-1]["timestamp"], log_docs[-1]["id"]) if has_more else None
+    return raw_json_response({
+        "events": trusted_rows(LogEvent, log_docs, settings.READ_VALIDATION_SAMPLE_RATE),
+        "total_count": None, "count_mode": "none",
+        "has_more": has_more, "limit": limit, "skip": 0, "next_cursor": next_cursor,
+    })
+
+@router.get(
+    "/by-trace/{trace_id}",
+    response_model=TimelineQueryResponse,
+    dependencies=[Depends(require_role(["admin", "manager", "auditor"]))],
+    summary="Events of one trace (meta.trace_id), in time order"
+)
+async def get_events_by_trace(
+    trace_id: str,
+    current_user: CurrentUser = Depends(),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    cursor: Optional[str] = Query(None, description="Opaque 'next_cursor' of the previous page."),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of events to return."),
+    order: Literal["asc", "desc"] = Query("asc", description="'asc' (chronological) or 'desc'.")
+):
+    log = logger.bind(user_id=str(current_user.id), trace_id=trace_id)
+    return await _page_by_meta(db, "trace_id", trace_id, cursor, limit, order, log)
+
+@router.get(
+    "/by-conversation/{conversation_id}",
+    response_model=TimelineQueryResponse,
+    dependencies=[Depends(require_role(["admin", "manager", "auditor"]))],
+    summary="Events of one conversation (meta.conversation_id), in time order"
+)
+async def get_events_by_conversation(
+    conversation_id: str,
+    current_user: CurrentUser = Depends(),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    cursor: Optional[str] = Query(None, description="Opaque 'next_cursor' of the previous page."),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of events to return."),
+    order: Literal["asc", "desc"] = Query("asc", description="'asc' (chronological) or 'desc'.")
+):
+    log = logger.bind(user_id=str(current_user.id), conversation_id=conversation_id, trace_id=logger.extra.get("trace_id"))
+    return await _page_by_meta(db, "conversation_id", conversation_id, cursor, limit, order, log)
+
+@router.get(
+    "/stats",
+    response_model=TimelineStatsResponse,
+    dependencies=[Depends(require_role(["admin", "manager", "auditor"]))],
+    summary="Event volume per time bucket, from pre-aggregated rollups"
+)
+async def get_timeline_stats(
+    current_user: CurrentUser = Depends(),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    granularity: Literal["minute", "hour", "day"] = Query("hour", description="Bucket size."),
+    group_by: Optional[str] = Query(None, description="Comma-separated dimensions to split counts by: type, channel, author."),
+    event_type: Optional[str] = Query(None, alias="type", description="Only count this event type."),
+    channel: Optional[str] = Query(None, description="Only count this channel."),
+    author: Optional[str] = Query(None, description="Only count this author."),
+    start_timestamp: Optional[datetime] = Query(None, alias="start_ts", description="Window start (UTC, inclusive). Defaults to 6h/14d/365d before end_ts for minute/hour/day."),
+    end_timestamp: Optional[datetime] = Query(None, alias="end_ts", description="Window end (UTC, exclusive). Defaults to now.")
+):
+    log = logger.bind(user_id=str(current_user.id), trace_id=logger.extra.get("trace_id"))
+    dimensions = [d.strip() for d in (group_by or "").split(",") if d.strip()]
+    unknown = [d for d in dimensions if d not in ROLLUP_DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown group_by dimension(s): {', '.join(unknown)}.")
+
+    end = end_timestamp or datetime.now(timezone.utc).replace(tzinfo=None)
+    start = start_timestamp or end - DEFAULT_STATS_WINDOWS[granularity]
+    pipeline = stats_pipeline(granularity, start, end, dimensions, {"type": event_type, "channel": channel, "author": author})
+    log.debug(f"Timeline stats pipeline: {pipeline}")
+    try:
+        buckets = await db[ROLLUPS_COLLECTION].aggregate(pipeline).to_list(length=None)
+    except Exception as e:
+        log.exception("Error querying timeline rollups.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve timeline stats.")
+    return TimelineStatsResponse(granularity=granularity, group_by=dimensions, buckets=buckets)
+
+@router.get(
+    "/changes",
+    response_model=TimelineChangesResponse,
+    dependencies=[Depends(require_role(["admin", "manager", "auditor", "system"]))],
+    summary="Incremental sync: events persisted after a sequence number"
+)
+async def get_timeline_changes(
+    current_user: CurrentUser = Depends(),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    since_seq: int = Query(0, ge=0, description="Return events with seq greater than this (0 = from the beginning)."),
+    limit: int = Query(500, ge=1, le=5000, description="Maximum number of events to return.")
+):
+    log = logger.bind(user_id=str(current_user.id), since_seq=since_seq, trace_id=logger.extra.get("trace_id"))
+    log.debug("Fetching timeline changes.")
+    try:
+        cursor = db["logs"].find({"seq": {"$gt": since_seq}}).sort("seq", 1).limit(limit + 1)
+        log_docs = await cursor.to_list(length=limit + 1)
+    except Exception as e:
+        log.exception("Error querying timeline changes.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve timeline changes.")
+
+    settled_before = datetime.now(timezone.utc) - timedelta(seconds=settings.SEQUENCE_GAP_SETTLE_SECONDS)
+    page_docs, next_since_seq, stopped_at_gap, gaps = settled_prefix(log_docs[:limit], since_seq, settled_before)
+    if stopped_at_gap:
+        log.debug(f"Timeline changes stopped at unsettled sequence gap after seq {next_since_seq}.")
+    if gaps:
+        log.info(f"Timeline changes skipped sequence gaps presumed abandoned: {gaps}")
+
+    return raw_json_response({
+        "events": trusted_rows(LogEvent, page_docs, settings.READ_VALIDATION_SAMPLE_RATE),
+        "next_since_seq": next_since_seq,
+        "has_more": not stopped_at_gap and len(log_docs) > limit,
+        "gaps": [{"from_seq": from_seq, "to_seq": to_seq} for from_seq, to_seq in gaps],
+    })
+
+@router.get(
+    "/{log_event_id}/lineage",
+    response_model=LineageResponse,
+    dependencies=[Depends(require_role(["admin", "manager", "auditor"]))],
+    summary="Causal DAG of a LogEvent: its consequences (down) or causes (up)"
+)
+async def get_log_event_lineage(
+    log_event_id: str,
+    current_user: CurrentUser = Depends(),
+    db: AsyncIOMotorDatabase = Depends(get_database),
+    direction: Literal["up", "down"] = Query("down", description="'down' follows consequences, 'up' follows triggering events."),
+    depth: int = Query(5, ge=1, description="Maximum number of levels to traverse (capped by LINEAGE_MAX_DEPTH).")
+):
+    log = logger.bind(user_id=str(current_user.id), log_event_id=log_event_id, trace_id=logger.extra.get("trace_id"))
+    root_doc = await db["logs"].find_one({"id": log_event_id}, {"search_tokens": 0})
+    if not root_doc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="LogEvent not found.")
+
+    try:
+        lineage = await traverse_lineage(
+            db["logs"], root_doc, direction,
+            max_depth=min(depth, settings.LINEAGE_MAX_DEPTH),
+            max_nodes=settings.LINEAGE_MAX_NODES,
+        )
+    except Exception as e:
+        log.exception("Error traversing LogEvent lineage.")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve lineage.")
+    log.info(f"Lineage {direction}: {len(lineage.nodes)} events over {lineage.depth_reached} levels (truncated={lineage.truncated}).")
+
+    return raw_json_response({
+        "root": trusted_row(LogEvent, lineage.root),
+        "direction": direction,
+        "nodes": trusted_rows(LogEvent, lineage.nodes, settings.READ_VALIDATION_SAMPLE_RATE),
+        "edges": [{"parent_id": parent_id, "child_id": child_id} for parent_id, child_id in lineage.edges],
+        "depth_reached": lineage.depth_reached,
+        "truncated": lineage.truncated,
+    })
+
 @router.get(
     "/{log_event_id}",
     response_model=LogEvent,
@@ -100,8 +439,7 @@ async def get_specific_log_event(
         log.warning("LogEvent not found by system ID.")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="LogEvent not found.")
 
-    try:
-        return LogEvent(**log_doc)
-    except Exception as e:
-        log.error(f"Error parsing LogEvent from DB: {e}", exc_info=True)
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error retrieving LogEvent data.")
\ No newline at end of file
+    row = trusted_row(LogEvent, log_doc, settings.READ_VALIDATION_SAMPLE_RATE)
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Error retrieving LogEvent data.")
+    return raw_json_response(row)
\ No newline at end of file
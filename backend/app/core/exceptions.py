@@ -23,6 +23,20 @@ class InternalError(HTTPException):
             detail=detail,
         )
 
+class IdempotencyConflict(HTTPException):
+    def __init__(self, detail: str = "Requisição com esta Idempotency-Key ainda está em processamento"):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=detail,
+        )
+
+class IdempotencyKeyReused(HTTPException):
+    def __init__(self, detail: str = "Idempotency-Key já usada para uma requisição com outro conteúdo"):
+        super().__init__(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=detail,
+        )
+
 # Handler genérico para qualquer HTTPException
 async def http_exception_handler(request: Request, exc: HTTPException):
     return JSONResponse(
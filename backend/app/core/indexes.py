@@ -0,0 +1,88 @@
+import asyncio
+from typing import Dict, List, Optional
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.settings import settings
+from app.utils.index_manager import IndexSpec, ReconcileReport, reconcile_indexes
+
+# Índices declarativos por coleção. Toda consulta de API sobre essas coleções deve
+# ter um índice aqui; GET /admin/indexes/explain aponta as que caem em COLLSCAN.
+INDEX_REGISTRY: Dict[str, List[IndexSpec]] = {
+    "logs": [
+        IndexSpec((("id", 1),), unique=True),
+        IndexSpec((("seq", 1),), unique=True, partial_filter={"seq": {"$exists": True}}),
+        IndexSpec((("timestamp", -1), ("id", -1))),
+        IndexSpec((("type", 1), ("timestamp", -1), ("id", -1))),
+        IndexSpec((("author", 1), ("timestamp", -1), ("id", -1))),
+        IndexSpec((("witness", 1), ("timestamp", -1), ("id", -1))),
+        IndexSpec((("meta.trace_id", 1), ("timestamp", 1), ("id", 1)), partial_filter={"meta.trace_id": {"$exists": True}}),
+        IndexSpec((("meta.conversation_id", 1), ("timestamp", 1), ("id", 1)), partial_filter={"meta.conversation_id": {"$exists": True}}),
+        IndexSpec((("search_tokens", 1), ("timestamp", -1), ("id", -1))),
+        IndexSpec((("meta.triggered_by_log_id", 1), ("timestamp", 1)), partial_filter={"meta.triggered_by_log_id": {"$exists": True}}),
+        IndexSpec((("aggregate_key", 1), ("seq", 1)), partial_filter={"aggregate_key": {"$exists": True}}),
+    ],
+    "log_rollups": [
+        IndexSpec((("granularity", 1), ("bucket", 1))),
+        IndexSpec((("granularity", 1), ("type", 1), ("bucket", 1))),
+    ],
+    "log_outbox": [
+        IndexSpec((("status", 1), ("seq", 1))),
+        IndexSpec((("aggregate_hash", 1), ("status", 1), ("seq", 1))),
+        IndexSpec((("status", 1), ("next_attempt_at", 1))),
+        IndexSpec((("status", 1), ("locked_until", 1))),
+        IndexSpec((("processed_at", 1),), expire_after_seconds=7 * 24 * 3600),
+    ],
+    "idempotency_keys": [
+        IndexSpec((("created_at", 1),), expire_after_seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+    ],
+    "current_state_orders": [
+        IndexSpec((("last_updated_at", -1),)),
+        IndexSpec((("customer_id", 1), ("last_updated_at", -1))),
+        IndexSpec((("status", 1), ("last_updated_at", -1))),
+        IndexSpec((("order_ref_normalized", 1),)),
+        IndexSpec((("order_ref_trigrams", 1),)),
+    ],
+    "current_state_inventory": [
+        IndexSpec((("name", 1),)),
+        IndexSpec((("name_normalized", 1),)),
+        IndexSpec((("name_trigrams", 1),)),
+    ],
+    "state_snapshots": [
+        IndexSpec((("collection", 1), ("status", 1), ("seq", -1))),
+    ],
+    "state_snapshot_docs": [
+        IndexSpec((("_id.snapshot_id", 1),)),
+    ],
+    "users": [
+        IndexSpec((("email", 1),), unique=True),
+    ],
+    "log_events": [
+        IndexSpec((("timestamp", 1),), expire_after_seconds=30 * 24 * 3600),
+    ],
+}
+
+_reconcile_task: Optional[asyncio.Task] = None
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase, drop_mismatched: bool = False, dry_run: bool = False) -> ReconcileReport:
+    report = await reconcile_indexes(db, INDEX_REGISTRY, drop_mismatched=drop_mismatched, dry_run=dry_run)
+    if report.created or report.rebuilt:
+        logger.success(f"🔍 Índices criados: {report.created + report.rebuilt}")
+    if report.mismatched:
+        logger.warning(f"⚠️ Índices divergentes do registro: {report.mismatched}")
+    return report
+
+
+def schedule_index_reconciliation(db: AsyncIOMotorDatabase) -> None:
+    """Reconciles the registry in the background so index builds never delay startup."""
+    global _reconcile_task
+
+    async def _run() -> None:
+        try:
+            await ensure_indexes(db)
+        except Exception as e:
+            logger.error(f"❌ Falha ao reconciliar índices: {e}")
+
+    _reconcile_task = asyncio.create_task(_run())
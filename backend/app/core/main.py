@@ -7,6 +7,7 @@ from loguru import logger
 
 from app.core.settings import settings
 from app.core.db import mongo_connector
+from app.core.indexes import schedule_index_reconciliation
 from app.core.exceptions import (
     CredentialsException,
     ValidationException,
@@ -23,6 +24,13 @@ from app.api.webhooks import router as webhooks_router
 from app.api.gateway  import router as gateway_router
 from app.api.admin    import router as admin_router
 from app.api.health   import router as health_router
+from app.api.ingest   import router as ingest_router
+from app.services.state_cache import state_cache
+from app.services.state_updater import close_update_scheduler, start_snapshot_scheduler, stop_snapshot_scheduler
+from app.services.log_service import (
+    close_event_batcher, start_consequence_engine, stop_consequence_engine,
+    start_outbox_workers, stop_outbox_workers
+)
 
 def configure_logging():
     logger.remove()
@@ -68,15 +76,28 @@ def create_app() -> FastAPI:
     async def on_startup():
         logger.info(f"🚀 Iniciando {settings.PROJECT_NAME} v{settings.VERSION}")
         await mongo_connector.connect()
+        state_cache.configure(settings.STATE_CACHE_MAX_ENTRIES, settings.STATE_CACHE_TTL_SECONDS)
+        db = await mongo_connector.get_database()
+        await start_consequence_engine(db)
+        await start_outbox_workers(db)
+        await start_snapshot_scheduler(db)
+        if settings.INDEX_RECONCILE_ON_STARTUP:
+            schedule_index_reconciliation(db)
 
     @app.on_event("shutdown")
     async def on_shutdown():
         logger.info("🛑 Encerrando aplicação")
+        await stop_snapshot_scheduler()
+        await stop_outbox_workers()
+        await stop_consequence_engine()
+        await close_event_batcher()
+        await close_update_scheduler()
         await mongo_connector.close()
 
     for r in (
         auth_router, actions_router, query_router, timeline_router,
-        users_router, webhooks_router, gateway_router, admin_router, health_router
+        users_router, webhooks_router, gateway_router, admin_router, health_router,
+        ingest_router
     ):
         app.include_router(r)
 
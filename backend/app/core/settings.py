@@ -2,7 +2,7 @@
 
 from pydantic_settings import BaseSettings
 from pydantic import Field, AnyUrl, SecretStr, validator
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -87,6 +87,207 @@ class Settings(BaseSettings):
         description="Habilita hot-reload no Uvicorn (dev)"
     )
 
+    LOG_GROUP_COMMIT_ENABLED: bool = Field(
+        False,
+        env="LOG_GROUP_COMMIT_ENABLED",
+        description="Agrupa gravações concorrentes de LogEvents em um único insert_many"
+    )
+    LOG_GROUP_COMMIT_WINDOW_MS: float = Field(
+        5.0,
+        env="LOG_GROUP_COMMIT_WINDOW_MS",
+        description="Janela de espera (ms) antes de um flush do group-commit"
+    )
+    LOG_GROUP_COMMIT_MAX_BATCH: int = Field(
+        500,
+        env="LOG_GROUP_COMMIT_MAX_BATCH",
+        description="Máximo de LogEvents por flush do group-commit"
+    )
+    INGEST_CHUNK_SIZE: int = Field(
+        500,
+        env="INGEST_CHUNK_SIZE",
+        description="LogEvents gravados por bloco na ingestão NDJSON em massa"
+    )
+    INGEST_MAX_LINE_BYTES: int = Field(
+        1_048_576,
+        env="INGEST_MAX_LINE_BYTES",
+        description="Tamanho máximo (bytes) de uma linha NDJSON na ingestão em massa"
+    )
+    INGEST_BROADCAST_MAX_EVENTS: int = Field(
+        100,
+        env="INGEST_BROADCAST_MAX_EVENTS",
+        description="Máximo de eventos por mensagem WebSocket ao anunciar um bloco ingerido"
+    )
+    INGEST_BROADCAST_MAX_BYTES: int = Field(
+        262_144,
+        env="INGEST_BROADCAST_MAX_BYTES",
+        description="Tamanho aproximado máximo (bytes de JSON) de uma mensagem WebSocket ao anunciar um bloco ingerido"
+    )
+    LOG_OUTBOX_ENABLED: bool = Field(
+        False,
+        env="LOG_OUTBOX_ENABLED",
+        description="Grava LogEvent + registro de outbox na mesma transação e aplica estado/broadcast fora da requisição (requer replica set)"
+    )
+    OUTBOX_WORKERS: int = Field(
+        4,
+        env="OUTBOX_WORKERS",
+        description="Quantidade de lanes de workers do outbox por processo"
+    )
+    OUTBOX_MAX_ATTEMPTS: int = Field(
+        8,
+        env="OUTBOX_MAX_ATTEMPTS",
+        description="Tentativas antes de marcar um registro do outbox como 'dead'"
+    )
+    OUTBOX_POLL_INTERVAL_MS: float = Field(
+        200,
+        env="OUTBOX_POLL_INTERVAL_MS",
+        description="Intervalo (ms) entre varreduras de uma lane ociosa do outbox"
+    )
+    CONSEQUENCE_ENGINE_CONCURRENCY: int = Field(
+        4,
+        env="CONSEQUENCE_ENGINE_CONCURRENCY",
+        description="Workers concorrentes do engine de eventos de consequência"
+    )
+    CONSEQUENCE_QUEUE_MAX_SIZE: int = Field(
+        10000,
+        env="CONSEQUENCE_QUEUE_MAX_SIZE",
+        description="Capacidade da fila de lotes de consequências (excedente é descartado e contabilizado)"
+    )
+    CONSEQUENCE_MAX_DEPTH: int = Field(
+        5,
+        env="CONSEQUENCE_MAX_DEPTH",
+        description="Profundidade máxima de uma cascata de consequências"
+    )
+    CONSEQUENCE_MAX_FAN_OUT: int = Field(
+        20,
+        env="CONSEQUENCE_MAX_FAN_OUT",
+        description="Máximo de consequências irmãs geradas por um único evento"
+    )
+    CONSEQUENCE_FORBID_REPEATED_TYPES: bool = Field(
+        False,
+        env="CONSEQUENCE_FORBID_REPEATED_TYPES",
+        description="Descarta (como ciclo) consequências cujo tipo já aparece na cadeia de ancestrais, incluindo o tipo do evento gatilho"
+    )
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = Field(
+        86400,
+        env="IDEMPOTENCY_KEY_TTL_SECONDS",
+        description="Por quanto tempo uma Idempotency-Key é lembrada no MongoDB (índice TTL)"
+    )
+    IDEMPOTENCY_HOT_CACHE_SIZE: int = Field(
+        10000,
+        env="IDEMPOTENCY_HOT_CACHE_SIZE",
+        description="Máximo de Idempotency-Keys concluídas mantidas em memória por processo"
+    )
+    IDEMPOTENCY_HOT_TTL_SECONDS: float = Field(
+        600,
+        env="IDEMPOTENCY_HOT_TTL_SECONDS",
+        description="TTL (s) das Idempotency-Keys mantidas em memória"
+    )
+    IDEMPOTENCY_LEASE_SECONDS: float = Field(
+        60,
+        env="IDEMPOTENCY_LEASE_SECONDS",
+        description="Validade (s) de uma Idempotency-Key em processamento; depois disso uma nova tentativa assume a chave"
+    )
+    SEQUENCE_GAP_SETTLE_SECONDS: float = Field(
+        10,
+        env="SEQUENCE_GAP_SETTLE_SECONDS",
+        description="Tempo (s) após o qual um buraco na sequência dos logs é considerado definitivo (escrita falhou) no /timeline/changes"
+    )
+    TIMELINE_COUNT_CACHE_TTL_SECONDS: float = Field(
+        30,
+        env="TIMELINE_COUNT_CACHE_TTL_SECONDS",
+        description="TTL (s) das contagens estimadas do /timeline por assinatura de filtro"
+    )
+    TIMELINE_COUNT_CACHE_SIZE: int = Field(
+        1000,
+        env="TIMELINE_COUNT_CACHE_SIZE",
+        description="Máximo de assinaturas de filtro com contagem em cache"
+    )
+    INDEX_RECONCILE_ON_STARTUP: bool = Field(
+        True,
+        env="INDEX_RECONCILE_ON_STARTUP",
+        description="Cria em background, no startup, os índices do registro que faltam"
+    )
+    TIMELINE_EXPORT_BATCH_SIZE: int = Field(
+        2000,
+        env="TIMELINE_EXPORT_BATCH_SIZE",
+        description="Documentos por batch do cursor Mongo no /timeline/export"
+    )
+    READ_VALIDATION_SAMPLE_RATE: float = Field(
+        0.01,
+        env="READ_VALIDATION_SAMPLE_RATE",
+        description="Fração dos documentos lidos que ainda passa por validação Pydantic completa (1.0 = todos)"
+    )
+    LOG_ROLLUPS_ENABLED: bool = Field(
+        True,
+        env="LOG_ROLLUPS_ENABLED",
+        description="Mantém, a cada escrita de LogEvent, os contadores por minuto/hora/dia do /timeline/stats"
+    )
+    LINEAGE_MAX_DEPTH: int = Field(
+        10,
+        env="LINEAGE_MAX_DEPTH",
+        description="Profundidade máxima (níveis) do /timeline/{id}/lineage"
+    )
+    LINEAGE_MAX_NODES: int = Field(
+        1000,
+        env="LINEAGE_MAX_NODES",
+        description="Máximo de eventos retornados por /timeline/{id}/lineage"
+    )
+    TIMELINE_CACHE_ENABLED: bool = Field(
+        True,
+        env="TIMELINE_CACHE_ENABLED",
+        description="Cache em memória das respostas do /timeline, invalidado pelas escritas de LogEvent"
+    )
+    TIMELINE_CACHE_MAX_ENTRIES: int = Field(
+        1000,
+        env="TIMELINE_CACHE_MAX_ENTRIES",
+        description="Máximo de respostas do /timeline em cache (LRU)"
+    )
+    TIMELINE_CACHE_TTL_SECONDS: float = Field(
+        5,
+        env="TIMELINE_CACHE_TTL_SECONDS",
+        description="TTL (s) das respostas em cache; limita a defasagem em relação a escritas de outros processos"
+    )
+    STATE_CACHE_MAX_ENTRIES: int = Field(
+        10000,
+        env="STATE_CACHE_MAX_ENTRIES",
+        description="Máximo de documentos de current-state em cache por coleção (LRU)"
+    )
+    STATE_CACHE_TTL_SECONDS: float = Field(
+        30,
+        env="STATE_CACHE_TTL_SECONDS",
+        description="TTL (s) dos documentos de current-state em cache; limita a defasagem frente a escritas de outros processos"
+    )
+    QUERY_BATCH_GET_MAX_IDS: int = Field(
+        100,
+        env="QUERY_BATCH_GET_MAX_IDS",
+        description="Máximo de ids por chamada de /query/inventory:batchGet e /query/orders:batchGet"
+    )
+    NAME_SEARCH_MATCH_MODE: Literal["contains", "prefix", "regex"] = Field(
+        "regex",
+        env="NAME_SEARCH_MATCH_MODE",
+        description="match_mode padrão das buscas por nome/orderRef em /query; use 'contains' só depois de rodar scripts/backfill_name_search.py"
+    )
+    STATE_SNAPSHOTS_ENABLED: bool = Field(
+        False,
+        env="STATE_SNAPSHOTS_ENABLED",
+        description="Grava snapshots periódicos das coleções de current-state"
+    )
+    STATE_SNAPSHOT_INTERVAL_SECONDS: float = Field(
+        3600,
+        env="STATE_SNAPSHOT_INTERVAL_SECONDS",
+        description="Intervalo (s) entre snapshots; limita quantos eventos uma recuperação precisa reaplicar"
+    )
+    STATE_SNAPSHOT_RETENTION: int = Field(
+        24,
+        env="STATE_SNAPSHOT_RETENTION",
+        description="Quantidade de snapshots mantidos por coleção"
+    )
+    STATE_UPDATE_LANES: int = Field(
+        16,
+        env="STATE_UPDATE_LANES",
+        description="Lanes do scheduler por agregado: atualizações do mesmo agregado em ordem, agregados distintos em paralelo"
+    )
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -21,6 +21,9 @@ from .actions import (
     AcionarLogEventActionAPIPayload,
     LogAcionadoData,
     CurrentStateOrderStatus,
+    BatchGetRequest,
+    BatchGetResult,
+    BatchGetResponse,
     LogAcionamentoInfo
 )
 
@@ -39,3 +42,14 @@ from .consequences import (
     LogEventConsequenceDetail,
     TriggeredConsequenceData
 )
+
+# Import and export models from timeline.py
+from .timeline import (
+    TimelineQueryResponse,
+    TimelineChangesResponse,
+    TimelineSeqGap,
+    TimelineStatsBucket,
+    TimelineStatsResponse,
+    LineageEdge,
+    LineageResponse
+)
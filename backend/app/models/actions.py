@@ -20,6 +20,7 @@ class LogEvent(BaseModel):
     event_type: str = Field(..., description="Type of log event")
     user_id: str = Field(..., description="User who created the event")
     details: Dict[str, Any] = Field(default_factory=dict, description="Event specific details")
+    seq: Optional[int] = Field(None, description="Global monotonic sequence number, assigned on persistence")
     
     model_config = {
         "json_encoders": {datetime: lambda dt: dt.isoformat()}
@@ -47,6 +48,19 @@ class CurrentStateOrderStatus(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow, description="When last updated")
     details: Dict[str, Any] = Field(default_factory=dict, description="Additional status details")
 
+class BatchGetRequest(BaseModel):
+    """Ids to fetch in one batchGet call"""
+    ids: List[str] = Field(..., min_length=1, description="Document ids; duplicates are returned once")
+
+class BatchGetResult(BaseModel):
+    """Outcome of one id of a batchGet call"""
+    status: str = Field(..., description="found, not_found, forbidden or error (stored document failed validation)")
+    item: Optional[Dict[str, Any]] = Field(None, description="The document, when status is found")
+
+class BatchGetResponse(BaseModel):
+    """batchGet results keyed by requested id"""
+    results: Dict[str, BatchGetResult] = Field(default_factory=dict, description="One entry per distinct requested id")
+
 class LogAcionamentoInfo(BaseModel):
     """Information about a log activation"""
     log_id: str = Field(..., description="ID of the log")
@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from .actions import LogEvent
+
+class TimelineQueryResponse(BaseModel):
+    """Paginated LogLine timeline query result"""
+    events: List[LogEvent] = Field(default_factory=list, description="Events of the requested page")
+    total_count: Optional[int] = Field(None, description="Number of events matching the filters (approximate with count_mode=estimated, null with count_mode=none)")
+    count_mode: str = Field("exact", description="How total_count was computed: exact, estimated or none")
+    has_more: bool = Field(False, description="Whether there are more events after this page")
+    limit: int = Field(..., description="Page size used")
+    skip: int = Field(..., description="Number of events skipped")
+    next_cursor: Optional[str] = Field(None, description="Pass as 'cursor' to fetch the next page; null on the last page")
+
+class TimelineSeqGap(BaseModel):
+    """Sequence numbers skipped by /timeline/changes because no event was written for them in time"""
+    from_seq: int = Field(..., description="First skipped seq")
+    to_seq: int = Field(..., description="Last skipped seq (inclusive)")
+
+class TimelineChangesResponse(BaseModel):
+    """Events persisted after a given sequence number, in sequence order"""
+    events: List[LogEvent] = Field(default_factory=list, description="Events with seq > since_seq, ascending")
+    next_since_seq: int = Field(..., description="Value to pass as since_seq on the next poll")
+    has_more: bool = Field(False, description="Whether more settled events are already available")
+    gaps: List[TimelineSeqGap] = Field(default_factory=list, description="Holes skipped in this page as presumed failed writes; a late write may still fill one, polling again from since_seq = from_seq - 1 picks it up (events already received come back, dedupe by id)")
+
+class TimelineStatsBucket(BaseModel):
+    """Event count of one time bucket (and group, when grouped)"""
+    bucket: datetime = Field(..., description="Bucket start (UTC)")
+    type: Optional[str] = Field(None, description="Event type, when grouped by type")
+    channel: Optional[str] = Field(None, description="Channel, when grouped by channel ('' = no channel)")
+    author: Optional[str] = Field(None, description="Author, when grouped by author")
+    count: int = Field(..., description="Number of events")
+
+class TimelineStatsResponse(BaseModel):
+    """Pre-aggregated event volume over time"""
+    granularity: str = Field(..., description="Bucket size: minute, hour or day")
+    group_by: List[str] = Field(default_factory=list, description="Dimensions the counts are split by")
+    buckets: List[TimelineStatsBucket] = Field(default_factory=list, description="Buckets in ascending time order")
+
+class LineageEdge(BaseModel):
+    """Causal link: `child_id` was triggered by `parent_id`"""
+    parent_id: str = Field(..., description="Triggering event")
+    child_id: str = Field(..., description="Consequence event")
+
+class LineageResponse(BaseModel):
+    """Causal DAG around one LogEvent"""
+    root: LogEvent = Field(..., description="Event the traversal started from")
+    direction: str = Field(..., description="'down' (consequences) or 'up' (causes)")
+    nodes: List[LogEvent] = Field(default_factory=list, description="Events reached, level by level")
+    edges: List[LineageEdge] = Field(default_factory=list, description="Parent/child links between root and nodes")
+    depth_reached: int = Field(0, description="Number of levels traversed")
+    truncated: bool = Field(False, description="Whether the depth or node cap cut the traversal short")
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from loguru import logger
+from prometheus_client import Gauge, Histogram
+
+from app.services.aggregates import aggregate_hash
+
+STATE_UPDATE_LANE_DEPTH = Gauge(
+    "state_update_lane_queue_depth",
+    "Atualizações de estado aguardando em cada lane do scheduler por agregado",
+    ["lane"],
+)
+STATE_UPDATE_LANE_WAIT = Histogram(
+    "state_update_lane_wait_seconds",
+    "Tempo que uma atualização de estado esperou na fila da sua lane antes de executar",
+    ["lane"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+_Job = Tuple[Callable[[], Awaitable[Any]], asyncio.Future, float]
+
+
+class AggregateScheduler:
+    """
+    Runs async jobs in order per aggregate and in parallel across aggregates.
+
+    Each job goes to lane `aggregate_hash(key) % lanes`; a lane runs its jobs one at a
+    time, in submission order, so two updates of the same order or product never
+    interleave while different aggregates proceed on the other lanes. `submit` resolves
+    with the job's result (or raises its exception) once it has run. Lanes start on the
+    first submission, inside the running event loop.
+    """
+
+    def __init__(self, lanes: int = 16):
+        self.lanes = max(lanes, 1)
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+        self._closed = False
+
+    def lane_of(self, aggregate_key: str) -> int:
+        return aggregate_hash(aggregate_key) % self.lanes
+
+    def _ensure_started(self) -> None:
+        if self._workers:
+            return
+        self._queues = [asyncio.Queue() for _ in range(self.lanes)]
+        self._workers = [asyncio.create_task(self._run_lane(lane)) for lane in range(self.lanes)]
+        logger.info(f"Aggregate scheduler started with {self.lanes} lanes.")
+
+    async def submit(self, aggregate_key: str, job: Callable[[], Awaitable[Any]]) -> Any:
+        if self._closed:
+            raise RuntimeError("AggregateScheduler is closed")
+        self._ensure_started()
+        lane = self.lane_of(aggregate_key)
+        future = asyncio.get_running_loop().create_future()
+        self._queues[lane].put_nowait((job, future, time.perf_counter()))
+        STATE_UPDATE_LANE_DEPTH.labels(lane=str(lane)).set(self._queues[lane].qsize())
+        return await future
+
+    def queue_depths(self) -> List[int]:
+        return [queue.qsize() for queue in self._queues] or [0] * self.lanes
+
+    async def _run_lane(self, lane: int) -> None:
+        queue = self._queues[lane]
+        label = str(lane)
+        while True:
+            job, future, enqueued_at = await queue.get()
+            STATE_UPDATE_LANE_DEPTH.labels(lane=label).set(queue.qsize())
+            STATE_UPDATE_LANE_WAIT.labels(lane=label).observe(time.perf_counter() - enqueued_at)
+            try:
+                # The job runs even if its caller stopped waiting: the event is already
+                # persisted and later jobs of the aggregate must not overtake it.
+                result = await job()
+                if not future.done():
+                    future.set_result(result)
+            except Exception as exc:
+                if not future.done():
+                    future.set_exception(exc)
+            finally:
+                queue.task_done()
+
+    async def close(self) -> None:
+        """Waits for every queued job, then stops the lanes and refuses new submissions."""
+        self._closed = True
+        for queue in self._queues:
+            await queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queues = []
@@ -0,0 +1,69 @@
+import zlib
+from typing import Any, Dict, List, Optional
+
+# Keys in LogEvent.data that identify the aggregate (current-state object) an event
+# belongs to, in priority order. Events about the same aggregate must be applied in order.
+AGGREGATE_ID_FIELDS = (
+    ("order_id", "order"),
+    ("product_id", "product"),
+    ("despacho_id", "despacho"),
+    ("target_prelog_id", "prelog"),
+    ("prelog_id", "prelog"),
+)
+
+# Keys in LogEvent.data that point at another LogEvent. An event carrying one changes the
+# state of the referenced event's aggregate (e.g. a litigation opened on a sale is pushed
+# onto that order), so it belongs to that aggregate.
+REFERENCE_FIELDS = ("target_log_id",)
+
+
+def aggregate_key_for_event(event_type: str, data: Optional[Dict[str, Any]], event_id: str) -> str:
+    """
+    Returns the aggregate key (e.g. 'order:ord_123', 'product:prod_001') of an event.
+    Events that do not touch a known aggregate get their own key, 'log:<event_id>'.
+    Ignores REFERENCE_FIELDS; see `resolve_aggregate_keys` for events that have them.
+    """
+    data = data or {}
+    for field, prefix in AGGREGATE_ID_FIELDS:
+        value = data.get(field)
+        if value:
+            return f"{prefix}:{value}"
+    return f"log:{event_id}"
+
+
+def referenced_log_id(data: Optional[Dict[str, Any]]) -> Optional[str]:
+    data = data or {}
+    for field in REFERENCE_FIELDS:
+        if data.get(field):
+            return data[field]
+    return None
+
+
+def stored_aggregate_key(log_doc: Dict[str, Any]) -> str:
+    """Aggregate key of a persisted log document: the one resolved when it was recorded."""
+    return log_doc.get("aggregate_key") or aggregate_key_for_event(log_doc.get("type"), log_doc.get("data"), log_doc.get("id"))
+
+
+async def resolve_aggregate_keys(logs, documents: List[Dict[str, Any]]) -> None:
+    """
+    Stamps `aggregate_key` on log documents about to be written. An event referencing
+    another log (REFERENCE_FIELDS) takes the referenced event's aggregate key, looked up
+    with one query per call (or taken from an earlier document of the list); when that event is unknown the key is 'log:<referenced id>'.
+    """
+    references = {referenced_log_id(doc.get("data")) for doc in documents} - {None}
+    targets: Dict[str, str] = {}
+    if references:
+        cursor = logs.find({"id": {"$in": list(references)}}, {"id": 1, "type": 1, "data": 1, "aggregate_key": 1})
+        targets = {target["id"]: stored_aggregate_key(target) async for target in cursor}
+    for doc in documents:
+        reference = referenced_log_id(doc.get("data"))
+        if reference:
+            doc["aggregate_key"] = targets.get(reference, f"log:{reference}")
+        else:
+            doc["aggregate_key"] = aggregate_key_for_event(doc.get("type"), doc.get("data"), doc.get("id"))
+        targets[doc.get("id")] = doc["aggregate_key"]  # later documents of the same write may reference it
+
+
+def aggregate_hash(aggregate_key: str) -> int:
+    """Stable (cross-process) hash of an aggregate key, used to partition work."""
+    return zlib.crc32(aggregate_key.encode("utf-8"))
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from prometheus_client import Counter, Gauge, Histogram
+
+CONSEQUENCE_QUEUE_DEPTH = Gauge(
+    "consequence_queue_depth",
+    "Lotes de eventos de consequência aguardando na fila do engine",
+)
+CONSEQUENCE_QUEUE_LAG = Histogram(
+    "consequence_queue_lag_seconds",
+    "Tempo entre o enfileiramento de um lote de consequências e o início do processamento",
+)
+CONSEQUENCE_EVENTS_TOTAL = Counter(
+    "consequence_events_total",
+    "Eventos de consequência sugeridos, por resultado",
+    ["result"],
+)
+
+
+@dataclass
+class ConsequencePlan:
+    """Consequences allowed to be recorded, plus the lineage meta each of them inherits."""
+    suggestions: List[Dict[str, Any]]
+    lineage_meta: Dict[str, Any]
+    dropped: Dict[str, int] = field(default_factory=dict)
+
+
+def plan_consequences(
+    triggering_id: str,
+    triggering_type: str,
+    triggering_meta: Optional[Dict[str, Any]],
+    suggestions: List[Dict[str, Any]],
+    max_depth: int,
+    max_fan_out: int,
+    forbid_repeated_types: bool = False,
+) -> ConsequencePlan:
+    """
+    Applies the cascade guards to the consequences suggested for one event:
+    - depth: a consequence chain may not grow beyond `max_depth` levels;
+    - fan-out: at most `max_fan_out` siblings per triggering event;
+    - cycles: the triggering id may not already be among its own ancestors
+      (`meta.consequence_chain`, built from `triggered_by_log_id`).
+    With `forbid_repeated_types` (CONSEQUENCE_FORBID_REPEATED_TYPES), a consequence whose
+    type already appears in its ancestry, the triggering type included, is also dropped
+    as a cycle. Off by default: legitimate chains may repeat a type (e.g. a stock
+    adjustment suggesting another one for a different product), and depth already
+    bounds real type cycles.
+    """
+    meta = triggering_meta or {}
+    parent_chain: List[str] = list(meta.get("consequence_chain") or [])
+    parent_types: List[str] = list(meta.get("consequence_type_chain") or [])
+    depth = int(meta.get("consequence_depth") or 0) + 1
+    plan = ConsequencePlan(
+        suggestions=[],
+        lineage_meta={
+            "consequence_depth": depth,
+            "consequence_chain": parent_chain + [triggering_id],
+            "consequence_type_chain": parent_types + [triggering_type],
+        },
+    )
+
+    if triggering_id in parent_chain:
+        plan.dropped["cycle"] = len(suggestions)
+        return plan
+    if depth > max_depth:
+        plan.dropped["max_depth"] = len(suggestions)
+        return plan
+
+    ancestry_types = set(plan.lineage_meta["consequence_type_chain"]) if forbid_repeated_types else set()
+    for suggestion in suggestions:
+        if suggestion["event_type"] in ancestry_types:
+            plan.dropped["cycle"] = plan.dropped.get("cycle", 0) + 1
+        elif len(plan.suggestions) >= max_fan_out:
+            plan.dropped["max_fan_out"] = plan.dropped.get("max_fan_out", 0) + 1
+        else:
+            plan.suggestions.append(suggestion)
+    return plan
+
+
+@dataclass
+class _ConsequenceJob:
+    triggering_event: Any
+    suggestions: List[Dict[str, Any]]
+    enqueued_at: float
+
+
+class ConsequenceEngine:
+    """
+    Bounded work queue for system consequence events.
+
+    `submit()` never blocks the caller: when the queue is full the batch is dropped
+    and counted. `concurrency` workers drain the queue and hand each batch of sibling
+    consequences to `record_consequences`, which records them in one write; cascades
+    come back through `submit()` from inside that call.
+    """
+
+    def __init__(
+        self,
+        record_consequences: Callable[[Any, List[Dict[str, Any]]], Awaitable[Any]],
+        concurrency: int = 4,
+        max_queue_size: int = 10000,
+    ):
+        self.record_consequences = record_consequences
+        self.concurrency = max(concurrency, 1)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._workers: List[asyncio.Task] = []
+
+    def submit(self, triggering_event: Any, suggestions: List[Dict[str, Any]]) -> bool:
+        if not suggestions:
+            return True
+        try:
+            self.queue.put_nowait(_ConsequenceJob(triggering_event, list(suggestions), time.monotonic()))
+        except asyncio.QueueFull:
+            logger.critical(
+                f"Consequence queue full; dropping {len(suggestions)} consequences of event {getattr(triggering_event, 'id', '?')}."
+            )
+            CONSEQUENCE_EVENTS_TOTAL.labels(result="queue_full").inc(len(suggestions))
+            return False
+        CONSEQUENCE_QUEUE_DEPTH.set(self.queue.qsize())
+        return True
+
+    def start(self) -> None:
+        self._workers = [asyncio.create_task(self._run_worker(i)) for i in range(self.concurrency)]
+        logger.info(f"Consequence engine started with {self.concurrency} workers.")
+
+    async def stop(self, drain: bool = True) -> None:
+        """Stops the workers, by default after the queue (including cascades) is drained."""
+        if drain:
+            await self.queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Consequence engine stopped.")
+
+    async def _run_worker(self, worker_id: int) -> None:
+        while True:
+            job: _ConsequenceJob = await self.queue.get()
+            CONSEQUENCE_QUEUE_DEPTH.set(self.queue.qsize())
+            CONSEQUENCE_QUEUE_LAG.observe(time.monotonic() - job.enqueued_at)
+            try:
+                await self.record_consequences(job.triggering_event, job.suggestions)
+            except Exception as e:
+                logger.critical(
+                    f"Consequence worker {worker_id} failed to record {len(job.suggestions)} consequences of event "
+                    f"{getattr(job.triggering_event, 'id', '?')}: {e}"
+                )
+                CONSEQUENCE_EVENTS_TOTAL.labels(result="failed").inc(len(job.suggestions))
+            finally:
+                self.queue.task_done()
+
+
+def count_plan_outcome(plan: ConsequencePlan) -> Tuple[int, int]:
+    """Feeds a plan's dropped counts into the metrics; returns (kept, dropped)."""
+    for reason, count in plan.dropped.items():
+        CONSEQUENCE_EVENTS_TOTAL.labels(result=f"dropped_{reason}").inc(count)
+    return len(plan.suggestions), sum(plan.dropped.values())
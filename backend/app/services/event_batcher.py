@@ -0,0 +1,145 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorCollection
+from prometheus_client import Histogram
+from pymongo.errors import BulkWriteError
+
+LOG_BATCH_FLUSH_SIZE = Histogram(
+    "log_batch_flush_size",
+    "Quantidade de LogEvents gravados por flush do group-commit",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+LOG_BATCH_FLUSH_LATENCY = Histogram(
+    "log_batch_flush_latency_seconds",
+    "Latência do insert_many de cada flush do group-commit",
+)
+
+
+class EventBatcher:
+    """
+    Group-commit for the `logs` collection.
+
+    Concurrent callers hand over their documents with `submit()`; documents that
+    arrive within `window_ms` of each other (or until `max_batch_size` is reached)
+    are written with a single `insert_many(ordered=True)`. Each caller's await
+    resolves only once its own document is durable, or raises the write error
+    that affected it. `before_write` runs on every batch right before it is written
+    (e.g. to allocate sequence numbers for the whole batch at once); `after_write`
+    gets the documents that became durable, once per flush. A failing `after_write`
+    is logged and never fails the callers, whose documents are already persisted.
+    """
+
+    def __init__(
+        self,
+        collection: AsyncIOMotorCollection,
+        window_ms: float = 5.0,
+        max_batch_size: int = 500,
+        before_write: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+        after_write: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.collection = collection
+        self.window_seconds = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max_batch_size
+        self.before_write = before_write
+        self.after_write = after_write
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flush_lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        # Size-triggered flushes; referenced until done so they are not collected mid-write.
+        self._flush_tasks: Set[asyncio.Task] = set()
+        self._closed = False
+
+    async def submit(self, document: Dict[str, Any]) -> None:
+        """Queues one document for the next flush and waits until it is persisted."""
+        if self._closed:
+            raise RuntimeError("EventBatcher is closed")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((document, future))
+        if len(self._pending) >= self.max_batch_size:
+            task = asyncio.create_task(self.flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_task_done)
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_after_window())
+        await future
+
+    def _flush_task_done(self, task: asyncio.Task) -> None:
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Group-commit flush task failed: {task.exception()}")
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window_seconds)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Writes everything pending, one `insert_many` per `max_batch_size` documents."""
+        async with self._flush_lock:
+            while self._pending:
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:len(batch)]
+                await self._write_batch(batch)
+
+    async def _write_batch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        documents = [doc for doc, _ in batch]
+        started = time.perf_counter()
+        try:
+            if self.before_write:
+                await self.before_write(documents)
+            await self.collection.insert_many(documents, ordered=True)
+        except BulkWriteError as bwe:
+            # Ordered insert: everything before the first failing index is durable,
+            # the failing document gets the error, the remainder was never attempted.
+            write_errors = bwe.details.get("writeErrors") or [{}]
+            failed_index = write_errors[0].get("index", 0)
+            logger.warning(f"Group-commit flush failed at index {failed_index}/{len(batch)}: {write_errors[0].get('errmsg')}")
+            for _, future in batch[:failed_index]:
+                _resolve(future)
+            if failed_index < len(batch):
+                _reject(batch[failed_index][1], bwe)
+            # Put the untried tail back at the front so it goes out with the next flush.
+            self._pending[:0] = batch[failed_index + 1:]
+            await self._after_write(documents[:failed_index])
+            return
+        except Exception as exc:
+            logger.error(f"Group-commit flush of {len(batch)} events failed: {exc}")
+            for _, future in batch:
+                _reject(future, exc)
+            return
+        finally:
+            LOG_BATCH_FLUSH_LATENCY.observe(time.perf_counter() - started)
+            LOG_BATCH_FLUSH_SIZE.observe(len(batch))
+
+        for _, future in batch:
+            _resolve(future)
+        await self._after_write(documents)
+
+    async def _after_write(self, documents: List[Dict[str, Any]]) -> None:
+        if not self.after_write or not documents:
+            return
+        try:
+            await self.after_write(documents)
+        except Exception as exc:
+            logger.error(f"Group-commit after_write hook failed for {len(documents)} events: {exc}")
+
+    async def close(self) -> None:
+        """Flushes what is still pending, waits for flushes in flight and refuses new submissions."""
+        self._closed = True
+        in_flight = [*self._flush_tasks, *([self._timer] if self._timer is not None else [])]
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        await self.flush()
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _reject(future: asyncio.Future, exc: BaseException) -> None:
+    if not future.done():
+        future.set_exception(exc)
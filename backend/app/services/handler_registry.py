@@ -0,0 +1,146 @@
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Type
+
+from loguru import logger
+from prometheus_client import Counter, Gauge, Histogram
+from pydantic import BaseModel
+
+STATE_HANDLER_LATENCY = Histogram(
+    "state_handler_latency_seconds",
+    "Latência de cada handler do StateUpdaterService, por tipo de evento",
+    ["event_type"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+STATE_HANDLER_ERRORS = Counter(
+    "state_handler_errors_total",
+    "Falhas de handlers do StateUpdaterService (inclui event.data inválido), por tipo de evento",
+    ["event_type"],
+)
+STATE_HANDLER_RATE = Gauge(
+    "state_handler_events_per_second",
+    "Eventos por segundo aplicados por handler nos últimos RATE_WINDOW_SECONDS (calculado na leitura)",
+    ["event_type"],
+)
+
+RATE_WINDOW_SECONDS = 10.0
+LATENCY_SAMPLE_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class HandlerSpec:
+    """
+    How the events of one `LogEvent.type` change current state. `handler` is the
+    (unbound) service method, called as `handler(service, event, result, data)` with
+    `event.data` already validated as `data_model`. `target_collection` is the
+    current-state collection the handler writes, or None when it depends on the event.
+    """
+    event_type: str
+    handler: Callable[..., Awaitable[Any]]
+    data_model: Optional[Type[BaseModel]] = None
+    target_collection: Optional[str] = None
+
+
+class HandlerStats:
+    """
+    In-process latency, error and throughput figures of one handler. Calls are counted
+    in one-second buckets; the rate is computed when read, over the buckets of the last
+    RATE_WINDOW_SECONDS, so it drops to 0 once the handler stops receiving events.
+    """
+
+    def __init__(self, event_type: str):
+        self.event_type = event_type
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.recent: Deque[float] = deque(maxlen=LATENCY_SAMPLE_SIZE)
+        self._rate_buckets: Deque[List[int]] = deque()  # [second, calls], oldest first
+        STATE_HANDLER_RATE.labels(event_type=event_type).set_function(self.events_per_second)
+
+    def observe(self, seconds: float, failed: bool) -> None:
+        self.calls += 1
+        self.errors += failed
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.recent.append(seconds)
+        second = int(time.monotonic())
+        if self._rate_buckets and self._rate_buckets[-1][0] == second:
+            self._rate_buckets[-1][1] += 1
+        else:
+            self._rate_buckets.append([second, 1])
+        self._expire_rate_buckets(second)
+
+    def _expire_rate_buckets(self, second: int) -> None:
+        while self._rate_buckets and self._rate_buckets[0][0] <= second - RATE_WINDOW_SECONDS:
+            self._rate_buckets.popleft()
+
+    def events_per_second(self) -> float:
+        self._expire_rate_buckets(int(time.monotonic()))
+        return sum(calls for _, calls in self._rate_buckets) / RATE_WINDOW_SECONDS
+
+    def summary(self) -> Dict[str, Any]:
+        recent = sorted(self.recent)
+        p95 = recent[min(int(len(recent) * 0.95), len(recent) - 1)] if recent else 0.0
+        return {
+            "event_type": self.event_type,
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_ms": round(1000 * self.total_seconds / self.calls, 3) if self.calls else 0.0,
+            "p95_ms": round(1000 * p95, 3),
+            "max_ms": round(1000 * self.max_seconds, 3),
+            "events_per_second": round(self.events_per_second(), 3),
+        }
+
+
+class HandlerRegistry:
+    """
+    Dispatch table from `LogEvent.type` to its HandlerSpec, filled once when the state
+    updater module is loaded, so applying an event is one dict lookup. Every dispatch
+    is timed and counted per event type.
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, HandlerSpec] = {}
+        self._stats: Dict[str, HandlerStats] = {}
+
+    def register(self, spec: HandlerSpec) -> None:
+        if spec.event_type in self._specs:
+            raise ValueError(f"A state handler is already registered for '{spec.event_type}'")
+        self._specs[spec.event_type] = spec
+        self._stats[spec.event_type] = HandlerStats(spec.event_type)
+
+    def get(self, event_type: str) -> Optional[HandlerSpec]:
+        return self._specs.get(event_type)
+
+    def event_types(self) -> List[str]:
+        return list(self._specs)
+
+    async def dispatch(self, service: Any, event: Any, result: Any) -> bool:
+        """Runs the handler of `event.type`; False when none is registered. Handler errors propagate."""
+        spec = self._specs.get(event.type)
+        if spec is None:
+            return False
+        started = time.perf_counter()
+        failed = True
+        try:
+            try:
+                data = spec.data_model(**(event.data or {})) if spec.data_model else event.data
+            except Exception as e:
+                logger.bind(event_id=event.id, event_type=event.type).error(f"Malformed event.data: {e}")
+                raise
+            await spec.handler(service, event, result, data)
+            failed = False
+        finally:
+            elapsed = time.perf_counter() - started
+            STATE_HANDLER_LATENCY.labels(event_type=event.type).observe(elapsed)
+            if failed:
+                STATE_HANDLER_ERRORS.labels(event_type=event.type).inc()
+            self._stats[event.type].observe(elapsed, failed)
+        return True
+
+    def slowest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Handlers that ran in this process, slowest p95 first."""
+        summaries = [stats.summary() for stats in self._stats.values() if stats.calls]
+        return sorted(summaries, key=lambda s: (s["p95_ms"], s["mean_ms"]), reverse=True)[:limit]
@@ -0,0 +1,109 @@
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.utils.cache import TTLCache
+
+IDEMPOTENCY_COLLECTION = "idempotency_keys"
+
+
+def payload_fingerprint(event_type: str, data: Optional[Dict[str, Any]]) -> str:
+    """
+    Fingerprint of what an idempotent request records: its event `type` and `data`.
+    `meta` is left out, since retries legitimately carry new trace ids.
+    """
+    canonical = json.dumps({"type": event_type, "data": data or {}}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Remembers which LogEvent an idempotency key produced.
+
+    The durable record lives in `idempotency_keys`, keyed by `_id` (unique), and
+    expires through a TTL index on `created_at`. It carries the fingerprint of the
+    payload that claimed it, so a key reused for a different payload can be rejected.
+    Completed keys are also kept in a hot in-process TTL cache so that retries are
+    answered without a Mongo round-trip.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        hot_max_entries: int = 10000,
+        hot_ttl_seconds: float = 600.0,
+        lease_seconds: float = 60.0,
+    ):
+        self.collection = db[IDEMPOTENCY_COLLECTION]
+        self.hot: TTLCache = TTLCache(max_entries=hot_max_entries, ttl_seconds=hot_ttl_seconds)
+        self.lease = timedelta(seconds=lease_seconds)
+
+    def get_hot(self, key: str) -> Optional[Tuple[str, Any]]:
+        """(fingerprint, result) cached in this process for a completed key, if any."""
+        return self.hot.get(key)
+
+    async def claim(self, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Claims `key` for a new recording of the payload with `fingerprint`. Returns None
+        when the claim succeeded, otherwise the existing record (`status` 'pending' while
+        another request is still recording it, 'completed' with its `log_event_id`
+        afterwards). A pending claim is a lease: once its `locked_until` has passed (the
+        recording crashed, or its release failed) the next request takes it over.
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.insert_one({
+                "_id": key, "status": "pending", "fingerprint": fingerprint,
+                "locked_until": now + self.lease, "created_at": now,
+            })
+            return None
+        except DuplicateKeyError:
+            existing = await self.collection.find_one({"_id": key})
+            if existing is None:
+                # Expired or released between the insert and the read; retry once.
+                return await self.claim(key, fingerprint)
+            if existing.get("status") != "pending" or not _lease_expired(existing, now, self.lease):
+                return existing
+            taken_over = await self.collection.find_one_and_update(
+                {"_id": key, "status": "pending", "locked_until": existing.get("locked_until")},
+                {"$set": {"fingerprint": fingerprint, "locked_until": now + self.lease}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if taken_over is None:
+                return await self.collection.find_one({"_id": key}) or existing
+            logger.warning(f"Idempotency key '{key}' taken over after its pending claim expired")
+            return None
+
+    async def complete(self, key: str, fingerprint: str, log_event_id: str, result: Any) -> None:
+        await self.collection.update_one(
+            {"_id": key},
+            {
+                "$set": {"status": "completed", "log_event_id": log_event_id, "completed_at": datetime.now(timezone.utc)},
+                "$unset": {"locked_until": ""},
+            },
+        )
+        self.hot.set(key, (fingerprint, result))
+
+    def remember(self, key: str, fingerprint: str, result: Any) -> None:
+        self.hot.set(key, (fingerprint, result))
+
+    async def release(self, key: str) -> None:
+        """Drops a pending claim after a failed recording so the client can retry."""
+        try:
+            await self.collection.delete_one({"_id": key, "status": "pending"})
+        except Exception as e:
+            logger.error(f"Failed to release idempotency key '{key}' (it is freed when its lease expires): {e}")
+
+
+def _lease_expired(record: Dict[str, Any], now: datetime, lease: timedelta) -> bool:
+    # Claims written before leases existed only have `created_at`.
+    locked_until = record.get("locked_until") or (record.get("created_at") or now) + lease
+    if locked_until.tzinfo is None:
+        locked_until = locked_until.replace(tzinfo=timezone.utc)
+    return locked_until <= now
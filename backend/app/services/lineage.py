@@ -0,0 +1,86 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+_WITNESS_PREFIX = "log_event:"
+_NODE_PROJECTION = {"search_tokens": 0}
+
+
+@dataclass
+class LineageResult:
+    root: Dict[str, Any]
+    nodes: List[Dict[str, Any]] = field(default_factory=list)
+    edges: List[Tuple[str, str]] = field(default_factory=list)
+    depth_reached: int = 0
+    truncated: bool = False
+
+
+def parent_id_of(doc: Dict[str, Any]) -> Optional[str]:
+    """Id of the event that triggered `doc`: `meta.triggered_by_log_id`, else a `log_event:<id>` witness."""
+    parent_id = (doc.get("meta") or {}).get("triggered_by_log_id")
+    if parent_id:
+        return parent_id
+    witness = doc.get("witness") or ""
+    return witness[len(_WITNESS_PREFIX):] if witness.startswith(_WITNESS_PREFIX) else None
+
+
+async def traverse_lineage(
+    collection: AsyncIOMotorCollection,
+    root: Dict[str, Any],
+    direction: str,
+    max_depth: int,
+    max_nodes: int,
+) -> LineageResult:
+    """
+    Walks the consequence DAG around `root` one level at a time: a single indexed `$in`
+    query per level (`meta.triggered_by_log_id` going down, `id` going up), so a chain of
+    depth N costs N round-trips whatever its width. Already visited ids are excluded from
+    each level, so cycles terminate. Stops at `max_depth` levels or `max_nodes` events;
+    `truncated` tells whether unvisited events were left out by either cap.
+    Edges are (parent_id, child_id) pairs.
+    """
+    result = LineageResult(root=root)
+    visited: Set[str] = {root["id"]}
+    frontier: List[Dict[str, Any]] = [root]
+
+    for depth in range(1, max_depth + 1):
+        level_filter = _level_filter(frontier, direction, visited)
+        if level_filter is None:
+            return result
+        remaining = max_nodes - len(result.nodes)
+        level_docs = await collection.find(level_filter, _NODE_PROJECTION).sort("timestamp", 1).limit(remaining + 1).to_list(length=remaining + 1)
+        if not level_docs:
+            return result
+        if len(level_docs) > remaining:
+            result.truncated = True
+            level_docs = level_docs[:remaining]
+
+        visited.update(doc["id"] for doc in level_docs)
+        result.nodes.extend(level_docs)
+        if direction == "down":
+            result.edges.extend((parent_id_of(doc), doc["id"]) for doc in level_docs)
+        else:
+            result.edges.extend(
+                (parent_id_of(doc), doc["id"]) for doc in frontier if parent_id_of(doc) in visited
+            )
+        result.depth_reached = depth
+        if result.truncated or not level_docs:
+            return result
+        frontier = level_docs
+
+    # Depth cap reached: report whether the chain goes on beyond it.
+    level_filter = _level_filter(frontier, direction, visited)
+    if level_filter is not None:
+        result.truncated = await collection.find_one(level_filter, {"_id": 1}) is not None
+    return result
+
+
+def _level_filter(frontier: List[Dict[str, Any]], direction: str, visited: Set[str]) -> Optional[Dict[str, Any]]:
+    """Query for the not yet visited neighbours of `frontier`; None when going up from root-less events."""
+    if direction == "down":
+        return {"meta.triggered_by_log_id": {"$in": [doc["id"] for doc in frontier]}, "id": {"$nin": list(visited)}}
+    parent_ids = {parent_id_of(doc) for doc in frontier} - {None} - visited
+    if not parent_ids:
+        return None
+    return {"id": {"$in": list(parent_ids)}}
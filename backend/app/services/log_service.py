@@ -1,3 +1,5 @@
+import asyncio
+import functools
 import logging
 from fastapi import BackgroundTasks, Depends
 from datetime import datetime, timezone
@@ -7,19 +9,213 @@ import uuid
 from app.models import LogEvent, DespachoCreatedData
 from app.core.database import get_database
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError
 
+from app.core.exceptions import IdempotencyConflict, IdempotencyKeyReused
+from app.core.settings import settings
+from app.services.aggregates import resolve_aggregate_keys
+from app.services.consequence_engine import (
+    CONSEQUENCE_EVENTS_TOTAL, ConsequenceEngine, count_plan_outcome, plan_consequences
+)
+from app.services.event_batcher import EventBatcher
+from app.services.idempotency import IdempotencyStore, payload_fingerprint
+from app.services.outbox import OUTBOX_COLLECTION, OutboxDeferred, OutboxWorkerPool, build_outbox_record
+from app.services.rollups import ROLLUPS_COLLECTION, apply_rollups
+from app.services.search_tokens import extract_search_tokens
+from app.services.sequence import COUNTERS_COLLECTION, SequenceAllocator
+from app.services.timeline_cache import timeline_generations
 from app.services.state_updater import StateUpdaterService, get_state_updater_service, StateUpdateResult
 from app.websocket.connection_manager import manager as ws_manager
 from pydantic import BaseModel
+import orjson
 
 logger = logging.getLogger(__name__)
 
+def broadcast_frames(events: List[Dict[str, Any]], max_events: int, max_bytes: int) -> List[List[Dict[str, Any]]]:
+    """
+    Splits serialized events into WebSocket frames of at most `max_events` events and
+    about `max_bytes` of JSON, in order. An event larger than `max_bytes` gets a frame of its own.
+    """
+    frames: List[List[Dict[str, Any]]] = []
+    frame: List[Dict[str, Any]] = []
+    frame_bytes = 0
+    for event in events:
+        size = len(orjson.dumps(event, default=str))
+        if frame and (len(frame) >= max_events or frame_bytes + size > max_bytes):
+            frames.append(frame)
+            frame, frame_bytes = [], 0
+        frame.append(event)
+        frame_bytes += size
+    if frame:
+        frames.append(frame)
+    return frames
+
+
+BULK_IDEMPOTENCY_KEY_ERROR = "meta.idempotency_key is not supported on bulk ingestion; record keyed events one by one (POST /logs)"
+
+
+_sequence_allocator: Optional[SequenceAllocator] = None
+
+
+def get_sequence_allocator(db: AsyncIOMotorDatabase) -> SequenceAllocator:
+    """Process-wide allocator of the global LogEvent `seq`."""
+    global _sequence_allocator
+    if _sequence_allocator is None:
+        _sequence_allocator = SequenceAllocator(db[COUNTERS_COLLECTION])
+    return _sequence_allocator
+
+
+_event_batcher: Optional[EventBatcher] = None
+
+
+def get_event_batcher(db: AsyncIOMotorDatabase) -> EventBatcher:
+    """Process-wide group-commit batcher for the `logs` collection."""
+    global _event_batcher
+    if _event_batcher is None:
+        _event_batcher = EventBatcher(
+            db["logs"],
+            window_ms=settings.LOG_GROUP_COMMIT_WINDOW_MS,
+            max_batch_size=settings.LOG_GROUP_COMMIT_MAX_BATCH,
+            before_write=get_sequence_allocator(db).assign,
+            after_write=functools.partial(_after_logs_written, db),
+        )
+    return _event_batcher
+
+
+async def _after_logs_written(db: AsyncIOMotorDatabase, documents: List[Dict[str, Any]]) -> None:
+    """
+    Non-critical bookkeeping once log documents are durable: invalidates cached timeline
+    responses (generation bump) and updates the rollups. Never raises; a missed rollup
+    increment is repaired by the rollup backfill.
+    """
+    if not documents:
+        return
+    timeline_generations.bump(doc.get("type") for doc in documents)
+    if not settings.LOG_ROLLUPS_ENABLED:
+        return
+    try:
+        await apply_rollups(db[ROLLUPS_COLLECTION], documents)
+    except Exception as e:
+        logger.error(f"Failed to update timeline rollups for {len(documents)} events: {e}")
+
+
+async def close_event_batcher() -> None:
+    global _event_batcher
+    if _event_batcher is not None:
+        await _event_batcher.close()
+        _event_batcher = None
+
+
+_idempotency_store: Optional[IdempotencyStore] = None
+
+
+def get_idempotency_store(db: AsyncIOMotorDatabase) -> IdempotencyStore:
+    """Process-wide idempotency store (durable keys + hot in-memory TTL set)."""
+    global _idempotency_store
+    if _idempotency_store is None:
+        _idempotency_store = IdempotencyStore(
+            db,
+            hot_max_entries=settings.IDEMPOTENCY_HOT_CACHE_SIZE,
+            hot_ttl_seconds=settings.IDEMPOTENCY_HOT_TTL_SECONDS,
+            lease_seconds=settings.IDEMPOTENCY_LEASE_SECONDS,
+        )
+    return _idempotency_store
+
+
+_consequence_engine: Optional[ConsequenceEngine] = None
+
+
+def get_consequence_engine() -> Optional[ConsequenceEngine]:
+    return _consequence_engine
+
+
+async def start_consequence_engine(db: AsyncIOMotorDatabase) -> None:
+    """Starts the process-wide consequence engine workers."""
+    global _consequence_engine
+    if _consequence_engine is not None:
+        return
+    log_service = LogService(db, StateUpdaterService(db=db))
+    _consequence_engine = ConsequenceEngine(
+        log_service.record_system_consequence_events,
+        concurrency=settings.CONSEQUENCE_ENGINE_CONCURRENCY,
+        max_queue_size=settings.CONSEQUENCE_QUEUE_MAX_SIZE,
+    )
+    _consequence_engine.start()
+
+
+async def stop_consequence_engine() -> None:
+    global _consequence_engine
+    if _consequence_engine is not None:
+        await _consequence_engine.stop()
+        _consequence_engine = None
+
+
+_outbox_pool: Optional[OutboxWorkerPool] = None
+
+
+async def start_outbox_workers(db: AsyncIOMotorDatabase) -> None:
+    """Starts the outbox worker pool of this process (outbox mode only)."""
+    global _outbox_pool
+    if not settings.LOG_OUTBOX_ENABLED or _outbox_pool is not None:
+        return
+    log_service = LogService(db, StateUpdaterService(db=db))
+    _outbox_pool = OutboxWorkerPool(
+        db,
+        log_service.apply_outbox_record,
+        workers=settings.OUTBOX_WORKERS,
+        max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+        poll_interval_ms=settings.OUTBOX_POLL_INTERVAL_MS,
+    )
+    _outbox_pool.start()
+
+
+async def stop_outbox_workers() -> None:
+    global _outbox_pool
+    if _outbox_pool is not None:
+        await _outbox_pool.stop()
+        _outbox_pool = None
+
+
 class LogService:
     def __init__(self, db: AsyncIOMotorDatabase, state_updater: StateUpdaterService):
         self.db = db
         self.state_updater = state_updater
         logger.info("LogService initialized.")
 
+    async def _persist_log_document(self, log_dict_for_db: Dict[str, Any]) -> None:
+        """
+        Writes one LogEvent document. With group-commit enabled the write is shared
+        with concurrent callers, but this still only returns once the document is durable.
+        """
+        if settings.LOG_GROUP_COMMIT_ENABLED:
+            # Post-write bookkeeping of batched writes runs once per flush in the batcher.
+            await get_event_batcher(self.db).submit(log_dict_for_db)
+        else:
+            await get_sequence_allocator(self.db).assign([log_dict_for_db])
+            await self.db["logs"].insert_one(log_dict_for_db)
+            await _after_logs_written(self.db, [log_dict_for_db])
+
+    def _to_log_document(self, event_draft: LogEvent) -> Dict[str, Any]:
+        """
+        DB document of a LogEvent; `recorded_at` is the server-side persistence time,
+        `search_tokens` the token index over `data`/`meta` used by /timeline/search.
+        `aggregate_key` is added by `_to_log_documents`.
+        """
+        log_dict_for_db = event_draft.model_dump(exclude_none=True)
+        log_dict_for_db["recorded_at"] = datetime.now(timezone.utc)
+        log_dict_for_db["search_tokens"] = extract_search_tokens(log_dict_for_db.get("data"), log_dict_for_db.get("meta"))
+        return log_dict_for_db
+
+    async def _to_log_documents(self, event_drafts: List[LogEvent]) -> List[Dict[str, Any]]:
+        """
+        DB documents of LogEvents, with `aggregate_key`: the aggregate whose current state
+        the event changes (resolved through the referenced log for acionamentos), used for
+        point-in-time state lookups and per-aggregate ordering.
+        """
+        documents = [self._to_log_document(event_draft) for event_draft in event_drafts]
+        await resolve_aggregate_keys(self.db["logs"], documents)
+        return documents
+
     async def _record_single_event_core(
         self,
         event_draft: LogEvent,
@@ -29,21 +225,26 @@ class LogService:
         log = logger.bind(event_type=event_draft.type, author=event_draft.author, draft_id=event_draft.id)
         log.info("Core event recording started...")
 
-        if not event_draft.timestamp:
-            event_draft.timestamp = datetime.now(timezone.utc)
-        if not event_draft.id:
-            event_draft.id = f"evt_{uuid.uuid4().hex}"
-            log.warning(f"event_draft.id was not set, generated: {event_draft.id}")
+        self._assign_identity(event_draft, log)
 
         try:
-            log_dict_for_db = event_draft.model_dump(exclude_none=True)
-            logs_collection = self.db["logs"]
-            insert_result = await logs_collection.insert_one(log_dict_for_db)
-            log.success(f"LogEvent persisted. System ID: {event_draft.id}, DB _id: {insert_result.inserted_id}")
+            log_dict_for_db = (await self._to_log_documents([event_draft]))[0]
+            if settings.LOG_OUTBOX_ENABLED:
+                await self._persist_with_outbox_record(event_draft, log_dict_for_db)
+                event_draft.seq = log_dict_for_db["seq"]
+                log.success(f"LogEvent persisted with outbox record. System ID: {event_draft.id}, DB _id: {log_dict_for_db.get('_id')}")
+                self._add_non_critical_side_effects(non_critical_side_effects, background_tasks, log)
+                return event_draft
+
+            await self._persist_log_document(log_dict_for_db)
+            event_draft.seq = log_dict_for_db["seq"]
+            log.success(f"LogEvent persisted. System ID: {event_draft.id}, DB _id: {log_dict_for_db.get('_id')}")
 
             state_update_outcome: Optional[StateUpdateResult] = None
             try:
-                state_update_outcome = await self.state_updater.update_state(event_draft)
+                # A projection swap in progress holds the update until the rebuilt collections are live.
+                await get_sequence_allocator(self.db).wait_for_fence(event_draft.seq)
+                state_update_outcome = await self.state_updater.update_state_ordered(event_draft, log_dict_for_db["aggregate_key"])
                 log.info(f"Synchronous state update completed for event: {event_draft.id}")
             except Exception as state_update_error:
                 log.critical(
@@ -52,80 +253,311 @@ class LogService:
                 )
                 raise RuntimeError(f"State update failed for event {event_draft.id}") from state_update_error
 
-            ws_payload_for_fusion = {
-                "type": "new_log_event_v2",
-                "payload": event_draft.model_dump(mode='json')
-            }
-            try:
-                await ws_manager.broadcast(ws_payload_for_fusion)
-                log.debug(f"WebSocket broadcast initiated for event: {event_draft.id}")
-            except Exception as ws_err:
-                log.error(f"WebSocket broadcast failed for event {event_draft.id}: {ws_err}", exc_info=True)
-
-            if non_critical_side_effects:
-                for task_func, task_args, task_kwargs in non_critical_side_effects:
-                    try:
-                        background_tasks.add_task(task_func, *task_args, **task_kwargs)
-                        log.info(f"Added background task: {getattr(task_func, '__name__', 'unknown_task_func')}")
-                    except Exception as bg_task_err:
-                        log.error(f"Failed to add background task: {bg_task_err}", exc_info=True)
+            await self._broadcast_new_event(event_draft, log)
+            self._add_non_critical_side_effects(non_critical_side_effects, background_tasks, log)
 
             # --- SYSTEM CONSEQUENCE EVENTS ---
-            if state_update_outcome and state_update_outcome.suggested_consequence_events:
-                log.info(f"Found {len(state_update_outcome.suggested_consequence_events)} suggested consequence events for {event_draft.id}.")
-                for cons_info in state_update_outcome.suggested_consequence_events:
-                    cons_event_type = cons_info["event_type"]
-                    cons_event_data_model: BaseModel = cons_info["event_data_model"]
-                    background_tasks.add_task(
-                        self.record_system_consequence_event,
-                        consequence_event_type=cons_event_type,
-                        consequence_event_data=cons_event_data_model,
-                        triggering_event=event_draft,
-                    )
-                    log.info(f"Scheduled recording of consequence event: Type '{cons_event_type}'")
+            self._schedule_consequence_events(event_draft, state_update_outcome, background_tasks, log)
 
             return event_draft
         except Exception as e:
             log.exception(f"CRITICAL error during core event recording (type: {event_draft.type}): {e}")
             raise RuntimeError(f"Failed to record event: {e}") from e
 
+    async def _persist_with_outbox_record(self, event_draft: LogEvent, log_dict_for_db: Dict[str, Any]) -> None:
+        """
+        Writes the LogEvent and its outbox record in one transaction; the state update,
+        broadcast and consequences are then applied by the outbox workers.
+        Requires a replica set (MongoDB transactions).
+        """
+        await get_sequence_allocator(self.db).assign([log_dict_for_db])
+        outbox_record = build_outbox_record(event_draft.id, log_dict_for_db["aggregate_key"], log_dict_for_db["seq"])
+        async with await self.db.client.start_session() as session:
+            async with session.start_transaction():
+                await self.db["logs"].insert_one(log_dict_for_db, session=session)
+                await self.db[OUTBOX_COLLECTION].insert_one(outbox_record, session=session)
+        await _after_logs_written(self.db, [log_dict_for_db])
+
+    async def apply_outbox_record(self, outbox_record: Dict[str, Any]) -> None:
+        """
+        Deferred half of `_record_single_event_core` for outbox mode: state update,
+        broadcast and consequence events of an already persisted LogEvent.
+        Raises so the outbox worker can retry.
+        """
+        log_doc = await self.db["logs"].find_one({"id": outbox_record["log_event_id"]})
+        if not log_doc:
+            raise LookupError(f"LogEvent {outbox_record['log_event_id']} referenced by outbox record not found")
+        event = LogEvent(**log_doc)
+        log = logger.bind(event_type=event.type, event_id=event.id, aggregate_key=outbox_record["aggregate_key"])
+        allocator = get_sequence_allocator(self.db)
+        await allocator.refresh_fence()
+        if allocator.fenced(event.seq):
+            raise OutboxDeferred(f"State update of event {event.id} held by a projection swap")
+
+        # Outbox lanes already apply the records of an aggregate one at a time, in order.
+        state_update_outcome = await self.state_updater.update_state(event)
+        log.info(f"Outbox state update completed for event: {event.id}")
+        await self._broadcast_new_event(event, log)
+
+        consequence_tasks = BackgroundTasks()
+        self._schedule_consequence_events(event, state_update_outcome, consequence_tasks, log)
+        await consequence_tasks()
+
+    async def _broadcast_new_event(self, event: LogEvent, log) -> None:
+        ws_payload_for_fusion = {
+            "type": "new_log_event_v2",
+            "payload": event.model_dump(mode='json')
+        }
+        try:
+            await ws_manager.broadcast(ws_payload_for_fusion)
+            log.debug(f"WebSocket broadcast initiated for event: {event.id}")
+        except Exception as ws_err:
+            log.error(f"WebSocket broadcast failed for event {event.id}: {ws_err}", exc_info=True)
+
+    def _add_non_critical_side_effects(
+        self,
+        non_critical_side_effects: Optional[List[Tuple[Callable, List, Dict]]],
+        background_tasks: BackgroundTasks,
+        log,
+    ) -> None:
+        if not non_critical_side_effects:
+            return
+        for task_func, task_args, task_kwargs in non_critical_side_effects:
+            try:
+                background_tasks.add_task(task_func, *task_args, **task_kwargs)
+                log.info(f"Added background task: {getattr(task_func, '__name__', 'unknown_task_func')}")
+            except Exception as bg_task_err:
+                log.error(f"Failed to add background task: {bg_task_err}", exc_info=True)
+
+    def _assign_identity(self, event_draft: LogEvent, log) -> None:
+        if not event_draft.timestamp:
+            event_draft.timestamp = datetime.now(timezone.utc)
+        if not event_draft.id:
+            event_draft.id = f"evt_{uuid.uuid4().hex}"
+            log.warning(f"event_draft.id was not set, generated: {event_draft.id}")
+
+    def _schedule_consequence_events(
+        self,
+        event: LogEvent,
+        state_update_outcome: Optional[StateUpdateResult],
+        background_tasks: BackgroundTasks,
+        log,
+    ) -> None:
+        if not state_update_outcome or not state_update_outcome.suggested_consequence_events:
+            return
+        suggestions = state_update_outcome.suggested_consequence_events
+        log.info(f"Found {len(suggestions)} suggested consequence events for {event.id}.")
+        engine = get_consequence_engine()
+        if engine is not None:
+            engine.submit(event, suggestions)
+            log.info(f"Queued {len(suggestions)} consequence events on the consequence engine.")
+        else:
+            background_tasks.add_task(self.record_system_consequence_events, event, suggestions)
+            log.info(f"Scheduled recording of {len(suggestions)} consequence events as a background task.")
+
+    async def _insert_log_documents_ordered(self, documents: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """
+        Writes a chunk of LogEvent documents with ordered `insert_many` calls.
+        A failing document does not abort the chunk: the untried tail is resubmitted.
+        Returns one entry per document: None when persisted, the error message otherwise.
+        """
+        errors: List[Optional[str]] = [None] * len(documents)
+        start = 0
+        while start < len(documents):
+            try:
+                await self.db["logs"].insert_many(documents[start:], ordered=True)
+                break
+            except BulkWriteError as bwe:
+                write_error = (bwe.details.get("writeErrors") or [{}])[0]
+                failed_at = start + write_error.get("index", 0)
+                errors[failed_at] = write_error.get("errmsg", str(bwe))
+                start = failed_at + 1
+        return errors
+
+    async def record_events_chunk(
+        self,
+        event_drafts: List[LogEvent],
+        background_tasks: BackgroundTasks,
+    ) -> List[Optional[str]]:
+        """
+        Bulk counterpart of `record_event`, used by backfills and integrations.
+        The whole chunk is persisted with one ordered write, state updates then run
+        concurrently across aggregates (in order within each), and WebSocket messages
+        of at most INGEST_BROADCAST_MAX_EVENTS events / INGEST_BROADCAST_MAX_BYTES
+        announce the chunk. Returns one entry per draft: None when recorded, the
+        error otherwise.
+        Idempotency keys are not honoured here: a draft carrying `meta.idempotency_key`
+        is rejected (recorded through `record_event` instead), rather than written
+        without deduplication.
+        """
+        keyed = [index for index, draft in enumerate(event_drafts) if (draft.meta or {}).get("idempotency_key")]
+        if keyed:
+            errors: List[Optional[str]] = [None] * len(event_drafts)
+            for index in keyed:
+                errors[index] = BULK_IDEMPOTENCY_KEY_ERROR
+            accepted = [index for index in range(len(event_drafts)) if errors[index] is None]
+            if accepted:
+                accepted_errors = await self.record_events_chunk([event_drafts[index] for index in accepted], background_tasks)
+                for index, error in zip(accepted, accepted_errors):
+                    errors[index] = error
+            return errors
+
+        log = logger.bind(chunk_size=len(event_drafts))
+        log.info("Chunk event recording started...")
+        for event_draft in event_drafts:
+            self._assign_identity(event_draft, log)
+
+        documents = await self._to_log_documents(event_drafts)
+        await get_sequence_allocator(self.db).assign(documents)
+        for event_draft, document in zip(event_drafts, documents):
+            event_draft.seq = document["seq"]
+        errors = await self._insert_log_documents_ordered(documents)
+        persisted = [evt for evt, err in zip(event_drafts, errors) if err is None]
+        await _after_logs_written(self.db, [doc for doc, err in zip(documents, errors) if err is None])
+        log.success(f"Chunk persisted: {len(persisted)}/{len(event_drafts)} LogEvents.")
+
+        persisted_indexes = [index for index, error in enumerate(errors) if error is None]
+        if persisted_indexes:
+            # The chunk's numbers come from one allocation: a swap fence holds all of them or none.
+            await get_sequence_allocator(self.db).wait_for_fence(event_drafts[persisted_indexes[0]].seq)
+            # Submitted to the aggregate lanes in chunk order, so events of one aggregate still
+            # apply in order while different aggregates apply concurrently.
+            outcomes = await asyncio.gather(*(
+                self.state_updater.update_state_ordered(event_drafts[index], documents[index]["aggregate_key"])
+                for index in persisted_indexes
+            ), return_exceptions=True)
+            for index, outcome in zip(persisted_indexes, outcomes):
+                event_draft = event_drafts[index]
+                if isinstance(outcome, BaseException):
+                    log.critical(
+                        f"CRITICAL FAILURE: State update failed after logging event {event_draft.id}. System may be inconsistent. Error: {outcome}",
+                        exc_info=outcome
+                    )
+                    errors[index] = f"State update failed: {outcome}"
+                    continue
+                self._schedule_consequence_events(event_draft, outcome, background_tasks, log)
+
+        if len(persisted) == 1:
+            await self._broadcast_new_event(persisted[0], log)
+        elif persisted:
+            frames = broadcast_frames(
+                [evt.model_dump(mode='json') for evt in persisted],
+                max_events=settings.INGEST_BROADCAST_MAX_EVENTS,
+                max_bytes=settings.INGEST_BROADCAST_MAX_BYTES,
+            )
+            for frame in frames:
+                ws_payload_for_fusion = {
+                    "type": "new_log_events_batch_v2",
+                    "payload": {"count": len(frame), "events": frame},
+                }
+                try:
+                    await ws_manager.broadcast(ws_payload_for_fusion)
+                except Exception as ws_err:
+                    log.error(f"WebSocket broadcast failed for {len(frame)} events of a chunk: {ws_err}", exc_info=True)
+
+        return errors
+
     async def record_event(
         self,
         event_draft: LogEvent,
         background_tasks: BackgroundTasks,
-        non_critical_side_effects: Optional[List[Tuple[Callable, List, Dict]]] = None
+        non_critical_side_effects: Optional[List[Tuple[Callable, List, Dict]]] = None,
+        idempotency_key: Optional[str] = None,
     ) -> LogEvent:
         """
         Primary public method to record a user/externally-initiated event.
+        With an idempotency key (argument, typically the `Idempotency-Key` header, or
+        `meta.idempotency_key`) a retried request gets the originally recorded event
+        back instead of a second event and a second state mutation. Reusing a key for a
+        different `type`/`data` raises IdempotencyKeyReused instead.
         """
-        return await self._record_single_event_core(
-            event_draft, background_tasks, non_critical_side_effects
-        )
+        idempotency_key = idempotency_key or (event_draft.meta or {}).get("idempotency_key")
+        if not idempotency_key:
+            return await self._record_single_event_core(
+                event_draft, background_tasks, non_critical_side_effects
+            )
 
-    async def record_system_consequence_event(
+        log = logger.bind(event_type=event_draft.type, idempotency_key=idempotency_key)
+        store = get_idempotency_store(self.db)
+        # Keys are only unique per author: two clients may pick the same key.
+        store_key = f"{event_draft.author}|{idempotency_key}"
+        fingerprint = payload_fingerprint(event_draft.type, event_draft.data)
+        cached = store.get_hot(store_key)
+        if cached is not None:
+            cached_fingerprint, cached_event = cached
+            if cached_fingerprint != fingerprint:
+                log.warning("Idempotency key reused with a different payload.")
+                raise IdempotencyKeyReused()
+            log.info(f"Duplicate request answered from idempotency cache: {cached_event.id}")
+            return cached_event.model_copy(deep=True)
+
+        existing = await store.claim(store_key, fingerprint)
+        if existing is not None:
+            # Records claimed before fingerprints were stored cannot be checked.
+            if existing.get("fingerprint", fingerprint) != fingerprint:
+                log.warning("Idempotency key reused with a different payload.")
+                raise IdempotencyKeyReused()
+            if existing.get("status") != "completed":
+                log.warning("Idempotency key is still being recorded by another request.")
+                raise IdempotencyConflict()
+            log_doc = await self.db["logs"].find_one({"id": existing["log_event_id"]})
+            if not log_doc:
+                raise RuntimeError(f"LogEvent {existing['log_event_id']} of idempotency key '{idempotency_key}' not found")
+            original_event = LogEvent(**log_doc)
+            store.remember(store_key, fingerprint, original_event)
+            log.info(f"Duplicate request answered with original event: {original_event.id}")
+            return original_event.model_copy(deep=True)
+
+        event_draft.meta = {**(event_draft.meta or {}), "idempotency_key": idempotency_key}
+        try:
+            persisted_event = await self._record_single_event_core(
+                event_draft, background_tasks, non_critical_side_effects
+            )
+        except Exception:
+            await self._settle_failed_claim(store, store_key, fingerprint, event_draft, log)
+            raise
+        await store.complete(store_key, fingerprint, persisted_event.id, persisted_event.model_copy(deep=True))
+        return persisted_event
+
+    async def _settle_failed_claim(
+        self, store: IdempotencyStore, store_key: str, fingerprint: str, event_draft: LogEvent, log
+    ) -> None:
+        """
+        After a failed keyed recording: if the LogEvent was persisted anyway (the state
+        update failed after the write), the key is completed with it, so a retry returns
+        that event instead of recording a duplicate. Only when nothing was persisted is
+        the claim released. If that cannot be told, the claim is left to its lease.
+        """
+        try:
+            persisted = event_draft.id is not None and await self.db["logs"].find_one({"id": event_draft.id}, {"_id": 1}) is not None
+        except Exception as e:
+            log.error(f"Could not check whether {event_draft.id} was persisted; idempotency key left claimed: {e}")
+            return
+        if not persisted:
+            await store.release(store_key)
+            return
+        try:
+            await store.complete(store_key, fingerprint, event_draft.id, event_draft.model_copy(deep=True))
+            log.warning(f"Recording failed after {event_draft.id} was persisted; idempotency key completed with it.")
+        except Exception as e:
+            log.error(f"Failed to complete idempotency key for persisted event {event_draft.id} (left claimed): {e}")
+
+    def _build_consequence_draft(
         self,
         consequence_event_type: str,
         consequence_event_data: BaseModel,
         triggering_event: LogEvent,
-        new_background_tasks_instance: Optional[BackgroundTasks] = None
-    ) -> Optional[LogEvent]:
-        """
-        Records a new LogEvent that is a direct system-driven consequence of a preceding event.
-        The 'author' is typically a system identifier, and 'witness' is the triggering event.
-        """
-        log = logger.bind(
-            triggering_event_id=triggering_event.id,
-            consequence_event_type=consequence_event_type,
-            trace_id=triggering_event.meta.get("trace_id") if triggering_event.meta else logger.extra.get("trace_id")
-        )
-        log.info("Recording system-driven consequence event...")
-
-        meta_for_consequence = {"trace_id": log.extra.get("trace_id")}
+        lineage_meta: Dict[str, Any],
+    ) -> LogEvent:
+        meta_for_consequence = {
+            "trace_id": triggering_event.meta.get("trace_id") if triggering_event.meta else logger.extra.get("trace_id")
+        }
         if triggering_event.meta and "conversation_id" in triggering_event.meta:
             meta_for_consequence["conversation_id"] = triggering_event.meta["conversation_id"]
         meta_for_consequence["triggered_by_log_id"] = triggering_event.id
+        meta_for_consequence.update(lineage_meta)
 
-        consequence_draft = LogEvent(
+        return LogEvent(
             type=consequence_event_type,
             author="system:state_consequence_engine",
             witness=f"log_event:{triggering_event.id}",
@@ -135,19 +567,73 @@ class LogService:
             meta=meta_for_consequence
         )
 
-        bg_tasks_for_consequence = new_background_tasks_instance if new_background_tasks_instance else BackgroundTasks()
+    async def record_system_consequence_events(
+        self,
+        triggering_event: LogEvent,
+        suggestions: List[Dict[str, Any]],
+        background_tasks: Optional[BackgroundTasks] = None,
+    ) -> List[LogEvent]:
+        """
+        Records the sibling consequence events suggested for one triggering event in a
+        single write. Depth, fan-out and cycle guards are applied first. Their own
+        consequences cascade through the consequence engine; without a running engine
+        (scripts, tests) the cascade runs here before returning, unless the caller
+        passes `background_tasks` to run it later.
+        """
+        log = logger.bind(
+            triggering_event_id=triggering_event.id,
+            trace_id=triggering_event.meta.get("trace_id") if triggering_event.meta else logger.extra.get("trace_id")
+        )
+        plan = plan_consequences(
+            triggering_event.id, triggering_event.type, triggering_event.meta, suggestions,
+            max_depth=settings.CONSEQUENCE_MAX_DEPTH, max_fan_out=settings.CONSEQUENCE_MAX_FAN_OUT,
+            forbid_repeated_types=settings.CONSEQUENCE_FORBID_REPEATED_TYPES,
+        )
+        kept, dropped = count_plan_outcome(plan)
+        if dropped:
+            log.critical(f"Dropped {dropped} of {len(suggestions)} consequence events: {plan.dropped}")
+        if not kept:
+            return []
+
+        drafts = [
+            self._build_consequence_draft(cons_info["event_type"], cons_info["event_data_model"], triggering_event, plan.lineage_meta)
+            for cons_info in plan.suggestions
+        ]
+        log.info(f"Recording {len(drafts)} system-driven consequence events...")
+        cascade_tasks = background_tasks if background_tasks is not None else BackgroundTasks()
+        errors = await self.record_events_chunk(drafts, cascade_tasks)
 
-        try:
-            persisted_consequence_event = await self._record_single_event_core(
-                consequence_draft,
-                bg_tasks_for_consequence,
-                non_critical_side_effects=None
-            )
-            log.success(f"Successfully recorded consequence event: {persisted_consequence_event.id} (Type: {consequence_event_type})")
-            return persisted_consequence_event
-        except Exception as e:
-            log.critical(f"Failed to record system consequence event of type '{consequence_event_type}' triggered by '{triggering_event.id}': {e}", exc_info=True)
-            return None
+        persisted = []
+        for draft, error in zip(drafts, errors):
+            if error is None:
+                persisted.append(draft)
+                log.success(f"Successfully recorded consequence event: {draft.id} (Type: {draft.type})")
+            else:
+                log.critical(f"Failed to record system consequence event of type '{draft.type}' triggered by '{triggering_event.id}': {error}")
+        CONSEQUENCE_EVENTS_TOTAL.labels(result="recorded").inc(len(persisted))
+        CONSEQUENCE_EVENTS_TOTAL.labels(result="failed").inc(len(drafts) - len(persisted))
+
+        if background_tasks is None:
+            await cascade_tasks()
+        return persisted
+
+    async def record_system_consequence_event(
+        self,
+        consequence_event_type: str,
+        consequence_event_data: BaseModel,
+        triggering_event: LogEvent,
+        new_background_tasks_instance: Optional[BackgroundTasks] = None
+    ) -> Optional[LogEvent]:
+        """
+        Records a new LogEvent that is a direct system-driven consequence of a preceding event.
+        The 'author' is typically a system identifier, and 'witness' is the triggering event.
+        """
+        persisted = await self.record_system_consequence_events(
+            triggering_event,
+            [{"event_type": consequence_event_type, "event_data_model": consequence_event_data}],
+            background_tasks=new_background_tasks_instance,
+        )
+        return persisted[0] if persisted else None
 
 async def get_log_service(
     db_instance: AsyncIOMotorDatabase = Depends(get_database),
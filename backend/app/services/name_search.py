@@ -0,0 +1,103 @@
+import re
+from typing import Any, Dict, List
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.services.search_tokens import normalize_text
+
+NGRAM_SIZE = 3
+
+
+def normalized_field(field: str) -> str:
+    return f"{field}_normalized"
+
+
+def ngrams_field(field: str) -> str:
+    return f"{field}_trigrams"
+
+
+def normalize_name(value: str) -> str:
+    """Lower-cased, accent-free, whitespace-collapsed form that prefix and n-gram matching run on."""
+    return " ".join(normalize_text(value).split())
+
+
+def name_ngrams(normalized: str) -> List[str]:
+    """
+    Trigrams starting at every position of `normalized`, the last two truncated
+    ('abcd' -> abc, bcd, cd, d). Every substring of up to NGRAM_SIZE characters is then
+    the prefix of one of them, so short contains-queries are an anchored regex on the
+    multikey index; longer ones need all of their full trigrams.
+    """
+    return sorted({normalized[i:i + NGRAM_SIZE] for i in range(len(normalized))})
+
+
+def name_search_fields(field: str, value: Any) -> Dict[str, Any]:
+    """Derived fields stored next to `field` so it can be searched through indexes."""
+    if not isinstance(value, str):
+        return {normalized_field(field): None, ngrams_field(field): []}
+    normalized = normalize_name(value)
+    return {normalized_field(field): normalized, ngrams_field(field): name_ngrams(normalized)}
+
+
+def with_name_search_fields(update: Dict[str, Any], field: str) -> Dict[str, Any]:
+    """
+    Adds the derived search fields to an update document that sets `field` (through
+    `$set` or `$setOnInsert`), in the same operator, so they can never drift apart.
+    """
+    for operator in ("$set", "$setOnInsert"):
+        values = update.get(operator)
+        if values and field in values:
+            update = {**update, operator: {**values, **name_search_fields(field, values[field])}}
+    return update
+
+
+def name_match_filter(field: str, query: str, mode: str = "contains") -> Dict[str, Any]:
+    """
+    Mongo filter matching `field` against `query`. `prefix` and `contains` match the
+    normalized text literally and are served by the indexes on the derived fields;
+    `regex` is the legacy unanchored case-insensitive `$regex` (collection scan), kept
+    for documents that have not been backfilled yet.
+    """
+    if mode == "regex":
+        return {field: {"$regex": query, "$options": "i"}}
+    normalized = normalize_name(query)
+    if mode == "prefix":
+        return {normalized_field(field): {"$regex": f"^{re.escape(normalized)}"}}
+    if mode != "contains":
+        raise ValueError(f"Unknown match mode '{mode}'")
+    if len(normalized) < NGRAM_SIZE:
+        return {ngrams_field(field): {"$regex": f"^{re.escape(normalized)}"}}
+    grams = [normalized[i:i + NGRAM_SIZE] for i in range(len(normalized) - NGRAM_SIZE + 1)]
+    if len(grams) == 1:
+        return {ngrams_field(field): grams[0]}
+    # The trigrams narrow candidates through the index; the regex confirms their order.
+    return {
+        ngrams_field(field): {"$all": list(dict.fromkeys(grams))},
+        normalized_field(field): {"$regex": re.escape(normalized)},
+    }
+
+
+async def backfill_name_search_fields(
+    db: AsyncIOMotorDatabase,
+    collection_name: str,
+    field: str,
+    batch_size: int = 1000,
+) -> int:
+    """Adds the derived search fields to documents written before they existed. Returns how many were updated."""
+    collection = db[collection_name]
+    updated = 0
+    cursor = collection.find({ngrams_field(field): {"$exists": False}}, {"_id": 1, field: 1}).batch_size(batch_size)
+    batch: List[UpdateOne] = []
+    async for doc in cursor:
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": name_search_fields(field, doc.get(field))}))
+        if len(batch) >= batch_size:
+            await collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+            logger.info(f"{collection_name}.{field} search fields backfilled for {updated} documents")
+    if batch:
+        await collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
@@ -0,0 +1,196 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from bson import ObjectId
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from prometheus_client import Counter
+from pymongo import ReturnDocument
+
+from app.services.aggregates import aggregate_hash
+
+OUTBOX_COLLECTION = "log_outbox"
+
+OUTBOX_RECORDS_TOTAL = Counter(
+    "log_outbox_records_total",
+    "Registros do outbox processados, por resultado",
+    ["result"],
+)
+
+
+class OutboxDeferred(Exception):
+    """Raised by `process_record` when a record cannot be applied yet; retried without counting an attempt."""
+
+
+def build_outbox_record(log_event_id: str, aggregate_key: str, seq: int) -> Dict[str, Any]:
+    """
+    Outbox entry written in the same transaction as the LogEvent it refers to. `seq` is
+    the event's log position: records are applied in `seq` order, since `_id`s generated
+    by different processes (or within one second) do not follow it.
+    """
+    return {
+        "_id": ObjectId(),
+        "log_event_id": log_event_id,
+        "seq": seq,
+        "aggregate_key": aggregate_key,
+        "aggregate_hash": aggregate_hash(aggregate_key),
+        "status": "pending",
+        "attempts": 0,
+        "created_at": datetime.now(timezone.utc),
+        "next_attempt_at": None,
+        "locked_until": None,
+    }
+
+
+class OutboxWorkerPool:
+    """
+    Applies the post-write work (state update, broadcast, consequences) of outbox
+    records off the request path.
+
+    Each of the `workers` lanes owns the aggregates whose hash falls in it and walks
+    their pending records in `seq` order. A record that cannot be processed yet
+    (backing off, leased by another process, or just failed) blocks the rest of its
+    aggregate, so events of one aggregate are never applied out of order. The aggregate
+    key is the one stored on the LogEvent: the aggregate whose state its handler writes.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        process_record: Callable[[Dict[str, Any]], Awaitable[None]],
+        workers: int = 4,
+        max_attempts: int = 8,
+        poll_interval_ms: float = 200,
+        batch_size: int = 100,
+        lease_seconds: float = 30,
+    ):
+        self.collection = db[OUTBOX_COLLECTION]
+        self.process_record = process_record
+        self.workers = max(workers, 1)
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval_ms / 1000.0
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=lease_seconds)
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._tasks = [asyncio.create_task(self._run_lane(lane)) for lane in range(self.workers)]
+        logger.info(f"Outbox worker pool started with {self.workers} lanes.")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Outbox worker pool stopped.")
+
+    async def _run_lane(self, lane: int) -> None:
+        while not self._stopping.is_set():
+            try:
+                processed = await self.drain_lane(lane)
+            except Exception as e:
+                logger.error(f"Outbox lane {lane} failed to drain: {e}")
+                processed = 0
+            if not processed:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain_lane(self, lane: int) -> int:
+        """
+        One pass over the pending records of a lane. Returns how many were applied.
+        Records are taken in `seq` order. Aggregates whose oldest record is backing off or leased elsewhere are excluded in
+        the query itself, so their queued records never fill the batch ahead of others.
+        """
+        now = datetime.now(timezone.utc)
+        lane_query = {"status": "pending", "aggregate_hash": {"$mod": [self.workers, lane]}}
+        waiting = await self.collection.distinct("aggregate_key", {
+            **lane_query, "$or": [{"next_attempt_at": {"$gt": now}}, {"locked_until": {"$gt": now}}],
+        })
+        query = {**lane_query, "next_attempt_at": {"$not": {"$gt": now}}}
+        if waiting:
+            query["aggregate_key"] = {"$nin": waiting}
+        records = await self.collection.find(query).sort("seq", 1).limit(self.batch_size).to_list(length=self.batch_size)
+
+        blocked: Set[str] = set()
+        processed = 0
+        for record in records:
+            aggregate_key = record["aggregate_key"]
+            if aggregate_key in blocked:
+                continue
+            if _is_future(record.get("next_attempt_at"), now) or _is_future(record.get("locked_until"), now):
+                blocked.add(aggregate_key)
+                continue
+            claimed = await self.collection.find_one_and_update(
+                {"_id": record["_id"], "status": "pending", "locked_until": record.get("locked_until")},
+                {"$set": {"locked_until": now + self.lease}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if not claimed:
+                blocked.add(aggregate_key)
+                continue
+            if await self._apply(claimed):
+                processed += 1
+            else:
+                blocked.add(aggregate_key)
+        return processed
+
+    async def _apply(self, record: Dict[str, Any]) -> bool:
+        log = logger.bind(log_event_id=record["log_event_id"], aggregate_key=record["aggregate_key"])
+        try:
+            await self.process_record(record)
+        except OutboxDeferred as e:
+            log.debug(f"Outbox record deferred: {e}")
+            await self.collection.update_one(
+                {"_id": record["_id"]},
+                {"$set": {"locked_until": None, "next_attempt_at": datetime.now(timezone.utc) + timedelta(seconds=self.poll_interval)}},
+            )
+            return False
+        except Exception as e:
+            attempts = record.get("attempts", 0) + 1
+            if attempts >= self.max_attempts:
+                log.critical(f"Outbox record dead after {attempts} attempts. System may be inconsistent. Error: {e}")
+                update = {"status": "dead", "attempts": attempts, "last_error": str(e), "locked_until": None}
+                OUTBOX_RECORDS_TOTAL.labels(result="dead").inc()
+            else:
+                backoff = timedelta(seconds=min(2 ** attempts, 300))
+                log.warning(f"Outbox record failed (attempt {attempts}/{self.max_attempts}), retrying in {backoff}: {e}")
+                update = {
+                    "attempts": attempts, "last_error": str(e), "locked_until": None,
+                    "next_attempt_at": datetime.now(timezone.utc) + backoff,
+                }
+                OUTBOX_RECORDS_TOTAL.labels(result="retry").inc()
+            await self.collection.update_one({"_id": record["_id"]}, {"$set": update})
+            return False
+
+        await self.collection.update_one(
+            {"_id": record["_id"]},
+            {"$set": {"status": "done", "processed_at": datetime.now(timezone.utc), "locked_until": None}},
+        )
+        OUTBOX_RECORDS_TOTAL.labels(result="done").inc()
+        return True
+
+
+def _is_future(moment: Optional[datetime], now: datetime) -> bool:
+    if moment is None:
+        return False
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment > now
+
+
+async def oldest_pending_seq(db: AsyncIOMotorDatabase) -> Optional[int]:
+    """
+    `seq` of the oldest event whose outbox record is still pending, None when there is none.
+    Records written before they carried `seq` sort first; their event's `seq` is looked up.
+    """
+    pending = await db[OUTBOX_COLLECTION].find_one({"status": "pending"}, {"seq": 1, "log_event_id": 1}, sort=[("seq", 1)])
+    if pending is None:
+        return None
+    if pending.get("seq") is None:
+        log_doc = await db["logs"].find_one({"id": pending["log_event_id"]}, {"seq": 1})
+        return (log_doc or {}).get("seq")
+    return pending["seq"]
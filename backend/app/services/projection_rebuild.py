@@ -0,0 +1,338 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import DeleteOne, InsertOne, ReplaceOne, UpdateOne
+
+from app.services.aggregates import aggregate_hash, stored_aggregate_key
+from app.services.outbox import oldest_pending_seq
+from app.services.sequence import COUNTERS_COLLECTION, lift_write_fence, raise_write_fence, recorded_before
+
+REBUILDS_COLLECTION = "projection_rebuilds"
+SHADOW_SUFFIX = "__rebuild"
+
+
+def shadow_name(collection_name: str) -> str:
+    return f"{collection_name}{SHADOW_SUFFIX}"
+
+
+def partition_of(log_doc: Dict[str, Any], partitions: int) -> int:
+    """Replay partition of a log document: every event of one aggregate lands in the same one."""
+    return aggregate_hash(stored_aggregate_key(log_doc)) % partitions
+
+
+class BufferedCollection:
+    """
+    Stands in for a current-state collection during a replay: writes are queued and sent
+    as one ordered `bulk_write` by `flush()`. Reads flush first, so a handler that reads
+    the state it just wrote still sees it; such a flush happens outside the checkpoint
+    transaction, so only handlers that never read current state resume exactly. Write
+    methods return None instead of a result.
+    """
+
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+        self.pending: List[Any] = []
+
+    async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs) -> None:
+        self.pending.append(UpdateOne(filter, update, upsert=upsert))
+
+    async def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **kwargs) -> None:
+        self.pending.append(ReplaceOne(filter, replacement, upsert=upsert))
+
+    async def insert_one(self, document: Dict[str, Any], **kwargs) -> None:
+        self.pending.append(InsertOne(document))
+
+    async def delete_one(self, filter: Dict[str, Any], **kwargs) -> None:
+        self.pending.append(DeleteOne(filter))
+
+    async def find_one(self, *args, **kwargs) -> Optional[Dict[str, Any]]:
+        await self.flush()
+        return await self.collection.find_one(*args, **kwargs)
+
+    async def flush(self, session=None) -> int:
+        if not self.pending:
+            return 0
+        operations, self.pending = self.pending, []
+        await self.collection.bulk_write(operations, ordered=True, session=session)
+        return len(operations)
+
+
+class ShadowDatabase:
+    """
+    Database handed to StateUpdaterService during a replay: the rebuilt collections
+    resolve to buffered shadow collections, everything else (e.g. `logs`) to the real one.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase, collection_names: Sequence[str]):
+        self.db = db
+        self.shadows = {name: BufferedCollection(db[shadow_name(name)]) for name in collection_names}
+
+    def __getitem__(self, name: str):
+        return self.shadows[name] if name in self.shadows else self.db[name]
+
+    def __getattr__(self, name: str):
+        return getattr(self.db, name)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(shadow.pending) for shadow in self.shadows.values())
+
+    async def flush(self, session=None) -> int:
+        written = 0
+        for shadow in self.shadows.values():
+            written += await shadow.flush(session=session)
+        return written
+
+
+async def settled_high_water(logs: AsyncIOMotorCollection, settle_seconds: float) -> int:
+    """
+    Highest `seq` below which no write can still be in flight: the newest event recorded
+    more than `settle_seconds` ago (see sequence.settled_prefix). 0 for an empty log.
+    """
+    settled_before = datetime.now(timezone.utc) - timedelta(seconds=settle_seconds)
+    cursor = logs.find({"seq": {"$exists": True}}, {"seq": 1, "recorded_at": 1}).sort("seq", -1)
+    async for doc in cursor:
+        if recorded_before(doc.get("recorded_at"), settled_before):
+            return doc["seq"]
+    return 0
+
+
+async def replay_partition(
+    db: AsyncIOMotorDatabase,
+    run_id: str,
+    checkpoint_name: str,
+    partition: int,
+    partitions: int,
+    start_seq: int,
+    target_seq: int,
+    collections: Sequence[str],
+    state_updater_factory: Callable[[Any], Any],
+    event_factory: Callable[..., Any],
+    batch_size: int = 1000,
+) -> int:
+    """
+    Replays the events of `(start_seq, target_seq]` that belong to `partition` into the
+    shadow collections, in `seq` order. Every `batch_size` applied events, the buffered
+    writes and the checkpoint (last scanned seq) are committed in one transaction, so a
+    resumed run continues exactly after the last committed batch. Returns how many events
+    this call applied. A failing handler aborts the partition; rerun after fixing it.
+    """
+    checkpoints = db[REBUILDS_COLLECTION]
+    checkpoint_id = f"{run_id}:{checkpoint_name}"
+    checkpoint = await checkpoints.find_one({"_id": checkpoint_id}) or {}
+    last_seq = max(checkpoint.get("last_seq", start_seq), start_seq)
+    applied_total = checkpoint.get("applied", 0)
+
+    shadow_db = ShadowDatabase(db, collections)
+    state_updater = state_updater_factory(shadow_db)
+    applied = scanned = 0
+    started = time.monotonic()
+
+    async def commit() -> None:
+        async with await db.client.start_session() as session:
+            async with session.start_transaction():
+                await shadow_db.flush(session=session)
+                await checkpoints.update_one(
+                    {"_id": checkpoint_id},
+                    {"$set": {
+                        "run_id": run_id, "partition": partition, "last_seq": last_seq, "target_seq": target_seq,
+                        "applied": applied_total + applied, "updated_at": datetime.now(timezone.utc),
+                    }},
+                    upsert=True,
+                    session=session,
+                )
+        rate = applied / max(time.monotonic() - started, 1e-6)
+        logger.info(f"Rebuild {checkpoint_id}: seq {last_seq}/{target_seq}, {applied_total + applied} events applied ({rate:.0f}/s)")
+
+    cursor = db["logs"].find({"seq": {"$gt": last_seq, "$lte": target_seq}}).sort("seq", 1).batch_size(batch_size)
+    pending = 0
+    async for doc in cursor:
+        if partition_of(doc, partitions) == partition:
+            doc.pop("_id", None)
+            await state_updater.update_state(event_factory(**doc))
+            applied += 1
+            pending += 1
+        last_seq = doc["seq"]
+        scanned += 1
+        # Commit on applied events for bulk size, and on scanned ones so sparse partitions still checkpoint.
+        if pending >= batch_size or scanned >= batch_size * partitions:
+            await commit()
+            pending = scanned = 0
+    await commit()
+    return applied
+
+
+def run_partition(
+    mongo_url: str,
+    run_id: str,
+    partition: int,
+    partitions: int,
+    target_seq: int,
+    collections: Sequence[str],
+    state_updater_factory: Callable[[Any], Any],
+    event_factory: Callable[..., Any],
+    batch_size: int,
+) -> int:
+    """Process-pool entry point: replays one partition with its own client and event loop."""
+    async def _run() -> int:
+        client = AsyncIOMotorClient(mongo_url, uuidRepresentation="standard")
+        try:
+            return await replay_partition(
+                client.get_default_database(), run_id, f"p{partition}", partition, partitions, 0, target_seq,
+                collections, state_updater_factory, event_factory, batch_size,
+            )
+        finally:
+            client.close()
+
+    return asyncio.run(_run())
+
+
+async def wait_for_outbox(db: AsyncIOMotorDatabase, up_to_seq: int, timeout_seconds: float, poll_interval: float = 0.5) -> None:
+    """
+    Waits until no pending outbox record refers to an event numbered up to `up_to_seq`
+    (outbox mode applies state updates after the write, possibly long after it).
+    """
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        pending_seq = await oldest_pending_seq(db)
+        if pending_seq is None or pending_seq > up_to_seq:
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Outbox still has pending state updates up to seq {pending_seq}")
+        await asyncio.sleep(poll_interval)
+
+
+async def swap_in_shadows(
+    db: AsyncIOMotorDatabase,
+    run_id: str,
+    collections: Sequence[str],
+    caught_up_to: int,
+    state_updater_factory: Callable[[Any], Any],
+    event_factory: Callable[..., Any],
+    batch_size: int = 1000,
+    settle_seconds: float = 10.0,
+    fence_timeout_seconds: float = 300.0,
+) -> int:
+    """
+    Replaces the live collections by their shadows without losing live updates.
+
+    A write fence (see sequence.raise_write_fence) holds the state updates of every event
+    numbered after `fence_seq`, the last number allocated when it went up. The events up to
+    `fence_seq` are applied to the live collections as usual; once they have landed (after
+    `settle_seconds`, and once the outbox has applied them) the shadows catch up to
+    `fence_seq` and are renamed over the live collections. Lifting the fence releases the
+    held updates, which then apply to the rebuilt collections. Returns `fence_seq`.
+    """
+    counters = db[COUNTERS_COLLECTION]
+    fence_seq = await raise_write_fence(counters, run_id, fence_timeout_seconds)
+    try:
+        await db[REBUILDS_COLLECTION].update_one({"_id": run_id}, {"$set": {"status": "swapping", "fence_seq": fence_seq}})
+        logger.info(f"Rebuild {run_id}: write fence up after seq {fence_seq}")
+        await asyncio.sleep(settle_seconds)
+        await wait_for_outbox(db, fence_seq, timeout_seconds=fence_timeout_seconds / 2)
+        await replay_partition(
+            db, run_id, "final", 0, 1, caught_up_to, fence_seq,
+            collections, state_updater_factory, event_factory, batch_size,
+        )
+        for name in collections:
+            await db.client.admin.command(
+                "renameCollection", f"{db.name}.{shadow_name(name)}", to=f"{db.name}.{name}", dropTarget=True,
+            )
+            logger.success(f"Rebuild {run_id}: '{name}' replaced by its rebuilt shadow")
+    finally:
+        await lift_write_fence(counters, run_id)
+    return fence_seq
+
+
+async def rebuild_projections(
+    db: AsyncIOMotorDatabase,
+    mongo_url: str,
+    run_id: str,
+    collections: Sequence[str],
+    state_updater_factory: Callable[[Any], Any],
+    event_factory: Callable[..., Any],
+    partitions: int = 4,
+    batch_size: int = 1000,
+    settle_seconds: float = 10.0,
+    prepare_shadows: Optional[Callable[[AsyncIOMotorDatabase], Any]] = None,
+    swap: bool = True,
+    max_catch_up_rounds: int = 5,
+    fence_timeout_seconds: float = 300.0,
+) -> Dict[str, Any]:
+    """
+    Rebuilds `collections` from `logs` without touching the live collections until the end.
+
+    1. A new run fixes its target (the settled high-water `seq`) and empties the shadows;
+       an existing `run_id` resumes with the target and partitioning it started with.
+    2. `partitions` worker processes replay `(0, target]`, each owning the aggregates whose
+       hash falls in it, so per-aggregate order is kept while handlers run in parallel.
+    3. Events written meanwhile are replayed in-process in catch-up rounds.
+    4. `prepare_shadows` (e.g. building the registry indexes) runs, then `swap_in_shadows`
+       fences live state updates, replays the last events and renames each shadow over its
+       live collection (`renameCollection` with `dropTarget`, atomic per collection).
+       Live state updates of events written during the swap wait for it to finish.
+    """
+    runs = db[REBUILDS_COLLECTION]
+    run = await runs.find_one({"_id": run_id})
+    if run is None:
+        target_seq = await settled_high_water(db["logs"], settle_seconds)
+        for name in collections:
+            await db[shadow_name(name)].drop()
+        run = {
+            "_id": run_id, "status": "replaying", "target_seq": target_seq, "partitions": partitions,
+            "collections": list(collections), "started_at": datetime.now(timezone.utc),
+        }
+        await runs.insert_one(run)
+        logger.info(f"Rebuild {run_id}: replaying seq 1..{target_seq} of {list(collections)} in {partitions} partitions")
+    elif run["status"] == "swapped":
+        raise ValueError(f"Rebuild {run_id} was already swapped in; start a new run")
+    else:
+        logger.info(f"Rebuild {run_id}: resuming ({run['status']}) up to seq {run['target_seq']}")
+    target_seq, partitions = run["target_seq"], run["partitions"]
+
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=partitions) as pool:
+        applied = await asyncio.gather(*(
+            loop.run_in_executor(
+                pool, run_partition, mongo_url, run_id, partition, partitions, target_seq,
+                list(collections), state_updater_factory, event_factory, batch_size,
+            )
+            for partition in range(partitions)
+        ))
+    await runs.update_one({"_id": run_id}, {"$set": {"status": "catching_up"}})
+
+    caught_up_to = run.get("caught_up_to", target_seq)
+    for _ in range(max_catch_up_rounds):
+        high_water = await settled_high_water(db["logs"], settle_seconds)
+        if high_water <= caught_up_to:
+            break
+        round_applied = await replay_partition(
+            db, run_id, "catch_up", 0, 1, caught_up_to, high_water,
+            collections, state_updater_factory, event_factory, batch_size,
+        )
+        caught_up_to = high_water
+        await runs.update_one({"_id": run_id}, {"$set": {"caught_up_to": caught_up_to}})
+        if round_applied < batch_size:
+            break
+
+    if not swap:
+        await runs.update_one({"_id": run_id}, {"$set": {"status": "ready"}})
+        return {"run_id": run_id, "target_seq": target_seq, "caught_up_to": caught_up_to, "applied": sum(applied), "swapped": False}
+
+    existing = set(await db.list_collection_names())
+    for name in collections:
+        if shadow_name(name) not in existing:
+            await db.create_collection(shadow_name(name))  # nothing replayed into it, swap in an empty one
+    if prepare_shadows is not None:
+        await prepare_shadows(db)
+    caught_up_to = await swap_in_shadows(
+        db, run_id, collections, caught_up_to, state_updater_factory, event_factory,
+        batch_size=batch_size, settle_seconds=settle_seconds, fence_timeout_seconds=fence_timeout_seconds,
+    )
+    await runs.update_one({"_id": run_id}, {"$set": {"status": "swapped", "finished_at": datetime.now(timezone.utc)}})
+    return {"run_id": run_id, "target_seq": target_seq, "caught_up_to": caught_up_to, "applied": sum(applied), "swapped": True}
@@ -0,0 +1,163 @@
+from collections import Counter as CountMap
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+ROLLUPS_COLLECTION = "log_rollups"
+GRANULARITIES = ("minute", "hour", "day")
+ROLLUP_DIMENSIONS = ("type", "channel", "author")
+
+# Default /timeline/stats window per granularity: a few hundred buckets at most.
+DEFAULT_STATS_WINDOWS = {
+    "minute": timedelta(hours=6),
+    "hour": timedelta(days=14),
+    "day": timedelta(days=365),
+}
+
+_BUCKET_ID_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    """Start (UTC) of the `granularity` bucket `timestamp` falls in."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    if granularity == "minute":
+        return timestamp.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown rollup granularity '{granularity}'")
+
+
+def dimension_value(value: Any) -> str:
+    """
+    Stored form of a rollup dimension: missing or null is "", anything else its string.
+    The backfill pipeline normalizes with the same rule (see _dimension_expression).
+    """
+    return "" if value is None else str(value)
+
+
+def _dimension_expression(dimension: str) -> Dict[str, Any]:
+    return {"$ifNull": [{"$toString": f"${dimension}"}, ""]}
+
+
+def rollup_id(granularity: str, bucket: datetime, event_type: Any, channel: Any, author: Any) -> str:
+    """Deterministic rollup `_id`; the backfill pipeline builds the very same string."""
+    dimensions = "|".join(dimension_value(value) for value in (event_type, channel, author))
+    return f"{granularity}|{bucket.strftime(_BUCKET_ID_FORMAT)}|{dimensions}"
+
+
+def rollup_increments(documents: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, datetime, str, str, str], int]:
+    """Event counts per (granularity, bucket, type, channel, author) for a set of log documents."""
+    increments: CountMap = CountMap()
+    for doc in documents:
+        timestamp = doc.get("timestamp")
+        if not isinstance(timestamp, datetime):
+            continue
+        dimensions = tuple(dimension_value(doc.get(dimension)) for dimension in ROLLUP_DIMENSIONS)
+        for granularity in GRANULARITIES:
+            increments[(granularity, bucket_start(timestamp, granularity), *dimensions)] += 1
+    return increments
+
+
+def build_rollup_updates(documents: Iterable[Dict[str, Any]]) -> List[UpdateOne]:
+    """One `$inc` upsert per touched rollup document, however many events hit it."""
+    updates = []
+    for (granularity, bucket, event_type, channel, author), count in rollup_increments(documents).items():
+        updates.append(UpdateOne(
+            {"_id": rollup_id(granularity, bucket, event_type, channel, author)},
+            {
+                "$inc": {"count": count},
+                "$setOnInsert": {
+                    "granularity": granularity, "bucket": bucket,
+                    "type": event_type, "channel": channel, "author": author,
+                },
+            },
+            upsert=True,
+        ))
+    return updates
+
+
+async def apply_rollups(collection: AsyncIOMotorCollection, documents: List[Dict[str, Any]]) -> None:
+    """
+    Adds freshly persisted log documents to their rollups. Not atomic with the log write:
+    a crash in between undercounts the affected buckets until the backfill recomputes them.
+    """
+    updates = build_rollup_updates(documents)
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+
+
+def stats_pipeline(
+    granularity: str,
+    start: datetime,
+    end: datetime,
+    group_by: List[str],
+    filters: Dict[str, str],
+) -> List[Dict[str, Any]]:
+    """Sums the rollups of `[start, end)` per bucket and per `group_by` dimension."""
+    match: Dict[str, Any] = {"granularity": granularity, "bucket": {"$gte": bucket_start(start, granularity), "$lt": end}}
+    match.update({dimension: value for dimension, value in filters.items() if value is not None})
+    group_id: Dict[str, Any] = {"bucket": "$bucket"}
+    group_id.update({dimension: f"${dimension}" for dimension in group_by})
+    return [
+        {"$match": match},
+        {"$group": {"_id": group_id, "count": {"$sum": "$count"}}},
+        {"$sort": {"_id.bucket": 1}},
+        {"$replaceWith": {"$mergeObjects": ["$_id", {"count": "$count"}]}},
+    ]
+
+
+async def backfill_rollups(
+    db: AsyncIOMotorDatabase,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> None:
+    """
+    Recomputes the rollups of `[start, end)` from `logs` server-side (`$dateTrunc` +
+    `$merge`, MongoDB 5.0+), replacing the affected rollup documents. Buckets that are
+    only partly inside the range would be overwritten with a partial count, so the range
+    should be aligned to whole days; live writes into the range should be quiesced, since
+    a replaced bucket loses increments made while the pipeline runs.
+    """
+    match: Dict[str, Any] = {"timestamp": {"$type": "date"}}
+    if start:
+        match["timestamp"]["$gte"] = start
+    if end:
+        match["timestamp"]["$lt"] = end
+
+    for granularity in GRANULARITIES:
+        logger.info(f"Backfilling {granularity} rollups for {start or 'beginning'} .. {end or 'now'}")
+        await db["logs"].aggregate(backfill_pipeline(granularity, match), allowDiskUse=True).to_list(length=None)
+
+
+def backfill_pipeline(granularity: str, match: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Aggregation recomputing the `granularity` rollups of the log documents matching `match`."""
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": granularity}},
+                **{dimension: _dimension_expression(dimension) for dimension in ROLLUP_DIMENSIONS},
+            },
+            "count": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": {"$concat": [
+                granularity, "|",
+                {"$dateToString": {"date": "$_id.bucket", "format": _BUCKET_ID_FORMAT}}, "|",
+                "$_id.type", "|", "$_id.channel", "|", "$_id.author",
+            ]},
+            "granularity": {"$literal": granularity},
+            "bucket": "$_id.bucket",
+            "type": "$_id.type",
+            "channel": "$_id.channel",
+            "author": "$_id.author",
+            "count": 1,
+        }},
+        {"$merge": {"into": ROLLUPS_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
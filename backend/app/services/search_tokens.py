@@ -0,0 +1,97 @@
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+MAX_TOKENS_PER_EVENT = 256
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+class InvalidSearchQuery(ValueError):
+    pass
+
+
+def normalize_text(text: str) -> str:
+    """Lower-cases and strips accents, so 'Ação' and 'acao' index the same."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token for token in _TOKEN_SPLIT.split(normalize_text(text))
+        if MIN_TOKEN_LENGTH <= len(token) <= MAX_TOKEN_LENGTH
+    ]
+
+
+def extract_search_tokens(*values: Any) -> List[str]:
+    """
+    Unique tokens of every string found (recursively) in the given values, in order of
+    appearance and capped at MAX_TOKENS_PER_EVENT. Stored on each log document as
+    `search_tokens`, a multikey-indexed array.
+    """
+    tokens: Dict[str, None] = {}
+    stack = list(reversed(values))
+    while stack and len(tokens) < MAX_TOKENS_PER_EVENT:
+        value = stack.pop()
+        if isinstance(value, str):
+            for token in tokenize(value):
+                tokens.setdefault(token, None)
+        elif isinstance(value, dict):
+            stack.extend(reversed(list(value.values())))
+        elif isinstance(value, (list, tuple)):
+            stack.extend(reversed(value))
+    return list(tokens)[:MAX_TOKENS_PER_EVENT]
+
+
+def parse_search_query(q: str) -> Dict[str, Any]:
+    """
+    Mongo filter over `search_tokens` for a query string:
+    whitespace-separated terms are ANDed, `OR` separates alternatives, and a trailing
+    `*` makes a term a prefix (`vend*`). Exact terms use `$all`; prefixes use anchored
+    regexes, which are index range scans.
+    """
+    alternatives = []
+    for clause in re.split(r"\s+OR\s+", q.strip()):
+        exact: List[str] = []
+        prefixes: List[str] = []
+        for raw_term in clause.split():
+            term_tokens = tokenize(raw_term.rstrip("*"))
+            if raw_term.endswith("*") and term_tokens:
+                prefixes.append(term_tokens.pop())
+            exact.extend(term_tokens)
+        conditions: List[Dict[str, Any]] = []
+        if exact:
+            conditions.append({"search_tokens": {"$all": exact}})
+        conditions.extend({"search_tokens": {"$regex": f"^{re.escape(prefix)}"}} for prefix in prefixes)
+        if conditions:
+            alternatives.append(conditions[0] if len(conditions) == 1 else {"$and": conditions})
+    if not alternatives:
+        raise InvalidSearchQuery("Search query has no searchable terms.")
+    return alternatives[0] if len(alternatives) == 1 else {"$or": alternatives}
+
+
+async def backfill_search_tokens(db: AsyncIOMotorDatabase, batch_size: int = 1000, limit: Optional[int] = None) -> int:
+    """Adds `search_tokens` to log documents written before the index existed. Returns how many were updated."""
+    updated = 0
+    cursor = db["logs"].find({"search_tokens": {"$exists": False}}, {"_id": 1, "data": 1, "meta": 1}).batch_size(batch_size)
+    batch: List[UpdateOne] = []
+    async for doc in cursor:
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"search_tokens": extract_search_tokens(doc.get("data"), doc.get("meta"))}}))
+        if len(batch) >= batch_size:
+            await db["logs"].bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+            logger.info(f"search_tokens backfilled for {updated} events")
+        if limit is not None and updated + len(batch) >= limit:
+            break
+    if batch:
+        await db["logs"].bulk_write(batch, ordered=False)
+        updated += len(batch)
+    return updated
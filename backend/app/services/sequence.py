@@ -0,0 +1,157 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReturnDocument
+
+COUNTERS_COLLECTION = "counters"
+LOGS_SEQUENCE_NAME = "logs_seq"
+
+
+class SequenceAllocator:
+    """
+    Allocates the global `seq` of persisted LogEvents from a counter document.
+
+    Every write (a single event, a group-commit flush or an ingestion chunk) takes one
+    contiguous block with a single `$inc`, so the counter is hit once per write instead
+    of once per event, and no numbers are reserved ahead of time: the sequence only has
+    holes where a write failed after its block was allocated.
+
+    The counter document also carries the write fence of a projection swap (see
+    `raise_write_fence`); each allocation reads it for free, so `fenced(seq)` needs no
+    extra round trip while no fence is up.
+    """
+
+    def __init__(self, counters: AsyncIOMotorCollection, name: str = LOGS_SEQUENCE_NAME):
+        self.counters = counters
+        self.name = name
+        self.fence: Optional[Dict[str, Any]] = None
+        self._fence_read_at_value = -1
+        self._fence_poll: Optional[asyncio.Future] = None
+
+    def _observe_counter(self, counter: Optional[Dict[str, Any]]) -> None:
+        # Concurrent allocations can return out of order; only the newest counter state counts.
+        value = (counter or {}).get("value", 0)
+        if value >= self._fence_read_at_value:
+            self._fence_read_at_value = value
+            self.fence = (counter or {}).get("fence")
+
+    async def allocate(self, count: int) -> int:
+        """Reserves `count` consecutive numbers and returns the first one (sequence starts at 1)."""
+        if count < 1:
+            raise ValueError("count must be >= 1")
+        counter = await self.counters.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"value": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        self._observe_counter(counter)
+        return counter["value"] - count + 1
+
+    async def assign(self, documents: List[Dict[str, Any]]) -> None:
+        """Stamps `seq` on the documents that do not have one yet, in list order."""
+        unassigned = [doc for doc in documents if "seq" not in doc]
+        if not unassigned:
+            return
+        first = await self.allocate(len(unassigned))
+        for offset, doc in enumerate(unassigned):
+            doc["seq"] = first + offset
+
+    def fenced(self, seq: Optional[int]) -> bool:
+        """Whether the state update of the event numbered `seq` must wait for a projection swap."""
+        fence = self.fence
+        if fence is None or seq is None or seq < fence["from_seq"]:
+            return False
+        expires_at = fence.get("expires_at")
+        return expires_at is None or not recorded_before(expires_at, datetime.now(timezone.utc))
+
+    async def refresh_fence(self) -> None:
+        self._observe_counter(await self.counters.find_one({"_id": self.name}, {"value": 1, "fence": 1}))
+
+    async def wait_for_fence(self, seq: Optional[int], poll_interval: float = 0.5, refresh: bool = False) -> None:
+        """
+        Returns once the event numbered `seq` may be applied to current state: immediately
+        unless a write fence covers it, otherwise when the fence is lifted (or expires).
+        `refresh` re-reads the fence first, for callers that did not allocate `seq` here.
+        Waiters share one polling read and are released in the order they started waiting,
+        so held updates are submitted in their original order when the fence lifts.
+        """
+        if refresh:
+            await self.refresh_fence()
+        while self.fenced(seq):
+            if self._fence_poll is None:
+                self._fence_poll = asyncio.ensure_future(self._poll_fence(poll_interval))
+            await asyncio.shield(self._fence_poll)
+
+    async def _poll_fence(self, poll_interval: float) -> None:
+        try:
+            await asyncio.sleep(poll_interval)
+            await self.refresh_fence()
+        finally:
+            self._fence_poll = None
+
+
+async def raise_write_fence(
+    counters: AsyncIOMotorCollection, run_id: str, timeout_seconds: float, name: str = LOGS_SEQUENCE_NAME
+) -> int:
+    """
+    Fences the state updates of every event numbered after the current counter value,
+    atomically with allocation: an event either got its `seq` before the fence (and is
+    applied normally) or its allocation already saw the fence. The fence expires after
+    `timeout_seconds` so a crashed swap cannot hold live updates forever.
+    Returns the last `seq` allocated before the fence.
+    """
+    counter = await counters.find_one_and_update(
+        {"_id": name},
+        [{"$set": {"fence": {
+            "run_id": {"$literal": run_id},
+            "from_seq": {"$add": [{"$ifNull": ["$value", 0]}, 1]},
+            "expires_at": datetime.now(timezone.utc) + timedelta(seconds=timeout_seconds),
+        }}}],
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["fence"]["from_seq"] - 1
+
+
+async def lift_write_fence(counters: AsyncIOMotorCollection, run_id: str, name: str = LOGS_SEQUENCE_NAME) -> None:
+    await counters.update_one({"_id": name, "fence.run_id": run_id}, {"$unset": {"fence": ""}})
+
+
+def settled_prefix(
+    documents: List[Dict[str, Any]],
+    since_seq: int,
+    settled_before: datetime,
+) -> Tuple[List[Dict[str, Any]], int, bool, List[Tuple[int, int]]]:
+    """
+    Cuts a `seq`-ascending page at the first hole that may still be filled.
+
+    A number is allocated before its document is written, so a missing `seq` is either
+    a write still in flight or a write that failed. The hole is skipped once the next
+    present document was recorded before `settled_before`; otherwise the page stops there
+    so a poller never advances past an event it has not seen yet. A skipped hole is only
+    presumed abandoned, so it is reported: a very late write can still fill it.
+    Returns (documents to emit, next since_seq, whether the page stopped at a hole,
+    skipped holes as inclusive (from_seq, to_seq) ranges).
+    """
+    emitted: List[Dict[str, Any]] = []
+    gaps: List[Tuple[int, int]] = []
+    last_seq = since_seq
+    for doc in documents:
+        if doc["seq"] != last_seq + 1:
+            if not recorded_before(doc.get("recorded_at"), settled_before):
+                return emitted, last_seq, True, gaps
+            gaps.append((last_seq + 1, doc["seq"] - 1))
+        emitted.append(doc)
+        last_seq = doc["seq"]
+    return emitted, last_seq, False, gaps
+
+
+def recorded_before(recorded_at: Optional[datetime], moment: datetime) -> bool:
+    if recorded_at is None:
+        return True
+    if recorded_at.tzinfo is None:
+        recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+    return recorded_at < moment
@@ -0,0 +1,267 @@
+import asyncio
+import copy
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from app.services.outbox import oldest_pending_seq
+from app.services.projection_rebuild import settled_high_water
+from app.utils.update_operators import apply_update
+
+SNAPSHOTS_COLLECTION = "state_snapshots"
+SNAPSHOT_DOCS_COLLECTION = "state_snapshot_docs"
+
+# Highest log `seq` whose effects a current-state document already contains; maintained
+# with `$max` by StateUpdaterService.
+APPLIED_SEQ_FIELD = "_applied_seq"
+# The `seq`s of the last APPLIED_SEQS_WINDOW events applied to the document. Updates of one
+# document are not applied in `seq` order (events of other aggregates write it too), so
+# the highest `seq` alone cannot tell a replay whether an older event is already in.
+APPLIED_SEQS_FIELD = "_applied_seqs"
+APPLIED_SEQS_WINDOW = 64
+
+
+def tag_applied_seq(update: Dict[str, Any], seq: int) -> Dict[str, Any]:
+    """`update` extended to record on the document that the event numbered `seq` was applied."""
+    return {
+        **update,
+        "$max": {**update.get("$max", {}), APPLIED_SEQ_FIELD: seq},
+        "$push": {**update.get("$push", {}), APPLIED_SEQS_FIELD: {"$each": [seq], "$slice": -APPLIED_SEQS_WINDOW}},
+    }
+
+
+def contains_event(state: Optional[Dict[str, Any]], seq: int) -> bool:
+    """
+    Whether the copy `state` of a current-state document already contains the event
+    numbered `seq`. Exact for events among the last APPLIED_SEQS_WINDOW applied to it;
+    an event older than a full window is taken as contained. Documents written before
+    APPLIED_SEQS_FIELD existed fall back to APPLIED_SEQ_FIELD, which assumes their
+    updates were applied in `seq` order.
+    """
+    if state is None:
+        return False
+    applied = state.get(APPLIED_SEQS_FIELD)
+    if applied is None:
+        return seq <= state.get(APPLIED_SEQ_FIELD, 0)
+    return seq in applied or (len(applied) >= APPLIED_SEQS_WINDOW and seq < min(applied))
+
+
+async def snapshot_position(db: AsyncIOMotorDatabase, settle_seconds: float) -> int:
+    """
+    Log position a snapshot taken now can be tagged with: the settled high-water `seq`,
+    lowered below the oldest event whose state update is still waiting in the outbox.
+    """
+    position = await settled_high_water(db["logs"], settle_seconds)
+    pending_seq = await oldest_pending_seq(db)
+    if pending_seq is not None:
+        position = min(position, pending_seq - 1)
+    return position
+
+
+async def take_snapshot(db: AsyncIOMotorDatabase, collection_name: str, position: int, snapshot_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Copies `collection_name` server-side (`$merge`) into SNAPSHOT_DOCS_COLLECTION under
+    `snapshot_id`, tagged with `position`. The copy is not a point-in-time read: documents
+    may already contain events after `position`, which their APPLIED_SEQ_FIELD records.
+    Returns None when another process already took `snapshot_id`.
+    """
+    header = {
+        "_id": snapshot_id, "collection": collection_name, "seq": position,
+        "status": "writing", "created_at": datetime.now(timezone.utc),
+    }
+    try:
+        await db[SNAPSHOTS_COLLECTION].insert_one(header)
+    except DuplicateKeyError:
+        return None
+    await db[collection_name].aggregate([
+        {"$project": {"_id": {"snapshot_id": {"$literal": snapshot_id}, "doc_id": "$_id"}, "state": "$$ROOT"}},
+        {"$merge": {"into": SNAPSHOT_DOCS_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ], allowDiskUse=True).to_list(length=None)
+    doc_count = await db[SNAPSHOT_DOCS_COLLECTION].count_documents({"_id.snapshot_id": snapshot_id})
+    await db[SNAPSHOTS_COLLECTION].update_one(
+        {"_id": snapshot_id},
+        {"$set": {"status": "complete", "doc_count": doc_count, "completed_at": datetime.now(timezone.utc)}},
+    )
+    header.update(status="complete", doc_count=doc_count)
+    return header
+
+
+async def latest_snapshot(db: AsyncIOMotorDatabase, collection_name: str, at_or_before_seq: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    query: Dict[str, Any] = {"collection": collection_name, "status": "complete"}
+    if at_or_before_seq is not None:
+        query["seq"] = {"$lte": at_or_before_seq}
+    return await db[SNAPSHOTS_COLLECTION].find_one(query, sort=[("seq", -1)])
+
+
+async def load_snapshot_state(db: AsyncIOMotorDatabase, snapshot: Optional[Dict[str, Any]]) -> Dict[Any, Dict[str, Any]]:
+    if snapshot is None:
+        return {}
+    cursor = db[SNAPSHOT_DOCS_COLLECTION].find({"_id.snapshot_id": snapshot["_id"]})
+    return {doc["_id"]["doc_id"]: doc["state"] async for doc in cursor}
+
+
+async def prune_snapshots(db: AsyncIOMotorDatabase, collection_name: str, keep: int) -> int:
+    """Drops all but the `keep` newest complete snapshots of a collection (and stale partial ones)."""
+    headers = await db[SNAPSHOTS_COLLECTION].find({"collection": collection_name}).sort("seq", -1).to_list(length=None)
+    complete = [h for h in headers if h.get("status") == "complete"]
+    keep_ids = {h["_id"] for h in complete[:keep]}
+    # A partial snapshot newer than every kept one may still be being written.
+    newest_kept = complete[0]["created_at"] if complete else None
+    drop_ids = [
+        h["_id"] for h in headers
+        if h["_id"] not in keep_ids and (h.get("status") == "complete" or (newest_kept and h["created_at"] < newest_kept))
+    ]
+    for snapshot_id in drop_ids:
+        await db[SNAPSHOT_DOCS_COLLECTION].delete_many({"_id.snapshot_id": snapshot_id})
+        await db[SNAPSHOTS_COLLECTION].delete_one({"_id": snapshot_id})
+    return len(drop_ids)
+
+
+class InMemoryCollection:
+    """
+    Current-state collection replayed in memory: `find_one` and `update_one` by `_id`,
+    the latter applying the update operators to a dict. A write tagged (tag_applied_seq)
+    with the `seq` of an event the document's starting copy already contains is skipped,
+    so events a snapshot already has are not applied twice. The check is made against
+    the starting copy, per event: every write of a replayed event to a document is
+    applied or skipped together.
+    """
+
+    def __init__(self, docs: Dict[Any, Dict[str, Any]]):
+        self.docs = docs
+        self._base = {doc_id: copy.deepcopy(doc) for doc_id, doc in docs.items()}
+
+    async def find_one(self, query: Dict[str, Any], *args, **kwargs) -> Optional[Dict[str, Any]]:
+        doc = self.docs.get(query.get("_id"))
+        return copy.deepcopy(doc) if doc is not None else None
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs) -> None:
+        doc_id = query["_id"]
+        current = self.docs.get(doc_id)
+        if current is None and not upsert:
+            return
+        write_seq = update.get("$max", {}).get(APPLIED_SEQ_FIELD)
+        if write_seq is not None and contains_event(self._base.get(doc_id), write_seq):
+            return
+        self.docs[doc_id] = apply_update(current or {"_id": doc_id}, update, inserting=current is None)
+
+
+class InMemoryStateDatabase:
+    """Database handed to StateUpdaterService for an in-memory replay; other collections are the real ones."""
+
+    def __init__(self, db: AsyncIOMotorDatabase, states: Dict[str, Dict[Any, Dict[str, Any]]]):
+        self.db = db
+        self.collections = {name: InMemoryCollection(docs) for name, docs in states.items()}
+
+    def __getitem__(self, name: str):
+        return self.collections[name] if name in self.collections else self.db[name]
+
+    def __getattr__(self, name: str):
+        return getattr(self.db, name)
+
+
+async def replay_from_snapshots(
+    db: AsyncIOMotorDatabase,
+    collection_names: Sequence[str],
+    state_updater_factory: Callable[[Any], Any],
+    event_factory: Callable[..., Any],
+    target_seq: Optional[int] = None,
+) -> Tuple[Dict[str, Dict[Any, Dict[str, Any]]], int, int]:
+    """
+    Rebuilds the state of `collection_names` as of `target_seq` (default: the end of the
+    log) from the newest snapshot of each at or before it plus the events after the
+    oldest of those snapshots, all in memory. The work is bounded by the snapshot
+    interval rather than by the length of the log.
+    Returns (state per collection keyed by `_id`, start seq, last replayed seq).
+    """
+    states: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+    start_seq: Optional[int] = None
+    for name in collection_names:
+        snapshot = await latest_snapshot(db, name, target_seq)
+        states[name] = await load_snapshot_state(db, snapshot)
+        position = snapshot["seq"] if snapshot else 0
+        start_seq = position if start_seq is None else min(start_seq, position)
+    start_seq = start_seq or 0
+
+    memory_db = InMemoryStateDatabase(db, states)
+    state_updater = state_updater_factory(memory_db)
+    seq_filter: Dict[str, Any] = {"$gt": start_seq}
+    if target_seq is not None:
+        seq_filter["$lte"] = target_seq
+    last_seq = start_seq
+    async for doc in db["logs"].find({"seq": seq_filter}).sort("seq", 1):
+        doc.pop("_id", None)
+        await state_updater.update_state(event_factory(**doc))
+        last_seq = doc["seq"]
+    return states, start_seq, last_seq
+
+
+def diff_states(expected: Dict[Any, Dict[str, Any]], actual: Dict[Any, Dict[str, Any]], ignore: Sequence[str] = ()) -> List[Any]:
+    """Ids whose documents differ between two states (missing on either side included)."""
+    def comparable(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return None if doc is None else {k: v for k, v in doc.items() if k not in ignore}
+    return sorted(
+        (doc_id for doc_id in set(expected) | set(actual) if comparable(expected.get(doc_id)) != comparable(actual.get(doc_id))),
+        key=str,
+    )
+
+
+class SnapshotScheduler:
+    """
+    Takes a snapshot of every collection in `collection_names` each `interval_seconds`
+    and keeps the `retention` newest. Snapshot ids are derived from the interval slot, so
+    when several processes run a scheduler only one of them takes each snapshot.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        collection_names: Sequence[str],
+        interval_seconds: float,
+        retention: int,
+        position: Callable[[], Awaitable[int]],
+    ):
+        self.db = db
+        self.collection_names = list(collection_names)
+        self.interval_seconds = interval_seconds
+        self.retention = retention
+        self.position = position
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"State snapshot scheduler started (every {self.interval_seconds}s).")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def snapshot_all(self) -> List[Dict[str, Any]]:
+        slot = int(datetime.now(timezone.utc).timestamp() // self.interval_seconds)
+        position = await self.position()
+        taken = []
+        for name in self.collection_names:
+            header = await take_snapshot(self.db, name, position, f"{name}:{slot}")
+            if header:
+                taken.append(header)
+                logger.info(f"State snapshot {header['_id']} at seq {position}: {header['doc_count']} documents")
+                await prune_snapshots(self.db, name, self.retention)
+        return taken
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.snapshot_all()
+            except Exception as e:
+                logger.error(f"State snapshot failed: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,108 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from prometheus_client import Counter
+
+from app.utils.cache import TTLCache
+
+STATE_CACHE_REQUESTS = Counter(
+    "state_cache_requests_total",
+    "Leituras de documentos de current-state pelo cache read-through, por coleção e resultado",
+    ["collection", "result"],
+)
+
+
+class StateReadCache:
+    """
+    In-process read-through cache of current-state documents (LRU + TTL per collection).
+
+    StateUpdaterService invalidates a document synchronously whenever it writes it, so a
+    worker never serves a document older than its own last write. Writes made by other
+    processes are only bounded by the TTL. A load that overlaps any invalidation is not
+    cached, so a slow read cannot put back a document that was just overwritten.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._caches: Dict[str, TTLCache] = {}
+        self._invalidations = 0
+
+    def configure(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._caches.clear()
+
+    def _cache(self, collection: str) -> TTLCache:
+        cache = self._caches.get(collection)
+        if cache is None:
+            cache = self._caches[collection] = TTLCache(max_entries=self.max_entries, ttl_seconds=self.ttl_seconds)
+        return cache
+
+    async def read_through(
+        self,
+        collection: str,
+        doc_id: str,
+        load: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        cache = self._cache(collection)
+        doc = cache.get(doc_id)
+        if doc is not None:
+            STATE_CACHE_REQUESTS.labels(collection=collection, result="hit").inc()
+            return doc
+        STATE_CACHE_REQUESTS.labels(collection=collection, result="miss").inc()
+        invalidations_before = self._invalidations
+        doc = await load()
+        if doc is not None and self._invalidations == invalidations_before:
+            cache.set(doc_id, doc)
+        return doc
+
+    async def read_many(
+        self,
+        collection: str,
+        doc_ids: List[str],
+        load_many: Callable[[List[str]], Awaitable[List[Dict[str, Any]]]],
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Batch form of `read_through`: cached ids are served from memory and the rest are
+        fetched with a single `load_many(missing_ids)` call. Returns the documents found,
+        keyed by `_id`; ids without a document are simply absent.
+        """
+        cache = self._cache(collection)
+        found: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for doc_id in doc_ids:
+            doc = cache.get(doc_id)
+            if doc is not None:
+                found[doc_id] = doc
+            else:
+                missing.append(doc_id)
+        if found:
+            STATE_CACHE_REQUESTS.labels(collection=collection, result="hit").inc(len(found))
+        if not missing:
+            return found
+        STATE_CACHE_REQUESTS.labels(collection=collection, result="miss").inc(len(missing))
+        invalidations_before = self._invalidations
+        docs = await load_many(missing)
+        cacheable = self._invalidations == invalidations_before
+        for doc in docs:
+            found[doc["_id"]] = doc
+            if cacheable:
+                cache.set(doc["_id"], doc)
+        return found
+
+    def invalidate(self, collection: str, doc_id: Any) -> None:
+        self._invalidations += 1
+        cache = self._caches.get(collection)
+        if cache is not None:
+            cache.pop(doc_id)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            collection: {"entries": len(cache), "hits": cache.hits, "misses": cache.misses, "hit_rate": cache.hit_rate}
+            for collection, cache in self._caches.items()
+        }
+
+
+# Process-wide instance shared by the query endpoints and StateUpdaterService;
+# sized from settings at startup.
+state_cache = StateReadCache()
@@ -0,0 +1,116 @@
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.services.aggregates import REFERENCE_FIELDS, resolve_aggregate_keys
+from app.services.snapshots import (
+    APPLIED_SEQ_FIELD, SNAPSHOT_DOCS_COLLECTION, SNAPSHOTS_COLLECTION, InMemoryStateDatabase
+)
+
+# Snapshots tried, newest first, before folding the aggregate's whole history instead.
+MAX_SNAPSHOT_CANDIDATES = 3
+
+
+async def _snapshot_base(
+    db: AsyncIOMotorDatabase,
+    collection_name: str,
+    doc_id: Any,
+    as_of: datetime,
+) -> Optional[Dict[str, Any]]:
+    """
+    Newest snapshot of the document that is known to predate `as_of`: the snapshot was
+    started before it, and the last event the copied document contains happened before
+    it (snapshot copies are not point-in-time, see snapshots.take_snapshot).
+    Returns {"seq", "doc"} (doc None if the document did not exist yet), or None.
+    """
+    headers = await db[SNAPSHOTS_COLLECTION].find(
+        {"collection": collection_name, "status": "complete", "created_at": {"$lte": as_of}},
+    ).sort("seq", -1).limit(MAX_SNAPSHOT_CANDIDATES).to_list(length=MAX_SNAPSHOT_CANDIDATES)
+    for header in headers:
+        snapshot_doc = await db[SNAPSHOT_DOCS_COLLECTION].find_one({"_id": {"snapshot_id": header["_id"], "doc_id": doc_id}})
+        state = snapshot_doc["state"] if snapshot_doc else None
+        applied_seq = (state or {}).get(APPLIED_SEQ_FIELD)
+        if applied_seq is not None and applied_seq > header["seq"]:
+            last_event = await db["logs"].find_one({"seq": applied_seq}, {"timestamp": 1})
+            if last_event and last_event.get("timestamp") and last_event["timestamp"] > as_of:
+                continue
+        return {"seq": header["seq"], "doc": state}
+    return None
+
+
+async def state_as_of(
+    db: AsyncIOMotorDatabase,
+    collection_name: str,
+    doc_id: Any,
+    aggregate_key: str,
+    as_of: datetime,
+    collection_names: Sequence[str],
+    state_updater_factory: Callable[[Any], Any],
+    event_factory: Callable[..., Any],
+) -> Optional[Dict[str, Any]]:
+    """
+    State of one current-state document as it was at `as_of` (compared with event
+    `timestamp`s): its copy in the nearest earlier snapshot, plus that aggregate's later
+    events up to `as_of`, found through the (aggregate_key, seq) index and folded in
+    memory by the state handlers. `collection_names` are all the collections handlers may
+    write, kept in memory so a historical lookup never touches live state.
+    Returns None when the document did not exist at `as_of`.
+    """
+    if as_of.tzinfo is not None:
+        as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)  # stored timestamps are naive UTC
+    base = await _snapshot_base(db, collection_name, doc_id, as_of)
+    start_seq = base["seq"] if base else 0
+    states: Dict[str, Dict[Any, Dict[str, Any]]] = {name: {} for name in collection_names}
+    if base and base["doc"] is not None:
+        states[collection_name][doc_id] = base["doc"]
+
+    state_updater = state_updater_factory(InMemoryStateDatabase(db, states))
+    cursor = db["logs"].find(
+        {"aggregate_key": aggregate_key, "seq": {"$gt": start_seq}, "timestamp": {"$lte": as_of}},
+    ).sort("seq", 1)
+    folded = 0
+    async for doc in cursor:
+        doc.pop("_id", None)
+        await state_updater.update_state(event_factory(**doc))
+        folded += 1
+    logger.debug(f"{collection_name}/{doc_id} as of {as_of}: snapshot seq {start_seq} + {folded} events")
+    return states[collection_name].get(doc_id)
+
+
+async def backfill_aggregate_keys(db: AsyncIOMotorDatabase, batch_size: int = 1000) -> int:
+    """
+    Adds `aggregate_key` to log documents written before it was stored, and re-keys the
+    events that reference another log (aggregates.REFERENCE_FIELDS) with the referenced
+    event's aggregate, as they are now keyed when recorded. Returns how many were updated.
+    """
+    query = {"$or": [
+        {"aggregate_key": {"$exists": False}},
+        *({f"data.{field}": {"$exists": True}} for field in REFERENCE_FIELDS),
+    ]}
+    cursor = db["logs"].find(query, {"_id": 1, "id": 1, "type": 1, "data": 1, "aggregate_key": 1}).sort("seq", 1).batch_size(batch_size)
+    updated = 0
+    batch: List[Dict[str, Any]] = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            updated += await _rekey(db, batch)
+            batch = []
+            logger.info(f"aggregate_key backfilled for {updated} events")
+    if batch:
+        updated += await _rekey(db, batch)
+    return updated
+
+
+async def _rekey(db: AsyncIOMotorDatabase, docs: List[Dict[str, Any]]) -> int:
+    previous = {doc["_id"]: doc.get("aggregate_key") for doc in docs}
+    await resolve_aggregate_keys(db["logs"], docs)
+    operations = [
+        UpdateOne({"_id": doc["_id"]}, {"$set": {"aggregate_key": doc["aggregate_key"]}})
+        for doc in docs if doc["aggregate_key"] != previous[doc["_id"]]
+    ]
+    if operations:
+        await db["logs"].bulk_write(operations, ordered=False)
+    return len(operations)
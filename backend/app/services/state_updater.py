@@ -1,27 +1,148 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
 from app.models import (
     LogEvent, LogAcionadoInstitucionalmenteData, LitigioInstitucionalInfo, StateUpdateResult
 )
 from app.config import settings
+from app.services.name_search import with_name_search_fields
+from app.services.aggregate_scheduler import AggregateScheduler
+from app.services.aggregates import aggregate_key_for_event, stored_aggregate_key
+from app.services.handler_registry import HandlerRegistry, HandlerSpec
+from app.services.snapshots import SnapshotScheduler, snapshot_position, tag_applied_seq
+from app.services.state_history import state_as_of
+from app.services.state_cache import state_cache
+
+CS_INVENTORY_COLLECTION = "current_state_inventory"
+CS_ORDERS_COLLECTION = "current_state_orders"
+
+# Field of each current-state collection searched by /query via prefix/n-gram indexes.
+NAME_SEARCH_FIELDS = {CS_INVENTORY_COLLECTION: "name", CS_ORDERS_COLLECTION: "order_ref"}
+
+# Aggregate-key prefix (see aggregates.AGGREGATE_ID_FIELDS) of each current-state collection's documents.
+STATE_AGGREGATE_PREFIXES = {CS_INVENTORY_COLLECTION: "product", CS_ORDERS_COLLECTION: "order"}
+
+
+
+def state_document_of(aggregate_key: str) -> Optional[Tuple[str, str]]:
+    """(collection, _id) of the current-state document holding an aggregate, if it has one."""
+    prefix, _, object_id = aggregate_key.partition(":")
+    for collection_name, collection_prefix in STATE_AGGREGATE_PREFIXES.items():
+        if prefix == collection_prefix:
+            return collection_name, object_id
+    return None
+
+
+_snapshot_scheduler: Optional[SnapshotScheduler] = None
+_update_scheduler: Optional[AggregateScheduler] = None
+
+
+def get_update_scheduler() -> AggregateScheduler:
+    """Process-wide lanes that order synchronous state updates per aggregate."""
+    global _update_scheduler
+    if _update_scheduler is None:
+        _update_scheduler = AggregateScheduler(lanes=settings.STATE_UPDATE_LANES)
+    return _update_scheduler
+
+
+async def close_update_scheduler() -> None:
+    global _update_scheduler
+    if _update_scheduler is not None:
+        await _update_scheduler.close()
+        _update_scheduler = None
+
+
+async def load_state_as_of(db, collection_name: str, object_id: str, as_of: datetime) -> Optional[Dict[str, Any]]:
+    """Current-state document `object_id` as it was at `as_of`, or None if it did not exist yet."""
+    return await state_as_of(
+        db, collection_name, object_id, f"{STATE_AGGREGATE_PREFIXES[collection_name]}:{object_id}", as_of,
+        list(STATE_AGGREGATE_PREFIXES), StateUpdaterService, LogEvent,
+    )
+
+
+async def start_snapshot_scheduler(db) -> None:
+    """Starts the periodic snapshots of the current-state collections in this process."""
+    global _snapshot_scheduler
+    if not settings.STATE_SNAPSHOTS_ENABLED or _snapshot_scheduler is not None:
+        return
+    _snapshot_scheduler = SnapshotScheduler(
+        db,
+        [CS_INVENTORY_COLLECTION, CS_ORDERS_COLLECTION],
+        interval_seconds=settings.STATE_SNAPSHOT_INTERVAL_SECONDS,
+        retention=settings.STATE_SNAPSHOT_RETENTION,
+        position=lambda: snapshot_position(db, settings.SEQUENCE_GAP_SETTLE_SECONDS),
+    )
+    _snapshot_scheduler.start()
+
+
+async def stop_snapshot_scheduler() -> None:
+    global _snapshot_scheduler
+    if _snapshot_scheduler is not None:
+        await _snapshot_scheduler.stop()
+        _snapshot_scheduler = None
+
 
 class StateUpdaterService:
     # ... existing methods ...
 
-    async def _handle_log_acionado_institucionalmente(self, event: LogEvent, result_obj_for_state: StateUpdateResult):
+    async def update_state(self, event: LogEvent) -> StateUpdateResult:
+        """
+        Applies `event` to current state with the handler registered for its type in
+        STATE_HANDLER_REGISTRY; events of other types leave current state unchanged.
+        """
+        result = StateUpdateResult()
+        await STATE_HANDLER_REGISTRY.dispatch(self, event, result)
+        return result
+
+    async def update_state_ordered(self, event: LogEvent, aggregate_key: Optional[str] = None) -> Optional[StateUpdateResult]:
+        """
+        `update_state` through the per-aggregate scheduler: updates of the same order or
+        product run one after another in submission order, other aggregates in parallel.
+        `aggregate_key` is the key stored on the event's log document (see
+        aggregates.resolve_aggregate_keys); it differs from the key derived from
+        `event.data` for events that write another log's aggregate.
+        """
+        aggregate_key = aggregate_key or aggregate_key_for_event(event.type, event.data, event.id)
+        return await get_update_scheduler().submit(aggregate_key, lambda: self.update_state(event))
+
+    async def _update_state_document(
+        self, collection_name: str, object_id: Any, update: Dict[str, Any], applied_seq: Optional[int] = None, **kwargs
+    ):
+        """
+        Single write path for current-state documents: applies the update and drops the
+        document from the read-through cache in the same call, before the caller resumes.
+        Updates that set the searchable name field also set its normalized form and n-grams.
+        `applied_seq` (the `seq` of the event being applied) is kept on the document so a
+        replay from a snapshot can tell which events the document already contains.
+        """
+        if applied_seq is not None:
+            update = tag_applied_seq(update, applied_seq)
+        search_field = NAME_SEARCH_FIELDS.get(collection_name)
+        if search_field:
+            update = with_name_search_fields(update, search_field)
+        result = await self.db[collection_name].update_one({"_id": object_id}, update, **kwargs)
+        state_cache.invalidate(collection_name, object_id)
+        return result
+
+    def _determine_main_state_collection_and_id(self, log_doc: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """
+        Current-state document of the aggregate a log document belongs to. Uses the same
+        aggregate key the event was recorded (and is ordered and replayed) under.
+        """
+        return state_document_of(stored_aggregate_key(log_doc))
+
+    async def _handle_log_acionado_institucionalmente(
+        self, event: LogEvent, result_obj_for_state: StateUpdateResult, event_data: LogAcionadoInstitucionalmenteData
+    ):
         log = logger.bind(event_id=event.id, handler="_handle_log_acionado_institucionalmente")
-        try:
-            event_data = LogAcionadoInstitucionalmenteData(**event.data)
-        except Exception as e:
-            log.error(f"Malformed event.data: {e}")
-            raise
 
         # 1. Adicionar info do litígio ao CurrentState do objeto principal afetado pelo target_log_id
         target_log_doc = await self.db["logs"].find_one({"id": event_data.target_log_id})
         if not target_log_doc:
             log.warning(f"Target log {event_data.target_log_id} not found.")
             return
-        from app.models import LogEvent as LogEventModel
-        target_info = await self._determine_main_state_collection_and_id(LogEventModel(**target_log_doc))
+        # The acionamento was recorded under this same aggregate key (aggregates.REFERENCE_FIELDS).
+        target_info = self._determine_main_state_collection_and_id(target_log_doc)
         if target_info:
             target_collection_name, target_object_id = target_info
             litigio_info = LitigioInstitucionalInfo(
@@ -32,8 +153,9 @@ class StateUpdaterService:
                 motivo=event_data.motivo_detalhado,
                 status_litigio="aberto"
             )
-            await self.db[target_collection_name].update_one(
-                {"_id": target_object_id},
+            await self._update_state_document(
+                target_collection_name,
+                target_object_id,
                 {
                     "$push": {"litigios_institucionais": {"$each": [litigio_info.model_dump()], "$slice": -5}},
                     "$set": {
@@ -41,6 +163,17 @@ class StateUpdaterService:
                         "meta.has_active_litigio": True,
                         "last_log_event_id": event.id, "last_updated_at": event.timestamp
                     }
-                }
+                },
+                applied_seq=event.seq,
             )
-        # 2. Sugerir despacho (simplificado: omite despacho para foco no litígio)
\ No newline at end of file
+        # 2. Sugerir despacho (simplificado: omite despacho para foco no litígio)
+
+
+# Built once when the module is loaded: LogEvent.type -> handler, data model, target collection.
+STATE_HANDLER_REGISTRY = HandlerRegistry()
+STATE_HANDLER_REGISTRY.register(HandlerSpec(
+    "log_acionado_institucionalmente",
+    StateUpdaterService._handle_log_acionado_institucionalmente,
+    data_model=LogAcionadoInstitucionalmenteData,
+    target_collection=None,  # the collection of the litigated event's aggregate
+))
@@ -0,0 +1,89 @@
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from prometheus_client import Counter
+
+from app.services.timeline_counts import filter_signature
+from app.utils.cache import TTLCache
+
+TIMELINE_CACHE_REQUESTS = Counter(
+    "timeline_cache_requests_total",
+    "Consultas ao cache de respostas do /timeline, por resultado",
+    ["result"],
+)
+
+
+class TimelineGenerations:
+    """
+    Write generations of the `logs` collection as seen by this process: one global
+    counter plus one per event type, bumped by LogService after every persisted write.
+    A cached response is only served while the generation it was computed at is current.
+    """
+
+    def __init__(self) -> None:
+        self.global_generation = 0
+        self._by_type: Dict[str, int] = {}
+
+    def bump(self, event_types: Iterable[Optional[str]]) -> None:
+        self.global_generation += 1
+        for event_type in set(event_types):
+            if event_type is not None:
+                self._by_type[event_type] = self._by_type.get(event_type, 0) + 1
+
+    def current(self, event_type: Optional[str] = None) -> Tuple[str, int]:
+        """Generation a query depends on: its event type's when filtered by type, otherwise the global one."""
+        if event_type is None:
+            return ("*", self.global_generation)
+        return (event_type, self._by_type.get(event_type, 0))
+
+
+class TimelineResponseCache:
+    """
+    Size-bounded LRU of encoded timeline responses, keyed by normalised query and tagged
+    with the generation they were computed at. The TTL bounds staleness with respect to
+    writes made by other processes, which do not bump this process' generations.
+    """
+
+    def __init__(self, generations: TimelineGenerations, max_entries: int = 1000, ttl_seconds: float = 5.0):
+        self.generations = generations
+        self._entries: TTLCache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, event_type: Optional[str] = None) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            TIMELINE_CACHE_REQUESTS.labels(result="miss").inc()
+            return None
+        generation, body = entry
+        if generation != self.generations.current(event_type):
+            self._entries.pop(key)
+            self.misses += 1
+            TIMELINE_CACHE_REQUESTS.labels(result="stale").inc()
+            return None
+        self.hits += 1
+        TIMELINE_CACHE_REQUESTS.labels(result="hit").inc()
+        return body
+
+    def set(self, key: Hashable, generation: Tuple[str, int], body: bytes) -> None:
+        self._entries.set(key, (generation, body))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def response_cache_key(*parts: Any) -> str:
+    """Normalised key of a timeline request (filter dicts are key-order independent)."""
+    return filter_signature(list(parts))
+
+
+# Process-wide generations, bumped by LogService and read by the timeline endpoints.
+timeline_generations = TimelineGenerations()
@@ -0,0 +1,42 @@
+import json
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.utils.cache import TTLCache
+
+COUNT_MODES = ("exact", "estimated", "none")
+
+
+def filter_signature(query_filter: Dict[str, Any]) -> str:
+    """Stable cache key of a Mongo filter (key order and value types normalised)."""
+    return json.dumps(query_filter, sort_keys=True, default=str, separators=(",", ":"))
+
+
+async def count_timeline(
+    collection: AsyncIOMotorCollection,
+    query_filter: Dict[str, Any],
+    count_mode: str,
+    cache: TTLCache,
+) -> Optional[int]:
+    """
+    total_count of a timeline query according to `count_mode`:
+    - exact: `count_documents` over the whole matching set;
+    - estimated: collection metadata when there is no filter, otherwise the last exact
+      count of the same filter signature, recomputed at most once per cache TTL;
+    - none: no count at all (None).
+    """
+    if count_mode == "none":
+        return None
+    if count_mode == "exact":
+        return await collection.count_documents(query_filter)
+    if not query_filter:
+        return await collection.estimated_document_count()
+
+    signature = filter_signature(query_filter)
+    cached = cache.get(signature)
+    if cached is not None:
+        return cached
+    total = await collection.count_documents(query_filter)
+    cache.set(signature, total)
+    return total
@@ -0,0 +1,37 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Tuple
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(timestamp: datetime, event_id: str) -> str:
+    """Opaque page token for the last `(timestamp, id)` key a client has seen."""
+    raw = json.dumps({"ts": timestamp.isoformat(), "id": event_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, str]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["ts"]), str(payload["id"])
+    except Exception as e:
+        raise InvalidCursor(f"Malformed cursor: {e}") from e
+
+
+def keyset_filter(token: str, descending: bool = True) -> Dict[str, Any]:
+    """
+    Filter selecting the events strictly after the cursor in `(timestamp, id)` order
+    (descending by default). Served as an index seek by `(timestamp, id)`-suffixed
+    indexes, so the cost of a page does not depend on how deep it is.
+    """
+    timestamp, event_id = decode_cursor(token)
+    after = "$lt" if descending else "$gt"
+    return {"$or": [
+        {"timestamp": {after: timestamp}},
+        {"timestamp": timestamp, "id": {after: event_id}},
+    ]}
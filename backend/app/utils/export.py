@@ -0,0 +1,58 @@
+import csv
+import io
+from typing import Any, AsyncIterator, Dict, List
+
+import orjson
+
+EXPORT_CSV_COLUMNS = ["id", "seq", "timestamp", "type", "author", "witness", "channel", "origin", "data", "meta"]
+_JSON_COLUMNS = {"data", "meta"}
+_ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+def _dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=str, option=_ORJSON_OPTIONS)
+
+
+async def iter_ndjson_export(documents: AsyncIterator[Dict[str, Any]], rows_per_chunk: int = 500) -> AsyncIterator[bytes]:
+    """
+    Encodes raw log documents straight to NDJSON, `rows_per_chunk` lines per yielded
+    chunk. Nothing but the current chunk is held in memory; the next documents are only
+    pulled from the cursor once the response has consumed the previous chunk.
+    """
+    chunk: List[bytes] = []
+    async for doc in documents:
+        doc.pop("_id", None)
+        chunk.append(_dumps(doc))
+        if len(chunk) >= rows_per_chunk:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+async def iter_csv_export(documents: AsyncIterator[Dict[str, Any]], rows_per_chunk: int = 500) -> AsyncIterator[bytes]:
+    """CSV counterpart of `iter_ndjson_export`; `data` and `meta` are embedded as JSON."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    rows = 0
+    async for doc in documents:
+        writer.writerow([_csv_cell(column, doc.get(column)) for column in EXPORT_CSV_COLUMNS])
+        rows += 1
+        if rows >= rows_per_chunk:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _csv_cell(column: str, value: Any) -> Any:
+    if value is None:
+        return ""
+    if column in _JSON_COLUMNS:
+        return _dumps(value).decode("utf-8")
+    if column == "timestamp" and hasattr(value, "isoformat"):
+        return _dumps(value).decode("utf-8").strip('"')
+    return value
@@ -0,0 +1,140 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """
+    Declarative description of one index. The name defaults to the one MongoDB
+    generates for the key pattern, so indexes created by hand (or by older scripts)
+    are recognised instead of clashing with a differently-named duplicate.
+    """
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+    partial_filter: Optional[Dict[str, Any]] = None
+    name: Optional[str] = None
+
+    @property
+    def index_name(self) -> str:
+        return self.name or "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+    def options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {}
+        if self.unique:
+            options["unique"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        if self.partial_filter is not None:
+            options["partialFilterExpression"] = self.partial_filter
+        return options
+
+    def to_index_model(self) -> IndexModel:
+        return IndexModel(list(self.keys), name=self.index_name, background=True, **self.options())
+
+    def differs_from(self, existing: Dict[str, Any]) -> bool:
+        """Whether an `index_information()` entry of the same name has other keys or options."""
+        if [tuple(k) for k in existing.get("key", [])] != [(key, direction) for key, direction in self.keys]:
+            return True
+        if bool(existing.get("unique", False)) != self.unique:
+            return True
+        if existing.get("expireAfterSeconds") != self.expire_after_seconds:
+            return True
+        return existing.get("partialFilterExpression") != self.partial_filter
+
+
+@dataclass
+class ReconcileReport:
+    created: List[str] = field(default_factory=list)
+    rebuilt: List[str] = field(default_factory=list)
+    mismatched: List[str] = field(default_factory=list)
+    unmanaged: List[str] = field(default_factory=list)
+    up_to_date: List[str] = field(default_factory=list)
+
+
+async def reconcile_indexes(
+    db: AsyncIOMotorDatabase,
+    registry: Dict[str, List[IndexSpec]],
+    drop_mismatched: bool = False,
+    dry_run: bool = False,
+) -> ReconcileReport:
+    """
+    Brings the indexes of every registered collection in line with the registry.
+
+    Missing indexes are built in the background. An index whose definition changed is
+    only dropped and rebuilt with `drop_mismatched` (rebuilding a large index is an
+    operational decision); otherwise it is reported. Indexes that are not in the
+    registry are reported and never dropped. `dry_run` only reports.
+    Entries are reported as "<collection>.<index name>".
+    """
+    report = ReconcileReport()
+    for collection_name, specs in registry.items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        to_create: List[IndexSpec] = []
+        for spec in specs:
+            qualified = f"{collection_name}.{spec.index_name}"
+            current = existing.get(spec.index_name)
+            if current is None:
+                to_create.append(spec)
+                report.created.append(qualified)
+            elif not spec.differs_from(current):
+                report.up_to_date.append(qualified)
+            elif drop_mismatched:
+                if not dry_run:
+                    await collection.drop_index(spec.index_name)
+                to_create.append(spec)
+                report.rebuilt.append(qualified)
+            else:
+                logger.warning(f"Index {qualified} differs from its registered definition; rebuild it with drop_mismatched.")
+                report.mismatched.append(qualified)
+
+        registered = {spec.index_name for spec in specs} | {"_id_"}
+        report.unmanaged.extend(f"{collection_name}.{name}" for name in existing if name not in registered)
+
+        if to_create and not dry_run:
+            logger.info(f"Building indexes on '{collection_name}': {[spec.index_name for spec in to_create]}")
+            await collection.create_indexes([spec.to_index_model() for spec in to_create])
+    return report
+
+
+def plan_stages(plan: Optional[Dict[str, Any]]) -> List[str]:
+    """Flattens the stages of an explain plan tree (classic and slot-based engines)."""
+    if not plan:
+        return []
+    stages = [plan["stage"]] if "stage" in plan else []
+    if "queryPlan" in plan:
+        stages += plan_stages(plan["queryPlan"])
+    if "inputStage" in plan:
+        stages += plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += plan_stages(child)
+    return stages
+
+
+async def explain_find(
+    db: AsyncIOMotorDatabase,
+    collection_name: str,
+    query_filter: Dict[str, Any],
+    sort: Optional[List[Tuple[str, int]]] = None,
+    limit: int = 100,
+) -> Dict[str, Any]:
+    """Winning plan of a find as the server would run it, and whether it scans the collection."""
+    find_command: Dict[str, Any] = {"find": collection_name, "filter": query_filter, "limit": limit}
+    if sort:
+        find_command["sort"] = dict(sort)
+    explained = await db.command({"explain": find_command, "verbosity": "queryPlanner"})
+    winning_plan = explained.get("queryPlanner", {}).get("winningPlan", {})
+    stages = plan_stages(winning_plan)
+    return {
+        "collection": collection_name,
+        "filter": query_filter,
+        "sort": find_command.get("sort"),
+        "stages": stages,
+        "collscan": "COLLSCAN" in stages,
+        "in_memory_sort": "SORT" in stages,
+    }
@@ -0,0 +1,25 @@
+from typing import AsyncIterator
+
+
+class NDJSONLineTooLong(ValueError):
+    pass
+
+
+async def iter_ndjson_lines(byte_chunks: AsyncIterator[bytes], max_line_bytes: int = 1_048_576) -> AsyncIterator[bytes]:
+    """
+    Splits a streamed request body into NDJSON lines without buffering the whole body.
+    Yields every line (blank ones included, so callers can keep line numbers); a final
+    line without a trailing newline is yielded too.
+    """
+    buffer = b""
+    async for chunk in byte_chunks:
+        if not chunk:
+            continue
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.rstrip(b"\r")
+        if len(buffer) > max_line_bytes:
+            raise NDJSONLineTooLong(f"NDJSON line exceeds {max_line_bytes} bytes")
+    if buffer:
+        yield buffer.rstrip(b"\r")
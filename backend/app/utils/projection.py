@@ -0,0 +1,59 @@
+import re
+from typing import Any, Dict, Iterable, Optional, Set, Type
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+_FIELD_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$")
+
+
+class InvalidFieldSelection(ValueError):
+    pass
+
+
+def build_projection(
+    fields: Optional[str],
+    allowed_roots: Optional[Set[str]] = None,
+    always: Iterable[str] = (),
+) -> Optional[Dict[str, int]]:
+    """
+    Turns a `fields=a,b,data.x` query parameter into a Mongo inclusion projection.
+
+    Returns None when no fields were requested (full documents). Paths must be plain
+    (dot-notation) field names under `allowed_roots`; `always` fields are added so the
+    caller keeps what it needs (ids, sort keys). A path nested in another requested path
+    is dropped, since Mongo rejects overlapping projections.
+    """
+    if fields is None:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    if not requested:
+        raise InvalidFieldSelection("'fields' must list at least one field")
+    for field in requested:
+        if not _FIELD_PATTERN.match(field):
+            raise InvalidFieldSelection(f"Invalid field path '{field}'")
+        if allowed_roots is not None and field.split(".")[0] not in allowed_roots:
+            raise InvalidFieldSelection(f"Unknown field '{field}'")
+
+    paths = set(requested) | set(always)
+    projection = {
+        path: 1 for path in sorted(paths)
+        if not any(path.startswith(f"{other}.") for other in paths)
+    }
+    if "_id" not in paths:
+        projection["_id"] = 0
+    return projection
+
+
+def model_field_roots(model_cls: Type[BaseModel]) -> Set[str]:
+    """Top-level document fields of a response model (aliases where set), usable as `allowed_roots`."""
+    return {field.alias or name for name, field in model_cls.model_fields.items()}
+
+
+def raw_json_response(content: Any) -> Response:
+    """JSON response built straight from documents with orjson, without model validation."""
+    return Response(
+        orjson.dumps(content, default=str, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z),
+        media_type="application/json",
+    )
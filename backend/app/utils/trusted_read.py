@@ -0,0 +1,64 @@
+import random
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from loguru import logger
+from prometheus_client import Counter
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+
+READ_VALIDATION_TOTAL = Counter(
+    "read_validation_total",
+    "Documentos validados por amostragem no caminho de leitura confiável, por modelo e resultado",
+    ["model", "result"],
+)
+
+
+@lru_cache(maxsize=None)
+def _response_fields(model_cls: Type[BaseModel]) -> Tuple[Tuple[str, str, Optional[FieldInfo]], ...]:
+    """
+    (source key in the document, key in the response, FieldInfo or None when required)
+    for every model field. Defaults are produced per row from the FieldInfo, so a
+    mutable default is never shared between rows or requests.
+    """
+    return tuple(
+        (name, info.alias or name, None if info.is_required() else info)
+        for name, info in model_cls.model_fields.items()
+    )
+
+
+def trusted_row(
+    model_cls: Type[BaseModel],
+    doc: Dict[str, Any],
+    sample_rate: float = 0.0,
+) -> Optional[Dict[str, Any]]:
+    """
+    Shapes a persisted document like `model_cls(**doc)` would serialize it (model fields
+    only, response keys by alias, defaults for missing optional fields) without
+    validating it: documents were validated when written. A `sample_rate` fraction of
+    rows is still fully validated to catch schema drift; a row that fails is logged,
+    counted and returned as None, as the per-row validation used to skip it.
+    """
+    if sample_rate > 0 and random.random() < sample_rate:
+        try:
+            model_cls.model_validate(doc)
+            READ_VALIDATION_TOTAL.labels(model=model_cls.__name__, result="ok").inc()
+        except Exception as e:
+            READ_VALIDATION_TOTAL.labels(model=model_cls.__name__, result="drift").inc()
+            logger.warning(f"Schema drift in persisted {model_cls.__name__} {doc.get('id', doc.get('_id'))}: {e}")
+            return None
+
+    row: Dict[str, Any] = {}
+    for name, key, optional in _response_fields(model_cls):
+        if key in doc:
+            row[key] = doc[key]
+        elif name in doc:
+            row[key] = doc[name]
+        elif optional is not None:
+            row[key] = optional.get_default(call_default_factory=True)
+    return row
+
+
+def trusted_rows(model_cls: Type[BaseModel], docs: List[Dict[str, Any]], sample_rate: float = 0.0) -> List[Dict[str, Any]]:
+    rows = (trusted_row(model_cls, doc, sample_rate) for doc in docs)
+    return [row for row in rows if row is not None]
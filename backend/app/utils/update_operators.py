@@ -0,0 +1,88 @@
+import copy
+from typing import Any, Dict, List, Tuple
+
+SUPPORTED_OPERATORS = ("$set", "$setOnInsert", "$unset", "$inc", "$max", "$min", "$push", "$addToSet")
+
+
+class UnsupportedUpdate(ValueError):
+    pass
+
+
+def _parent(doc: Dict[str, Any], path: str, create: bool) -> Tuple[Any, str]:
+    """Container holding the last segment of a dotted `path`, created on the way if asked."""
+    *parents, leaf = path.split(".")
+    node: Any = doc
+    for key in parents:
+        if isinstance(node, list):
+            node = node[int(key)]
+            continue
+        if key not in node or node[key] is None:
+            if not create:
+                return None, leaf
+            node[key] = {}
+        node = node[key]
+    return node, leaf
+
+
+def _get(doc: Dict[str, Any], path: str, default: Any = None) -> Any:
+    parent, leaf = _parent(doc, path, create=False)
+    if parent is None:
+        return default
+    if isinstance(parent, list):
+        index = int(leaf)
+        return parent[index] if index < len(parent) else default
+    return parent.get(leaf, default)
+
+
+def _set(doc: Dict[str, Any], path: str, value: Any) -> None:
+    parent, leaf = _parent(doc, path, create=True)
+    if isinstance(parent, list):
+        parent[int(leaf)] = value
+    else:
+        parent[leaf] = value
+
+
+def _push(current: Any, spec: Any, unique: bool) -> List[Any]:
+    values = list(current or [])
+    if isinstance(spec, dict) and "$each" in spec:
+        items, slice_ = spec["$each"], spec.get("$slice")
+    else:
+        items, slice_ = [spec], None
+    for item in items:
+        if not unique or item not in values:
+            values.append(item)
+    if slice_ is not None:
+        values = values[slice_:] if slice_ < 0 else values[:slice_]
+    return values
+
+
+def apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False) -> Dict[str, Any]:
+    """
+    Applies a MongoDB update document to an in-memory copy of `doc` and returns it, so
+    handler writes can be replayed without a server. Covers the operators the state
+    handlers use (see SUPPORTED_OPERATORS, dotted paths included); `$setOnInsert` only
+    applies when `inserting`. Anything else raises UnsupportedUpdate.
+    """
+    unsupported = [op for op in update if op not in SUPPORTED_OPERATORS]
+    if unsupported:
+        raise UnsupportedUpdate(f"Update operators not supported in memory: {unsupported}")
+    result = copy.deepcopy(doc)
+    for operator, fields in update.items():
+        if operator == "$setOnInsert" and not inserting:
+            continue
+        for path, value in fields.items():
+            if operator in ("$set", "$setOnInsert"):
+                _set(result, path, copy.deepcopy(value))
+            elif operator == "$unset":
+                parent, leaf = _parent(result, path, create=False)
+                if isinstance(parent, dict):
+                    parent.pop(leaf, None)
+            elif operator == "$inc":
+                _set(result, path, _get(result, path, 0) + value)
+            elif operator in ("$max", "$min"):
+                current = _get(result, path)
+                if current is None or (value > current if operator == "$max" else value < current):
+                    _set(result, path, value)
+            else:
+                _set(result, path, _push(_get(result, path), copy.deepcopy(value), unique=operator == "$addToSet"))
+    return result
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import BulkWriteError
+
+from app.services.event_batcher import EventBatcher
+
+
+def make_collection():
+    collection = MagicMock()
+    collection.insert_many = AsyncMock()
+    return collection
+
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_one_insert_many():
+    collection = make_collection()
+    batcher = EventBatcher(collection, window_ms=20, max_batch_size=100)
+
+    await asyncio.gather(*(batcher.submit({"id": f"evt_{i}"}) for i in range(10)))
+
+    collection.insert_many.assert_awaited_once()
+    docs = collection.insert_many.await_args.args[0]
+    assert [d["id"] for d in docs] == [f"evt_{i}" for i in range(10)]
+    assert collection.insert_many.await_args.kwargs["ordered"] is True
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size_splits_flushes():
+    collection = make_collection()
+    batcher = EventBatcher(collection, window_ms=50, max_batch_size=4)
+
+    await asyncio.gather(*(batcher.submit({"id": f"evt_{i}"}) for i in range(10)))
+
+    sizes = [len(call.args[0]) for call in collection.insert_many.await_args_list]
+    assert sum(sizes) == 10
+    assert max(sizes) <= 4
+
+
+@pytest.mark.asyncio
+async def test_ordered_failure_only_rejects_failing_event():
+    collection = make_collection()
+    error = BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "E11000 duplicate key"}]})
+    collection.insert_many.side_effect = [error, None]
+    batcher = EventBatcher(collection, window_ms=10, max_batch_size=100)
+
+    results = await asyncio.gather(
+        *(batcher.submit({"id": f"evt_{i}"}) for i in range(3)),
+        return_exceptions=True,
+    )
+
+    assert results[0] is None
+    assert isinstance(results[1], BulkWriteError)
+    assert results[2] is None
+    retried = collection.insert_many.await_args_list[1].args[0]
+    assert [d["id"] for d in retried] == ["evt_2"]
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_size_triggered_flush():
+    collection = make_collection()
+    release = asyncio.Event()
+
+    async def slow_insert(documents, ordered=True):
+        await release.wait()
+
+    collection.insert_many.side_effect = slow_insert
+    batcher = EventBatcher(collection, window_ms=1000, max_batch_size=2)
+
+    submits = [asyncio.create_task(batcher.submit({"id": f"evt_{i}"})) for i in range(2)]
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert len(batcher._flush_tasks) == 1
+
+    closing = asyncio.create_task(batcher.close())
+    await asyncio.sleep(0.01)
+    assert not closing.done()
+    release.set()
+    await closing
+
+    assert not batcher._flush_tasks
+    await asyncio.gather(*submits)
+    collection.insert_many.assert_awaited_once()
@@ -0,0 +1,24 @@
+import pytest
+
+from app.utils.ndjson import NDJSONLineTooLong, iter_ndjson_lines
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+async def collect(stream):
+    return [line async for line in stream]
+
+
+@pytest.mark.asyncio
+async def test_lines_split_across_chunks_are_reassembled():
+    lines = await collect(iter_ndjson_lines(chunks(b'{"type": "a"}\n{"ty', b'pe": "b"}\r\n', b'\n{"type": "c"}')))
+    assert lines == [b'{"type": "a"}', b'{"type": "b"}', b"", b'{"type": "c"}']
+
+
+@pytest.mark.asyncio
+async def test_oversized_line_is_rejected():
+    with pytest.raises(NDJSONLineTooLong):
+        await collect(iter_ndjson_lines(chunks(b"x" * 20, b"y" * 20), max_line_bytes=16))
@@ -0,0 +1,214 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from app.services.aggregates import aggregate_key_for_event, resolve_aggregate_keys
+from app.services.outbox import OUTBOX_COLLECTION, OutboxWorkerPool, build_outbox_record, oldest_pending_seq
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length=None):
+        return [dict(d) for d in self.docs]
+
+    def __aiter__(self):
+        self._iter = iter([dict(d) for d in self.docs])
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _matches(record, query):
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(_matches(record, branch) for branch in condition):
+                return False
+            continue
+        value = record.get(key)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+        elif "$mod" in condition:
+            divisor, remainder = condition["$mod"]
+            if value % divisor != remainder:
+                return False
+        elif "$gt" in condition:
+            if value is None or not value > condition["$gt"]:
+                return False
+        elif "$not" in condition:
+            if value is not None and value > condition["$not"]["$gt"]:
+                return False
+        elif "$nin" in condition:
+            if value in condition["$nin"]:
+                return False
+    return True
+
+
+class FakeOutboxCollection:
+    def __init__(self, records):
+        self.records = {r["_id"]: r for r in records}
+
+    def find(self, query):
+        return FakeCursor([r for r in self.records.values() if _matches(r, query)])
+
+    async def distinct(self, field, query):
+        return sorted({r[field] for r in self.records.values() if _matches(r, query)})
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        record = self.records.get(query["_id"])
+        if not record or record["status"] != query["status"] or record["locked_until"] != query["locked_until"]:
+            return None
+        record.update(update["$set"])
+        return dict(record)
+
+    async def update_one(self, query, update):
+        self.records[query["_id"]].update(update["$set"])
+
+
+def make_pool(records, process_record):
+    collection = FakeOutboxCollection(records)
+    pool = OutboxWorkerPool({OUTBOX_COLLECTION: collection}, process_record, workers=1)
+    return pool, collection
+
+
+def test_aggregate_key_prefers_order_then_product():
+    assert aggregate_key_for_event("registrar_venda", {"order_id": "ord_1", "product_id": "p"}, "evt_1") == "order:ord_1"
+    assert aggregate_key_for_event("entrada_estoque", {"product_id": "prod_9"}, "evt_2") == "product:prod_9"
+    assert aggregate_key_for_event("nota", {}, "evt_3") == "log:evt_3"
+
+
+class FakeLogs:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        ids = query["id"]["$in"]
+        return FakeCursor([d for d in self.docs if d["id"] in ids])
+
+
+@pytest.mark.asyncio
+async def test_acionamento_takes_the_aggregate_of_the_log_it_targets():
+    logs = FakeLogs([{"id": "evt_sale", "type": "registrar_venda", "data": {"order_id": "ord_1"}, "aggregate_key": "order:ord_1"}])
+    acionamento = {"id": "evt_2", "type": "log_acionado_institucionalmente", "data": {"target_log_id": "evt_sale"}}
+    about_unknown = {"id": "evt_3", "type": "log_acionado_institucionalmente", "data": {"target_log_id": "evt_gone"}}
+    await resolve_aggregate_keys(logs, [acionamento, about_unknown])
+
+    assert acionamento["aggregate_key"] == "order:ord_1"
+    assert build_outbox_record("evt_2", acionamento["aggregate_key"], 2)["aggregate_hash"] == build_outbox_record("evt_sale", "order:ord_1", 1)["aggregate_hash"]
+    assert about_unknown["aggregate_key"] == "log:evt_gone"
+
+
+@pytest.mark.asyncio
+async def test_records_are_applied_in_order_and_marked_done():
+    records = [build_outbox_record(f"evt_{i}", "order:ord_1", i + 1) for i in range(3)]
+    applied = []
+
+    async def process(record):
+        applied.append(record["log_event_id"])
+
+    pool, collection = make_pool(records, process)
+    assert await pool.drain_lane(0) == 3
+    assert applied == ["evt_0", "evt_1", "evt_2"]
+    assert all(r["status"] == "done" for r in collection.records.values())
+
+
+@pytest.mark.asyncio
+async def test_failed_record_blocks_only_its_aggregate():
+    records = [
+        build_outbox_record("evt_a1", "order:A", 1),
+        build_outbox_record("evt_b1", "order:B", 2),
+        build_outbox_record("evt_a2", "order:A", 3),
+    ]
+    applied = []
+
+    async def process(record):
+        if record["log_event_id"] == "evt_a1":
+            raise RuntimeError("boom")
+        applied.append(record["log_event_id"])
+
+    pool, collection = make_pool(records, process)
+    assert await pool.drain_lane(0) == 1
+    assert applied == ["evt_b1"]
+    failed = collection.records[records[0]["_id"]]
+    assert failed["status"] == "pending"
+    assert failed["attempts"] == 1
+    assert failed["next_attempt_at"] > datetime.now(timezone.utc)
+    assert collection.records[records[2]["_id"]]["status"] == "pending"
+
+
+@pytest.mark.asyncio
+async def test_record_leased_elsewhere_is_skipped():
+    record = build_outbox_record("evt_1", "product:p1", 1)
+    record["locked_until"] = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+    async def process(record):
+        raise AssertionError("must not run while leased")
+
+    pool, _ = make_pool([record], process)
+    assert await pool.drain_lane(0) == 0
+
+
+@pytest.mark.asyncio
+async def test_backing_off_aggregate_does_not_fill_the_batch():
+    head = build_outbox_record("evt_a0", "order:A", 1)
+    head["attempts"] = 1
+    head["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(seconds=60)
+    queued = [build_outbox_record(f"evt_a{i}", "order:A", i + 1) for i in range(1, 150)]
+    other = build_outbox_record("evt_b1", "order:B", 151)
+    applied = []
+
+    async def process(record):
+        applied.append(record["log_event_id"])
+
+    pool, collection = make_pool([head, *queued, other], process)
+    assert await pool.drain_lane(0) == 1
+    assert applied == ["evt_b1"]
+    assert all(collection.records[r["_id"]]["status"] == "pending" for r in [head, *queued])
+
+
+@pytest.mark.asyncio
+async def test_records_are_applied_in_seq_order_not_id_order():
+    # Written by two processes: the record with the larger _id holds the earlier event.
+    late_id = build_outbox_record("evt_second", "order:A", 8)
+    early_id = build_outbox_record("evt_first", "order:A", 7)
+    assert late_id["_id"] < early_id["_id"]
+    applied = []
+
+    async def process(record):
+        applied.append(record["log_event_id"])
+
+    pool, _ = make_pool([late_id, early_id], process)
+    assert await pool.drain_lane(0) == 2
+    assert applied == ["evt_first", "evt_second"]
+
+
+@pytest.mark.asyncio
+async def test_oldest_pending_seq_follows_seq_not_id():
+    class Outbox:
+        def __init__(self, records):
+            self.records = records
+
+        async def find_one(self, query, projection=None, sort=None):
+            (key, direction), = sort
+            pending = [r for r in self.records if r["status"] == query["status"]]
+            return min(pending, key=lambda r: r[key]) if pending else None
+
+    late_id = build_outbox_record("evt_b", "order:B", 12)
+    early_id = build_outbox_record("evt_a", "order:A", 11)
+    done = build_outbox_record("evt_0", "order:A", 3)
+    done["status"] = "done"
+    assert await oldest_pending_seq({OUTBOX_COLLECTION: Outbox([late_id, early_id, done])}) == 11
+    assert await oldest_pending_seq({OUTBOX_COLLECTION: Outbox([done])}) is None
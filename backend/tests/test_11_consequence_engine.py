@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+
+from app.services.consequence_engine import ConsequenceEngine, plan_consequences
+
+
+def suggestion(event_type):
+    return {"event_type": event_type, "event_data_model": None}
+
+
+def test_plan_builds_lineage_from_triggering_event():
+    plan = plan_consequences("evt_1", "registrar_venda", {}, [suggestion("despacho_created")], max_depth=3, max_fan_out=5)
+    assert [s["event_type"] for s in plan.suggestions] == ["despacho_created"]
+    assert plan.lineage_meta == {
+        "consequence_depth": 1,
+        "consequence_chain": ["evt_1"],
+        "consequence_type_chain": ["registrar_venda"],
+    }
+
+
+def test_plan_enforces_depth_and_fan_out_caps():
+    deep_meta = {"consequence_depth": 3, "consequence_chain": ["a", "b", "c"], "consequence_type_chain": ["t1", "t2", "t3"]}
+    too_deep = plan_consequences("evt_d", "t4", deep_meta, [suggestion("t5")], max_depth=3, max_fan_out=5)
+    assert too_deep.suggestions == [] and too_deep.dropped == {"max_depth": 1}
+
+    wide = plan_consequences("evt_w", "t1", {}, [suggestion(f"c{i}") for i in range(4)], max_depth=3, max_fan_out=2)
+    assert len(wide.suggestions) == 2 and wide.dropped == {"max_fan_out": 2}
+
+
+def test_plan_detects_cycles():
+    meta = {"consequence_depth": 2, "consequence_chain": ["evt_root", "evt_mid"], "consequence_type_chain": ["a", "b"]}
+    type_cycle = plan_consequences(
+        "evt_leaf", "c", meta, [suggestion("a"), suggestion("c"), suggestion("d")],
+        max_depth=5, max_fan_out=5, forbid_repeated_types=True,
+    )
+    assert [s["event_type"] for s in type_cycle.suggestions] == ["d"]
+    assert type_cycle.dropped == {"cycle": 2}
+
+    id_cycle = plan_consequences("evt_root", "c", meta, [suggestion("d")], max_depth=5, max_fan_out=5)
+    assert id_cycle.suggestions == [] and id_cycle.dropped == {"cycle": 1}
+
+
+def test_plan_lets_same_type_consequences_through_by_default():
+    meta = {"consequence_depth": 1, "consequence_chain": ["evt_root"], "consequence_type_chain": ["ajuste_estoque"]}
+    plan = plan_consequences(
+        "evt_adj", "ajuste_estoque", meta, [suggestion("ajuste_estoque"), suggestion("registrar_venda")],
+        max_depth=5, max_fan_out=5,
+    )
+    assert [s["event_type"] for s in plan.suggestions] == ["ajuste_estoque", "registrar_venda"]
+    assert plan.dropped == {}
+    assert plan.lineage_meta["consequence_type_chain"] == ["ajuste_estoque", "ajuste_estoque"]
+
+
+@pytest.mark.asyncio
+async def test_engine_runs_cascades_and_drops_when_full():
+    recorded = []
+
+    async def record(triggering_event, suggestions):
+        recorded.append((triggering_event, len(suggestions)))
+        if triggering_event == "root":
+            engine.submit("child", [suggestion("x")])
+
+    engine = ConsequenceEngine(record, concurrency=2, max_queue_size=1)
+    assert engine.submit("root", [suggestion("a"), suggestion("b")])
+    assert not engine.submit("other", [suggestion("c")])
+
+    engine.start()
+    await asyncio.wait_for(engine.stop(), timeout=2)
+    assert recorded == [("root", 2), ("child", 1)]
@@ -0,0 +1,92 @@
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from pymongo.errors import DuplicateKeyError
+
+from app.services.idempotency import IDEMPOTENCY_COLLECTION, IdempotencyStore, payload_fingerprint
+from app.utils.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used_and_expired(monkeypatch):
+    cache = TTLCache(max_entries=2, ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "b" not in cache and cache.get("a") == 1 and cache.get("c") == 3
+
+    now = time.monotonic()
+    monkeypatch.setattr("app.utils.cache.time.monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+    assert cache.hits == 3 and cache.misses == 1
+
+
+def make_store():
+    collection = MagicMock()
+    collection.insert_one = AsyncMock()
+    collection.find_one = AsyncMock()
+    collection.update_one = AsyncMock()
+    collection.delete_one = AsyncMock()
+    collection.find_one_and_update = AsyncMock()
+    return IdempotencyStore({IDEMPOTENCY_COLLECTION: collection}), collection
+
+
+@pytest.mark.asyncio
+async def test_first_claim_wins_and_completion_is_cached_hot():
+    store, collection = make_store()
+    assert await store.claim("user|key-1", "fp") is None
+    await store.complete("user|key-1", "fp", "evt_1", {"id": "evt_1"})
+
+    assert store.get_hot("user|key-1") == ("fp", {"id": "evt_1"})
+    collection.update_one.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_duplicate_claim_returns_existing_record():
+    store, collection = make_store()
+    collection.insert_one.side_effect = DuplicateKeyError("E11000")
+    collection.find_one.return_value = {"_id": "user|key-1", "status": "completed", "log_event_id": "evt_1"}
+
+    existing = await store.claim("user|key-1", "fp")
+    assert existing["log_event_id"] == "evt_1"
+    collection.find_one_and_update.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_live_pending_claim_is_not_taken_over():
+    store, collection = make_store()
+    collection.insert_one.side_effect = DuplicateKeyError("E11000")
+    locked_until = datetime.now(timezone.utc) + timedelta(seconds=30)
+    collection.find_one.return_value = {"_id": "user|key-1", "status": "pending", "locked_until": locked_until}
+
+    existing = await store.claim("user|key-1", "fp")
+    assert existing["status"] == "pending"
+    collection.find_one_and_update.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_expired_pending_claim_is_taken_over():
+    store, collection = make_store()
+    collection.insert_one.side_effect = DuplicateKeyError("E11000")
+    stale_until = (datetime.now(timezone.utc) - timedelta(seconds=1)).replace(tzinfo=None)
+    collection.find_one.return_value = {"_id": "user|key-1", "status": "pending", "locked_until": stale_until}
+    collection.find_one_and_update.return_value = {"_id": "user|key-1", "status": "pending"}
+
+    assert await store.claim("user|key-1", "fp-2") is None
+    query, update = collection.find_one_and_update.await_args.args
+    assert query == {"_id": "user|key-1", "status": "pending", "locked_until": stale_until}
+    assert update["$set"]["fingerprint"] == "fp-2"
+
+
+def test_fingerprint_covers_type_and_data_only():
+    assert payload_fingerprint("venda", {"a": 1, "b": 2}) == payload_fingerprint("venda", {"b": 2, "a": 1})
+    assert payload_fingerprint("venda", {"a": 1}) != payload_fingerprint("venda", {"a": 2})
+    assert payload_fingerprint("venda", {"a": 1}) != payload_fingerprint("estorno", {"a": 1})
+
+
+@pytest.mark.asyncio
+async def test_release_only_drops_pending_claims():
+    store, collection = make_store()
+    await store.release("user|key-1")
+    collection.delete_one.assert_awaited_once_with({"_id": "user|key-1", "status": "pending"})
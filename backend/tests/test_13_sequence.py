@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.event_batcher import EventBatcher
+from app.services.sequence import SequenceAllocator, settled_prefix
+
+
+class FakeCounters:
+    def __init__(self):
+        self.value = 0
+        self.calls = 0
+
+    async def find_one_and_update(self, query, update, upsert, return_document):
+        self.calls += 1
+        self.value += update["$inc"]["value"]
+        return {"_id": query["_id"], "value": self.value}
+
+
+@pytest.mark.asyncio
+async def test_assign_takes_one_contiguous_block_per_write():
+    counters = FakeCounters()
+    allocator = SequenceAllocator(counters)
+    first = [{"id": "a"}, {"id": "b"}, {"id": "c"}]
+    await allocator.assign(first)
+    second = [{"id": "c2", "seq": 3}, {"id": "d"}]
+    await allocator.assign(second)
+
+    assert [doc["seq"] for doc in first] == [1, 2, 3]
+    assert [doc["seq"] for doc in second] == [3, 4]
+    assert counters.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_batcher_allocates_sequence_once_per_flush():
+    counters = FakeCounters()
+    collection = MagicMock()
+    collection.insert_many = AsyncMock()
+    batcher = EventBatcher(collection, window_ms=5, before_write=SequenceAllocator(counters).assign)
+    docs = [{"id": str(i)} for i in range(5)]
+
+    await asyncio.gather(*(batcher.submit(doc) for doc in docs))
+
+    assert [doc["seq"] for doc in docs] == [1, 2, 3, 4, 5]
+    assert counters.calls == 1
+
+
+def test_settled_prefix_stops_at_fresh_gap_and_skips_settled_one():
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=10)
+    docs = [
+        {"seq": 11, "recorded_at": now},
+        {"seq": 13, "recorded_at": now},
+    ]
+    emitted, next_seq, stopped, gaps = settled_prefix(docs, 10, cutoff)
+    assert [d["seq"] for d in emitted] == [11] and next_seq == 11 and stopped and gaps == []
+
+    docs[1]["recorded_at"] = (now - timedelta(seconds=30)).replace(tzinfo=None)
+    emitted, next_seq, stopped, gaps = settled_prefix(docs, 10, cutoff)
+    assert [d["seq"] for d in emitted] == [11, 13] and next_seq == 13 and not stopped
+    assert gaps == [(12, 12)]
+
+
+def test_settled_prefix_reports_every_skipped_hole():
+    old = datetime.now(timezone.utc) - timedelta(seconds=60)
+    docs = [{"seq": 12, "recorded_at": old}, {"seq": 13, "recorded_at": old}, {"seq": 17, "recorded_at": old}]
+    emitted, next_seq, stopped, gaps = settled_prefix(docs, 10, old + timedelta(seconds=30))
+    assert [d["seq"] for d in emitted] == [12, 13, 17] and next_seq == 17 and not stopped
+    assert gaps == [(11, 11), (14, 16)]
+
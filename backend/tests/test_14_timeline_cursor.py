@@ -0,0 +1,33 @@
+from datetime import datetime
+import pytest
+
+from app.utils.cursors import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+
+
+def test_cursor_round_trips_timestamp_and_id():
+    ts = datetime(2025, 3, 1, 12, 30, 15, 123000)
+    token = encode_cursor(ts, "evt_42")
+    assert "=" not in token
+    assert decode_cursor(token) == (ts, "evt_42")
+
+
+def test_keyset_filter_seeks_past_last_key():
+    ts = datetime(2025, 3, 1, 12, 0, 0)
+    assert keyset_filter(encode_cursor(ts, "evt_9")) == {"$or": [
+        {"timestamp": {"$lt": ts}},
+        {"timestamp": ts, "id": {"$lt": "evt_9"}},
+    ]}
+
+
+@pytest.mark.parametrize("token", ["", "not-a-cursor", encode_cursor(datetime(2025, 1, 1), "x")[:-3]])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token)
+
+
+def test_ascending_keyset_filter_seeks_forward():
+    ts = datetime(2025, 3, 1, 12, 0, 0)
+    assert keyset_filter(encode_cursor(ts, "evt_9"), descending=False) == {"$or": [
+        {"timestamp": {"$gt": ts}},
+        {"timestamp": ts, "id": {"$gt": "evt_9"}},
+    ]}
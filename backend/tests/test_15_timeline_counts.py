@@ -0,0 +1,39 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.timeline_counts import count_timeline, filter_signature
+from app.utils.cache import TTLCache
+
+
+def make_collection():
+    collection = MagicMock()
+    collection.count_documents = AsyncMock(return_value=1234)
+    collection.estimated_document_count = AsyncMock(return_value=99999)
+    return collection
+
+
+def test_filter_signature_ignores_key_order():
+    assert filter_signature({"type": "a", "author": "b"}) == filter_signature({"author": "b", "type": "a"})
+
+
+@pytest.mark.asyncio
+async def test_none_mode_skips_counting():
+    collection = make_collection()
+    assert await count_timeline(collection, {"type": "a"}, "none", TTLCache()) is None
+    collection.count_documents.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_estimated_uses_metadata_without_filter_and_caches_filtered_counts():
+    collection = make_collection()
+    cache = TTLCache(ttl_seconds=30)
+
+    assert await count_timeline(collection, {}, "estimated", cache) == 99999
+    collection.count_documents.assert_not_awaited()
+
+    for _ in range(3):
+        assert await count_timeline(collection, {"type": "a"}, "estimated", cache) == 1234
+    collection.count_documents.assert_awaited_once()
+
+    assert await count_timeline(collection, {"type": "a"}, "exact", cache) == 1234
+    assert collection.count_documents.await_count == 2
@@ -0,0 +1,61 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.utils.index_manager import IndexSpec, plan_stages, reconcile_indexes
+
+
+def make_db(existing):
+    collection = MagicMock()
+    collection.index_information = AsyncMock(return_value=existing)
+    collection.create_indexes = AsyncMock()
+    collection.drop_index = AsyncMock()
+    return {"logs": collection}, collection
+
+
+REGISTRY = {"logs": [
+    IndexSpec((("id", 1),), unique=True),
+    IndexSpec((("type", 1), ("timestamp", -1), ("id", -1))),
+    IndexSpec((("seq", 1),), unique=True, partial_filter={"seq": {"$exists": True}}),
+]}
+
+
+def test_index_name_matches_mongo_default():
+    assert IndexSpec((("type", 1), ("timestamp", -1))).index_name == "type_1_timestamp_-1"
+
+
+@pytest.mark.asyncio
+async def test_reconcile_creates_missing_and_reports_drift():
+    db, collection = make_db({
+        "_id_": {"key": [("_id", 1)]},
+        "id_1": {"key": [("id", 1)], "unique": True},
+        "seq_1": {"key": [("seq", 1)], "unique": True},
+        "legacy_1": {"key": [("legacy", 1)]},
+    })
+    report = await reconcile_indexes(db, REGISTRY)
+
+    assert report.up_to_date == ["logs.id_1"]
+    assert report.created == ["logs.type_1_timestamp_-1_id_-1"]
+    assert report.mismatched == ["logs.seq_1"]
+    assert report.unmanaged == ["logs.legacy_1"]
+    collection.drop_index.assert_not_awaited()
+    (models,), _ = collection.create_indexes.call_args
+    assert [m.document["name"] for m in models] == ["type_1_timestamp_-1_id_-1"]
+
+
+@pytest.mark.asyncio
+async def test_reconcile_rebuilds_mismatched_only_when_asked_and_dry_run_writes_nothing():
+    db, collection = make_db({"seq_1": {"key": [("seq", 1)], "unique": True}})
+    await reconcile_indexes(db, REGISTRY, drop_mismatched=True, dry_run=True)
+    collection.drop_index.assert_not_awaited()
+    collection.create_indexes.assert_not_awaited()
+
+    report = await reconcile_indexes(db, REGISTRY, drop_mismatched=True)
+    assert report.rebuilt == ["logs.seq_1"]
+    collection.drop_index.assert_awaited_once_with("seq_1")
+
+
+def test_plan_stages_walks_nested_plans():
+    plan = {"queryPlan": {"stage": "SORT", "inputStage": {"stage": "OR", "inputStages": [
+        {"stage": "IXSCAN"}, {"stage": "COLLSCAN"},
+    ]}}}
+    assert plan_stages(plan) == ["SORT", "OR", "IXSCAN", "COLLSCAN"]
@@ -0,0 +1,37 @@
+import csv
+import io
+from datetime import datetime
+import orjson
+import pytest
+
+from app.utils.export import EXPORT_CSV_COLUMNS, iter_csv_export, iter_ndjson_export
+
+
+async def documents(n):
+    for i in range(n):
+        yield {"_id": object(), "id": f"evt_{i}", "seq": i + 1, "timestamp": datetime(2025, 1, 1, 12, 0, i),
+               "type": "registrar_venda", "author": "user:a", "witness": "w", "data": {"n": i, "s": 'a,"b"'}}
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_export_chunks_rows_and_drops_mongo_id():
+    chunks = await collect(iter_ndjson_export(documents(5), rows_per_chunk=2))
+    assert len(chunks) == 3
+    lines = b"".join(chunks).splitlines()
+    first = orjson.loads(lines[0])
+    assert len(lines) == 5 and "_id" not in first
+    assert first["timestamp"] == "2025-01-01T12:00:00Z" and first["data"] == {"n": 0, "s": 'a,"b"'}
+
+
+@pytest.mark.asyncio
+async def test_csv_export_has_header_and_json_columns():
+    chunks = await collect(iter_csv_export(documents(3), rows_per_chunk=2))
+    assert len(chunks) == 2
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert list(rows[0].keys()) == EXPORT_CSV_COLUMNS
+    assert rows[2]["id"] == "evt_2" and rows[2]["channel"] == ""
+    assert orjson.loads(rows[2]["data"]) == {"n": 2, "s": 'a,"b"'}
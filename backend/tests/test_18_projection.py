@@ -0,0 +1,48 @@
+from datetime import datetime
+import orjson
+import pytest
+
+from pydantic import BaseModel, Field
+
+from app.utils.projection import InvalidFieldSelection, build_projection, model_field_roots, raw_json_response
+
+LOG_FIELDS = {"id", "type", "timestamp", "author", "data"}
+
+
+def test_no_fields_means_full_documents():
+    assert build_projection(None, LOG_FIELDS) is None
+
+
+def test_projection_adds_required_fields_and_drops_overlaps():
+    projection = build_projection("type, author,data.order_id,data", LOG_FIELDS, always=("id", "timestamp"))
+    assert projection == {"author": 1, "data": 1, "id": 1, "timestamp": 1, "type": 1, "_id": 0}
+
+
+@pytest.mark.parametrize("fields", ["", "data.$where", "password", "a..b"])
+def test_invalid_field_selection_is_rejected(fields):
+    with pytest.raises(InvalidFieldSelection):
+        build_projection(fields, LOG_FIELDS)
+
+
+def test_state_projection_keeps_mongo_id():
+    assert build_projection("status", always=("_id",)) == {"_id": 1, "status": 1}
+
+
+class OrderRow(BaseModel):
+    order_id: str = Field(..., alias="_id")
+    status: str
+    customer_id: str
+
+
+def test_state_projection_is_limited_to_the_response_model_fields():
+    allowed = model_field_roots(OrderRow)
+    assert allowed == {"_id", "status", "customer_id"}
+    assert build_projection("status,customer_id", allowed, always=("_id",)) == {"_id": 1, "customer_id": 1, "status": 1}
+    for fields in ("password_hash", "internal.notes", "status,meta"):
+        with pytest.raises(InvalidFieldSelection):
+            build_projection(fields, allowed, always=("_id",))
+
+
+def test_raw_json_response_encodes_datetimes_without_models():
+    response = raw_json_response([{"_id": "ord_1", "last_updated_at": datetime(2025, 1, 1)}])
+    assert orjson.loads(response.body) == [{"_id": "ord_1", "last_updated_at": "2025-01-01T00:00:00Z"}]
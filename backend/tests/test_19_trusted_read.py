@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+from app.utils.trusted_read import trusted_row, trusted_rows
+
+
+class Item(BaseModel):
+    id: str = Field(..., alias="_id")
+    name: str
+    stock: int = 0
+    tags: Dict[str, Any] = Field(default_factory=dict)
+    updated_at: Optional[datetime] = None
+    history: List[str] = []
+
+
+def test_trusted_row_shapes_like_the_model_without_validating():
+    doc = {"_id": "prod_1", "name": "Alpha", "internal": "x", "updated_at": datetime(2025, 1, 1)}
+    assert trusted_row(Item, doc) == {
+        "_id": "prod_1", "name": "Alpha", "stock": 0, "tags": {}, "updated_at": datetime(2025, 1, 1), "history": [],
+    }
+    # No validation on the trusted path: a wrong type goes through untouched.
+    assert trusted_row(Item, {"_id": "p", "name": "B", "stock": "many"})["stock"] == "many"
+
+
+def test_sampled_validation_drops_drifted_rows():
+    docs = [{"_id": "ok", "name": "A"}, {"_id": "bad", "stock": "many"}]
+    assert [row["_id"] for row in trusted_rows(Item, docs, sample_rate=1.0)] == ["ok"]
+    assert len(trusted_rows(Item, docs, sample_rate=0.0)) == 2
+
+
+def test_mutable_defaults_are_not_shared_between_rows():
+    first, second = trusted_rows(Item, [{"_id": "a", "name": "A"}, {"_id": "b", "name": "B"}])
+    first["tags"]["hot"] = True
+    first["history"].append("sold")
+    assert second["tags"] == {} and second["history"] == []
+    assert trusted_row(Item, {"_id": "c", "name": "C"})["history"] == []
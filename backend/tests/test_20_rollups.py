@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.event_batcher import EventBatcher
+from app.services.rollups import backfill_pipeline, build_rollup_updates, bucket_start, rollup_id, stats_pipeline
+
+
+def test_bucket_start_truncates_and_normalises_to_utc():
+    ts = datetime(2025, 3, 1, 13, 47, 12, 500, tzinfo=timezone.utc)
+    assert bucket_start(ts, "minute") == datetime(2025, 3, 1, 13, 47)
+    assert bucket_start(ts, "hour") == datetime(2025, 3, 1, 13)
+    assert bucket_start(ts, "day") == datetime(2025, 3, 1)
+
+
+def test_rollup_updates_coalesce_events_of_the_same_bucket():
+    docs = [
+        {"type": "registrar_venda", "author": "user:a", "timestamp": datetime(2025, 3, 1, 13, 47, s)}
+        for s in range(3)
+    ] + [{"type": "registrar_venda", "author": "user:a", "channel": "web", "timestamp": datetime(2025, 3, 1, 13, 48)}]
+    updates = {u._filter["_id"]: u._doc["$inc"]["count"] for u in build_rollup_updates(docs)}
+
+    assert updates[rollup_id("minute", datetime(2025, 3, 1, 13, 47), "registrar_venda", None, "user:a")] == 3
+    assert updates[rollup_id("hour", datetime(2025, 3, 1, 13), "registrar_venda", "", "user:a")] == 3
+    assert updates[rollup_id("day", datetime(2025, 3, 1), "registrar_venda", "web", "user:a")] == 1
+    assert len(updates) == 6
+
+
+def _evaluate(expression, doc):
+    """Tiny evaluator for the expressions of the backfill pipeline's $group and $project."""
+    if isinstance(expression, str):
+        if not expression.startswith("$"):
+            return expression
+        value = doc
+        for key in expression[1:].split("."):
+            value = value.get(key) if isinstance(value, dict) else None
+        return value
+    if isinstance(expression, dict) and len(expression) == 1:
+        (operator, argument), = expression.items()
+        if operator == "$ifNull":
+            value = _evaluate(argument[0], doc)
+            return _evaluate(argument[1], doc) if value is None else value
+        if operator == "$toString":
+            value = _evaluate(argument, doc)
+            return None if value is None else str(value)
+        if operator == "$concat":
+            parts = [_evaluate(part, doc) for part in argument]
+            return None if None in parts else "".join(parts)
+        if operator == "$dateTrunc":
+            return bucket_start(_evaluate(argument["date"], doc), argument["unit"])
+        if operator == "$dateToString":
+            return _evaluate(argument["date"], doc).strftime(argument["format"])
+    return {key: _evaluate(value, doc) for key, value in expression.items()}
+
+
+def test_backfill_ids_match_live_ids_for_missing_and_null_dimensions():
+    docs = [
+        {"timestamp": datetime(2025, 3, 1, 13, 47), "type": "registrar_venda", "author": None},
+        {"timestamp": datetime(2025, 3, 1, 13, 47), "channel": "web"},
+        {"timestamp": datetime(2025, 3, 1, 13, 47), "type": "ajuste", "channel": None, "author": 42},
+    ]
+    live = {u._filter["_id"]: u._doc["$setOnInsert"] for u in build_rollup_updates(docs)}
+    for granularity in ("minute", "hour", "day"):
+        group, project = backfill_pipeline(granularity, {})[1:3]
+        for doc in docs:
+            grouped = {"_id": _evaluate(group["$group"]["_id"], doc)}
+            backfilled_id = _evaluate(project["$project"]["_id"], grouped)
+            assert backfilled_id in live, backfilled_id
+            assert {dim: grouped["_id"][dim] for dim in ("type", "channel", "author")} == {
+                dim: live[backfilled_id][dim] for dim in ("type", "channel", "author")
+            }
+    assert rollup_id("day", datetime(2025, 3, 1), None, None, None) == "day|2025-03-01T00:00:00Z|||"
+
+
+def test_stats_pipeline_groups_by_requested_dimensions():
+    pipeline = stats_pipeline("hour", datetime(2025, 3, 1, 10, 30), datetime(2025, 3, 2), ["type"], {"channel": "web", "author": None})
+    assert pipeline[0]["$match"] == {
+        "granularity": "hour", "bucket": {"$gte": datetime(2025, 3, 1, 10), "$lt": datetime(2025, 3, 2)}, "channel": "web",
+    }
+    assert pipeline[1]["$group"]["_id"] == {"bucket": "$bucket", "type": "$type"}
+
+
+@pytest.mark.asyncio
+async def test_batcher_after_write_sees_only_durable_documents_and_never_fails_callers():
+    collection = MagicMock()
+    collection.insert_many = AsyncMock()
+    after_write = AsyncMock(side_effect=RuntimeError("rollups down"))
+    batcher = EventBatcher(collection, window_ms=1, after_write=after_write)
+
+    await asyncio.gather(batcher.submit({"id": "a"}), batcher.submit({"id": "b"}))
+    after_write.assert_awaited_once_with([{"id": "a"}, {"id": "b"}])
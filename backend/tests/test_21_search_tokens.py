@@ -0,0 +1,35 @@
+import pytest
+
+from app.services.search_tokens import (
+    MAX_TOKENS_PER_EVENT, InvalidSearchQuery, extract_search_tokens, parse_search_query,
+)
+
+
+def test_tokens_cover_nested_strings_without_accents_or_duplicates():
+    data = {"customer": {"name": "João Ação"}, "items": [{"sku": "SKU-42"}, {"note": "joão"}], "qty": 3}
+    meta = {"trace_id": "tr_9x"}
+    assert extract_search_tokens(data, meta) == ["joao", "acao", "sku", "42", "tr", "9x"]
+
+
+def test_tokens_are_capped_per_event():
+    data = {"blob": " ".join(f"w{i}" for i in range(MAX_TOKENS_PER_EVENT * 2))}
+    assert len(extract_search_tokens(data)) == MAX_TOKENS_PER_EVENT
+
+
+def test_query_terms_are_anded_and_prefixes_use_anchored_regex():
+    assert parse_search_query("João vend*") == {"$and": [
+        {"search_tokens": {"$all": ["joao"]}},
+        {"search_tokens": {"$regex": "^vend"}},
+    ]}
+
+
+def test_query_or_builds_alternatives():
+    assert parse_search_query("alpha beta OR gamma") == {"$or": [
+        {"search_tokens": {"$all": ["alpha", "beta"]}},
+        {"search_tokens": {"$all": ["gamma"]}},
+    ]}
+
+
+def test_query_without_terms_is_rejected():
+    with pytest.raises(InvalidSearchQuery):
+        parse_search_query("* OR !")
@@ -0,0 +1,107 @@
+import pytest
+
+from app.services.lineage import parent_id_of, traverse_lineage
+
+
+def event(event_id, parent=None):
+    doc = {"id": event_id, "timestamp": event_id, "meta": {}}
+    if parent:
+        doc["meta"]["triggered_by_log_id"] = parent
+        doc["witness"] = f"log_event:{parent}"
+    return doc
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeLogs:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = 0
+
+    def _match(self, query):
+        def value(doc, path):
+            return doc["meta"].get("triggered_by_log_id") if path == "meta.triggered_by_log_id" else doc[path]
+        return [
+            d for d in self.docs
+            if all(value(d, path) in cond["$in"] if "$in" in cond else value(d, path) not in cond["$nin"]
+                   for path, cond in query.items())
+        ]
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        return FakeCursor(self._match(query))
+
+    async def find_one(self, query, projection=None):
+        found = self._match(query)
+        return found[0] if found else None
+
+
+# a -> b, a -> c, b -> d, d -> e
+DOCS = [event("a"), event("b", "a"), event("c", "a"), event("d", "b"), event("e", "d")]
+
+
+def test_parent_falls_back_to_witness():
+    assert parent_id_of({"witness": "log_event:x", "meta": {}}) == "x"
+    assert parent_id_of({"witness": "user:x"}) is None
+
+
+@pytest.mark.asyncio
+async def test_down_traversal_is_one_query_per_level():
+    logs = FakeLogs(DOCS)
+    result = await traverse_lineage(logs, DOCS[0], "down", max_depth=10, max_nodes=100)
+    assert [n["id"] for n in result.nodes] == ["b", "c", "d", "e"]
+    assert result.edges == [("a", "b"), ("a", "c"), ("b", "d"), ("d", "e")]
+    assert result.depth_reached == 3 and not result.truncated
+    assert logs.queries == 4
+
+
+@pytest.mark.asyncio
+async def test_up_traversal_and_caps():
+    logs = FakeLogs(DOCS)
+    up = await traverse_lineage(logs, DOCS[4], "up", max_depth=10, max_nodes=100)
+    assert [n["id"] for n in up.nodes] == ["d", "b", "a"]
+    assert up.edges == [("d", "e"), ("b", "d"), ("a", "b")]
+
+    capped = await traverse_lineage(logs, DOCS[0], "down", max_depth=2, max_nodes=100)
+    assert [n["id"] for n in capped.nodes] == ["b", "c", "d"] and capped.truncated
+
+    few = await traverse_lineage(logs, DOCS[0], "down", max_depth=10, max_nodes=1)
+    assert [n["id"] for n in few.nodes] == ["b"] and few.edges == [("a", "b")] and few.truncated
+
+
+@pytest.mark.asyncio
+async def test_truncated_reports_unexplored_events_beyond_the_caps():
+    logs = FakeLogs(DOCS)
+    # e has no consequences: reaching the depth cap on it leaves nothing out.
+    exact_depth = await traverse_lineage(logs, DOCS[3], "down", max_depth=1, max_nodes=100)
+    assert [n["id"] for n in exact_depth.nodes] == ["e"] and not exact_depth.truncated
+
+    stops_at_depth = await traverse_lineage(logs, DOCS[0], "down", max_depth=1, max_nodes=100)
+    assert [n["id"] for n in stops_at_depth.nodes] == ["b", "c"] and stops_at_depth.truncated
+
+    up_at_depth = await traverse_lineage(logs, DOCS[4], "up", max_depth=2, max_nodes=100)
+    assert [n["id"] for n in up_at_depth.nodes] == ["d", "b"] and up_at_depth.truncated
+
+    exact_nodes = await traverse_lineage(logs, DOCS[1], "down", max_depth=10, max_nodes=2)
+    assert [n["id"] for n in exact_nodes.nodes] == ["d", "e"] and not exact_nodes.truncated
+
+
+@pytest.mark.asyncio
+async def test_cycles_terminate_without_counting_as_truncated():
+    cycle = [event("x", "z"), event("y", "x"), event("z", "y")]
+    result = await traverse_lineage(FakeLogs(cycle), cycle[0], "down", max_depth=10, max_nodes=100)
+    assert [n["id"] for n in result.nodes] == ["y", "z"] and not result.truncated
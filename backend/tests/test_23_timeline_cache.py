@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from app.services.timeline_cache import TimelineGenerations, TimelineResponseCache, response_cache_key
+
+
+def test_cache_key_is_normalised():
+    ts = datetime(2025, 3, 1)
+    assert response_cache_key({"type": "a", "timestamp": {"$gte": ts}}, None, 0, 100) == \
+        response_cache_key({"timestamp": {"$gte": ts}, "type": "a"}, None, 0, 100)
+
+
+def test_entries_are_invalidated_by_writes_of_their_event_type_only():
+    generations = TimelineGenerations()
+    cache = TimelineResponseCache(generations, max_entries=10, ttl_seconds=60)
+    cache.set("sales", generations.current("registrar_venda"), b"sales")
+    cache.set("all", generations.current(), b"all")
+
+    generations.bump(["despacho_criado"])
+    assert cache.get("sales", "registrar_venda") == b"sales"
+    assert cache.get("all") is None
+
+    generations.bump(["registrar_venda"])
+    assert cache.get("sales", "registrar_venda") is None
+    assert len(cache) == 0
+    assert cache.hits == 1 and cache.misses == 2
+
+
+def test_cache_is_size_bounded_lru():
+    generations = TimelineGenerations()
+    cache = TimelineResponseCache(generations, max_entries=2, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, generations.current(), key.encode())
+    assert cache.get("a") is None and cache.get("c") == b"c"
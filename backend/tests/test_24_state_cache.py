@@ -0,0 +1,87 @@
+import asyncio
+
+from app.services.state_cache import StateReadCache
+
+
+def _loader(docs, calls):
+    async def load():
+        calls.append(1)
+        return docs.get("p1")
+    return load
+
+
+def test_read_through_hits_after_first_load():
+    cache = StateReadCache(max_entries=10, ttl_seconds=60)
+    docs, calls = {"p1": {"_id": "p1", "quantity": 3}}, []
+
+    first = asyncio.run(cache.read_through("inv", "p1", _loader(docs, calls)))
+    second = asyncio.run(cache.read_through("inv", "p1", _loader(docs, calls)))
+
+    assert first == second == {"_id": "p1", "quantity": 3}
+    assert len(calls) == 1
+    assert cache.stats()["inv"]["entries"] == 1
+
+
+def test_missing_documents_are_not_cached():
+    cache = StateReadCache(max_entries=10, ttl_seconds=60)
+    docs, calls = {}, []
+
+    assert asyncio.run(cache.read_through("inv", "p1", _loader(docs, calls))) is None
+    docs["p1"] = {"_id": "p1"}
+    assert asyncio.run(cache.read_through("inv", "p1", _loader(docs, calls))) == {"_id": "p1"}
+    assert len(calls) == 2
+
+
+def test_invalidate_drops_only_that_document():
+    cache = StateReadCache(max_entries=10, ttl_seconds=60)
+    docs, calls = {"p1": {"_id": "p1", "quantity": 3}}, []
+    asyncio.run(cache.read_through("inv", "p1", _loader(docs, calls)))
+    asyncio.run(cache.read_through("orders", "p1", _loader(docs, calls)))
+
+    docs["p1"] = {"_id": "p1", "quantity": 2}
+    cache.invalidate("inv", "p1")
+
+    assert asyncio.run(cache.read_through("inv", "p1", _loader(docs, calls))) == {"_id": "p1", "quantity": 2}
+    assert asyncio.run(cache.read_through("orders", "p1", _loader(docs, calls))) == {"_id": "p1", "quantity": 3}
+    assert len(calls) == 3
+
+
+def test_load_overlapping_an_invalidation_is_not_cached():
+    cache = StateReadCache(max_entries=10, ttl_seconds=60)
+    calls = []
+
+    async def slow_stale_load():
+        calls.append(1)
+        await asyncio.sleep(0)
+        cache.invalidate("inv", "p1")  # a write lands while the read is in flight
+        return {"_id": "p1", "quantity": 3}
+
+    asyncio.run(cache.read_through("inv", "p1", slow_stale_load))
+    assert cache.stats()["inv"]["entries"] == 0
+
+
+def test_entries_expire_after_ttl():
+    cache = StateReadCache(max_entries=10, ttl_seconds=0)
+    docs, calls = {"p1": {"_id": "p1"}}, []
+    asyncio.run(cache.read_through("inv", "p1", _loader(docs, calls)))
+    asyncio.run(cache.read_through("inv", "p1", _loader(docs, calls)))
+    assert len(calls) == 2
+
+
+def test_read_many_loads_only_uncached_ids_in_one_call():
+    cache = StateReadCache(max_entries=10, ttl_seconds=60)
+    docs = {"p1": {"_id": "p1"}, "p2": {"_id": "p2"}}
+    batches = []
+
+    async def load_many(ids):
+        batches.append(list(ids))
+        return [docs[doc_id] for doc_id in ids if doc_id in docs]
+
+    asyncio.run(cache.read_through("inv", "p1", _loader(docs, [])))
+    found = asyncio.run(cache.read_many("inv", ["p1", "p2", "p3"], load_many))
+
+    assert found == {"p1": {"_id": "p1"}, "p2": {"_id": "p2"}}
+    assert batches == [["p2", "p3"]]
+
+    asyncio.run(cache.read_many("inv", ["p1", "p2"], load_many))
+    assert batches == [["p2", "p3"]]
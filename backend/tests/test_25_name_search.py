@@ -0,0 +1,64 @@
+import re
+
+from app.services.name_search import (
+    name_match_filter, name_ngrams, name_search_fields, normalize_name, with_name_search_fields
+)
+
+
+def _matches(filter_doc, doc):
+    """Tiny evaluator for the filter shapes name_match_filter produces."""
+    for key, condition in filter_doc.items():
+        value = doc.get(key)
+        values = value if isinstance(value, list) else [value]
+        if isinstance(condition, str):
+            ok = condition in values
+        elif "$all" in condition:
+            ok = all(gram in values for gram in condition["$all"])
+        else:
+            ok = any(isinstance(v, str) and re.search(condition["$regex"], v) for v in values)
+        if not ok:
+            return False
+    return True
+
+
+def test_fields_are_normalized_and_cover_short_substrings():
+    fields = name_search_fields("name", "  Café   Moído ")
+    assert fields["name_normalized"] == "cafe moido"
+    assert name_ngrams("abcd") == ["abc", "bcd", "cd", "d"]
+
+
+def test_contains_and_prefix_filters_match_like_a_substring_search():
+    names = ["Café Moído 500g", "Açúcar Refinado", "Cafeteira", "Leite"]
+    docs = [name_search_fields("name", name) for name in names]
+    for query in ["caf", "e", "moido 5", "FINA", "ite", "xyz", "ca", "refinado"]:
+        expected = [name for name in names if normalize_name(query) in normalize_name(name)]
+        found = [name for name, doc in zip(names, docs) if _matches(name_match_filter("name", query), doc)]
+        assert found == expected, query
+    prefix = name_match_filter("name", "Caf", "prefix")
+    assert [name for name, doc in zip(names, docs) if _matches(prefix, doc)] == ["Café Moído 500g", "Cafeteira"]
+
+
+def test_query_text_is_matched_literally():
+    assert name_match_filter("order_ref", "a.b", "prefix") == {"order_ref_normalized": {"$regex": r"^a\.b"}}
+    assert name_match_filter("order_ref", "a.*", "regex") == {"order_ref": {"$regex": "a.*", "$options": "i"}}
+
+
+def test_updates_setting_the_field_carry_the_derived_fields():
+    update = with_name_search_fields({"$set": {"name": "Pão"}, "$inc": {"current_stock": 1}}, "name")
+    assert update["$set"]["name_normalized"] == "pao"
+    assert update["$inc"] == {"current_stock": 1}
+    untouched = {"$set": {"current_stock": 3}}
+    assert with_name_search_fields(untouched, "name") is untouched
+
+
+def test_documents_without_derived_fields_are_only_found_by_regex():
+    legacy = {"name": "Café Moído 500g"}
+    assert _matches(name_match_filter("name", "Café", "regex"), legacy)
+    assert not _matches(name_match_filter("name", "cafe", "contains"), legacy)
+    assert not _matches(name_match_filter("name", "caf", "prefix"), legacy)
+
+
+def test_query_endpoints_default_to_regex_until_backfilled():
+    from app.core.settings import Settings
+
+    assert Settings.model_fields["NAME_SEARCH_MATCH_MODE"].default == "regex"
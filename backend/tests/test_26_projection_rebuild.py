@@ -0,0 +1,198 @@
+import asyncio
+import copy
+
+import pytest
+
+from app.services.projection_rebuild import ShadowDatabase, partition_of, replay_partition, shadow_name, swap_in_shadows
+from app.services.sequence import SequenceAllocator
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def batch_size(self, n):
+        return self
+
+    def __aiter__(self):
+        self._iter = iter([dict(doc) for doc in self.docs])
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, docs=None):
+        self.docs = list(docs or [])
+        self.bulk_writes = []
+
+    def find(self, query, projection=None):
+        seq = query["seq"]
+        return FakeCursor([d for d in self.docs if seq["$gt"] < d["seq"] <= seq["$lte"]])
+
+    async def find_one(self, query, projection=None, sort=None):
+        return next((d for d in self.docs if all(d.get(k) == v for k, v in query.items())), None)
+
+    async def update_one(self, query, update, upsert=False, session=None):
+        doc = await self.find_one(query)
+        if doc is None:
+            doc = {"_id": query["_id"]}
+            self.docs.append(doc)
+        doc.update(update["$set"])
+
+    async def bulk_write(self, operations, ordered=True, session=None):
+        self.bulk_writes.append([op._doc for op in operations])
+        for op in operations:
+            await self.apply_inc(op._filter, op._doc)
+
+    async def apply_inc(self, query, update):
+        doc = await self.find_one(query)
+        if doc is None:
+            doc = {"_id": query["_id"]}
+            self.docs.append(doc)
+        for field, delta in update["$inc"].items():
+            doc[field] = doc.get(field, 0) + delta
+
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def start_transaction(self):
+        return self
+
+
+class FakeAdmin:
+    def __init__(self, db):
+        self.db = db
+
+    async def command(self, name, source, to, dropTarget):
+        assert name == "renameCollection" and dropTarget
+        self.db[to.split(".", 1)[1]] = self.db.pop(source.split(".", 1)[1])
+
+
+class FakeClient:
+    def __init__(self, db=None):
+        self.admin = FakeAdmin(db)
+
+    async def start_session(self):
+        return FakeSession()
+
+
+class FakeCounters:
+    def __init__(self, value):
+        self.doc = {"_id": "logs_seq", "value": value}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        if isinstance(update, list):
+            fence = update[0]["$set"]["fence"]
+            self.doc["fence"] = {"run_id": fence["run_id"]["$literal"], "from_seq": self.doc["value"] + 1, "expires_at": fence["expires_at"]}
+        else:
+            self.doc["value"] += update["$inc"]["value"]
+        return copy.deepcopy(self.doc)
+
+    async def find_one(self, query, projection=None):
+        return copy.deepcopy(self.doc)
+
+    async def update_one(self, query, update):
+        if self.doc.get("fence", {}).get("run_id") == query["fence.run_id"]:
+            del self.doc["fence"]
+
+
+class FakeDatabase(dict):
+    name = "test"
+
+    def __init__(self):
+        super().__init__()
+        self.client = FakeClient(self)
+
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+class RecordingUpdater:
+    def __init__(self, db):
+        self.db = db
+
+    async def update_state(self, event):
+        await self.db["orders"].update_one({"_id": event["data"]["order_id"]}, {"$inc": {"events": 1}})
+
+
+def log(seq, order_id):
+    return {"_id": seq, "seq": seq, "id": f"evt_{seq}", "type": "registrar_venda", "data": {"order_id": order_id}}
+
+
+def test_events_of_one_aggregate_share_a_partition():
+    partitions = {partition_of(log(seq, "ord_1"), 8) for seq in range(20)}
+    assert len(partitions) == 1
+
+
+def test_shadow_database_routes_only_rebuilt_collections():
+    db = FakeDatabase()
+    shadow = ShadowDatabase(db, ["orders"])
+    assert shadow["orders"].collection is db[shadow_name("orders")]
+    assert shadow["logs"] is db["logs"]
+
+
+@pytest.mark.asyncio
+async def test_replay_applies_own_partition_in_bulk_and_resumes_from_checkpoint():
+    db = FakeDatabase()
+    db["logs"].docs = [log(seq, f"ord_{seq % 3}") for seq in range(1, 31)]
+    partition = partition_of(log(1, "ord_1"), 2)
+    owned = [d["seq"] for d in db["logs"].docs if partition_of(d, 2) == partition]
+
+    applied = await replay_partition(db, "r1", "p", partition, 2, 0, 20, ["orders"], RecordingUpdater, dict, batch_size=4)
+
+    assert applied == len([seq for seq in owned if seq <= 20])
+    writes = [op for batch in db[shadow_name("orders")].bulk_writes for op in batch]
+    assert len(writes) == applied
+    assert all(len(batch) <= 4 for batch in db[shadow_name("orders")].bulk_writes)
+    checkpoint = await db["projection_rebuilds"].find_one({"_id": "r1:p"})
+    assert checkpoint["last_seq"] == 20 and checkpoint["applied"] == applied
+
+    more = await replay_partition(db, "r1", "p", partition, 2, 0, 30, ["orders"], RecordingUpdater, dict, batch_size=4)
+    assert more == len([seq for seq in owned if seq > 20])
+    checkpoint = await db["projection_rebuilds"].find_one({"_id": "r1:p"})
+    assert checkpoint["applied"] == len(owned)
+
+
+@pytest.mark.asyncio
+async def test_swap_keeps_events_written_after_the_last_catch_up():
+    db = FakeDatabase()
+    db["counters"] = FakeCounters(4)
+    db["logs"].docs = [log(seq, "ord_1") for seq in range(1, 5)]
+    # Shadow caught up to seq 3; seq 4 was applied to the live collection afterwards.
+    db[shadow_name("orders")].docs = [{"_id": "ord_1", "events": 3}]
+    db["orders"].docs = [{"_id": "ord_1", "events": 4}]
+    allocator = SequenceAllocator(db["counters"])
+    applied_live = []
+
+    async def live_write():
+        await asyncio.sleep(0.01)  # the fence is up by now
+        doc = {"id": "evt_5", "data": {"order_id": "ord_1"}}
+        await allocator.assign([doc])
+        assert allocator.fenced(doc["seq"])
+        await allocator.wait_for_fence(doc["seq"], poll_interval=0.01)
+        await db["orders"].apply_inc({"_id": "ord_1"}, {"$inc": {"events": 1}})
+        applied_live.append(doc["seq"])
+
+    writer = asyncio.create_task(live_write())
+    fence_seq = await swap_in_shadows(db, "r1", ["orders"], 3, RecordingUpdater, dict, batch_size=10, settle_seconds=0.05)
+    assert not applied_live  # held until the rebuilt collection was live
+    await writer
+
+    assert fence_seq == 4 and applied_live == [5]
+    assert "fence" not in db["counters"].doc
+    assert await db["orders"].find_one({"_id": "ord_1"}) == {"_id": "ord_1", "events": 5}
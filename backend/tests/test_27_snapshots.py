@@ -0,0 +1,78 @@
+import pytest
+
+from app.services.snapshots import (
+    APPLIED_SEQ_FIELD, APPLIED_SEQS_FIELD, APPLIED_SEQS_WINDOW, InMemoryCollection, contains_event, diff_states, tag_applied_seq
+)
+from app.utils.update_operators import UnsupportedUpdate, apply_update
+
+
+def test_apply_update_covers_handler_operators():
+    doc = {"_id": "o1", "litigios": [1, 2, 3, 4, 5], "meta": {}}
+    updated = apply_update(doc, {
+        "$push": {"litigios": {"$each": [6], "$slice": -5}},
+        "$set": {"meta.litigio_status.x": "aberto", "status": "open"},
+        "$inc": {"count": 2},
+        "$max": {APPLIED_SEQ_FIELD: 7},
+        "$setOnInsert": {"created": True},
+    })
+    assert updated == {
+        "_id": "o1", "litigios": [2, 3, 4, 5, 6], "meta": {"litigio_status": {"x": "aberto"}},
+        "status": "open", "count": 2, APPLIED_SEQ_FIELD: 7,
+    }
+    assert doc["litigios"] == [1, 2, 3, 4, 5]
+    assert apply_update({}, {"$setOnInsert": {"created": True}}, inserting=True) == {"created": True}
+
+
+def test_apply_update_rejects_unknown_operators():
+    with pytest.raises(UnsupportedUpdate):
+        apply_update({}, {"$rename": {"a": "b"}})
+
+
+@pytest.mark.asyncio
+async def test_in_memory_replay_skips_events_the_snapshot_already_has():
+    collection = InMemoryCollection({"o1": {"_id": "o1", "count": 3, APPLIED_SEQ_FIELD: 10}})
+    await collection.update_one({"_id": "o1"}, {"$inc": {"count": 1}, "$max": {APPLIED_SEQ_FIELD: 9}})
+    await collection.update_one({"_id": "o1"}, {"$inc": {"count": 1}, "$max": {APPLIED_SEQ_FIELD: 11}})
+    await collection.update_one({"_id": "o2"}, {"$inc": {"count": 1}})
+    await collection.update_one({"_id": "o3"}, {"$set": {"count": 1}}, upsert=True)
+
+    assert (await collection.find_one({"_id": "o1"}))["count"] == 4
+    assert await collection.find_one({"_id": "o2"}) is None
+    assert collection.docs["o3"] == {"_id": "o3", "count": 1}
+
+
+@pytest.mark.asyncio
+async def test_in_memory_replay_applies_older_events_a_document_received_out_of_order():
+    # Live, seq 12 (another aggregate) reached the document before seq 11; the copy has 10 and 12.
+    state = {"_id": "p1", "stock": 5, APPLIED_SEQ_FIELD: 12, APPLIED_SEQS_FIELD: [10, 12]}
+    collection = InMemoryCollection({"p1": state})
+    for seq, delta in ((11, -1), (12, -2), (13, -3)):
+        await collection.update_one({"_id": "p1"}, tag_applied_seq({"$inc": {"stock": delta}}, seq))
+
+    doc = await collection.find_one({"_id": "p1"})
+    assert doc["stock"] == 1
+    assert doc[APPLIED_SEQS_FIELD] == [10, 12, 11, 13]
+
+
+@pytest.mark.asyncio
+async def test_every_write_of_one_replayed_event_is_applied():
+    collection = InMemoryCollection({"o1": {"_id": "o1", "count": 0, APPLIED_SEQ_FIELD: 4, APPLIED_SEQS_FIELD: [4]}})
+    await collection.update_one({"_id": "o1"}, tag_applied_seq({"$inc": {"count": 1}}, 5))
+    await collection.update_one({"_id": "o1"}, tag_applied_seq({"$set": {"status": "pago"}}, 5))
+
+    assert (await collection.find_one({"_id": "o1"}))["status"] == "pago"
+
+
+def test_contains_event_checks_the_window_of_applied_seqs():
+    full = {APPLIED_SEQS_FIELD: list(range(100, 100 + APPLIED_SEQS_WINDOW))}
+    assert contains_event(full, 100) and not contains_event(full, 99 + APPLIED_SEQS_WINDOW + 1)
+    assert contains_event(full, 50)
+    assert not contains_event({APPLIED_SEQS_FIELD: [100, 102]}, 50)
+    assert contains_event({APPLIED_SEQ_FIELD: 7}, 7) and not contains_event({APPLIED_SEQ_FIELD: 7}, 8)
+    assert not contains_event(None, 1)
+
+
+def test_diff_states_reports_changed_and_missing_documents():
+    expected = {"a": {"x": 1}, "b": {"x": 2}, "c": {"x": 3}}
+    actual = {"a": {"x": 1}, "b": {"x": 9}, "d": {"x": 4}}
+    assert diff_states(expected, actual) == ["b", "c", "d"]
@@ -0,0 +1,143 @@
+from datetime import datetime
+
+import pytest
+
+from app.services.aggregates import resolve_aggregate_keys
+from app.services.snapshots import APPLIED_SEQ_FIELD
+from app.services.state_history import state_as_of
+
+
+def _matches(doc, query):
+    for key, condition in query.items():
+        value = doc.get(key)
+        if isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+            for op, bound in condition.items():
+                if op == "$in":
+                    if value not in bound:
+                        return False
+                elif value is None or not {"$gt": value > bound, "$lte": value <= bound}[op]:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+
+    def limit(self, n):
+        self.docs = self.docs[:n]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+    def __aiter__(self):
+        self._iter = iter([dict(doc) for doc in self.docs])
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return FakeCursor([d for d in self.docs if _matches(d, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((d for d in self.docs if _matches(d, query)), None)
+
+
+class StockUpdater:
+    """Stand-in for StateUpdaterService: each event moves the stock of its product."""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def update_state(self, event):
+        await self.db["inventory"].update_one(
+            {"_id": event["data"]["product_id"]},
+            {"$inc": {"stock": event["data"]["delta"]}, "$max": {APPLIED_SEQ_FIELD: event["seq"]}},
+            upsert=True,
+        )
+
+
+def event(seq, day, delta, product="p1"):
+    return {"seq": seq, "timestamp": datetime(2025, 1, day), "aggregate_key": f"product:{product}",
+            "data": {"product_id": product, "delta": delta}}
+
+
+LOGS = [event(1, 1, 10), event(2, 2, -1), event(3, 3, -2, "p2"), event(4, 4, -3), event(5, 6, -4)]
+
+
+def database(snapshots=(), snapshot_docs=()):
+    return {
+        "logs": FakeCollection(LOGS),
+        "state_snapshots": FakeCollection(snapshots),
+        "state_snapshot_docs": FakeCollection(snapshot_docs),
+    }
+
+
+async def lookup(db, day):
+    return await state_as_of(db, "inventory", "p1", "product:p1", datetime(2025, 1, day), ["inventory"], StockUpdater, dict)
+
+
+@pytest.mark.asyncio
+async def test_without_snapshot_folds_the_aggregate_history_up_to_as_of():
+    db = database()
+    assert (await lookup(db, 4))["stock"] == 6
+    assert await lookup(db, 1) is not None
+    assert db["logs"].queries[-1]["aggregate_key"] == "product:p1"
+
+
+@pytest.mark.asyncio
+async def test_starts_from_the_nearest_earlier_snapshot():
+    snapshot = {"_id": "inventory:1", "collection": "inventory", "status": "complete", "seq": 2, "created_at": datetime(2025, 1, 2, 12)}
+    doc = {"_id": {"snapshot_id": "inventory:1", "doc_id": "p1"}, "state": {"_id": "p1", "stock": 9, APPLIED_SEQ_FIELD: 2}}
+    db = database([snapshot], [doc])
+
+    assert (await lookup(db, 5))["stock"] == 6
+    assert db["logs"].queries[-1]["seq"] == {"$gt": 2}
+    # Snapshot taken after as_of is not used.
+    assert (await lookup(db, 1))["stock"] == 10
+
+
+@pytest.mark.asyncio
+async def test_litigation_is_folded_into_the_order_it_was_opened_on():
+    from app.services.state_updater import CS_ORDERS_COLLECTION, load_state_as_of
+
+    sale = {"seq": 1, "id": "evt_sale", "type": "registrar_venda", "author": "u1",
+            "timestamp": datetime(2025, 1, 1), "data": {"order_id": "ord_1"}}
+    litigation = {"seq": 2, "id": "evt_lit", "type": "log_acionado_institucionalmente", "author": "u2",
+                  "timestamp": datetime(2025, 1, 3),
+                  "data": {"target_log_id": "evt_sale", "acionamento_type": "contestar_fato",
+                           "motivo_detalhado": "Entrega nunca confirmada pelo cliente"}}
+    logs = FakeCollection()
+    for doc in (sale, litigation):
+        await resolve_aggregate_keys(logs, [doc])
+        logs.docs.append(doc)
+    assert litigation["aggregate_key"] == "order:ord_1"
+
+    snapshot = {"_id": "orders:1", "collection": CS_ORDERS_COLLECTION, "status": "complete", "seq": 1, "created_at": datetime(2025, 1, 2)}
+    order = {"_id": {"snapshot_id": "orders:1", "doc_id": "ord_1"}, "state": {"_id": "ord_1", "status": "pago", APPLIED_SEQ_FIELD: 1}}
+    db = {"logs": logs, "state_snapshots": FakeCollection([snapshot]), "state_snapshot_docs": FakeCollection([order])}
+
+    before = await load_state_as_of(db, CS_ORDERS_COLLECTION, "ord_1", datetime(2025, 1, 2, 12))
+    after = await load_state_as_of(db, CS_ORDERS_COLLECTION, "ord_1", datetime(2025, 1, 4))
+
+    assert "litigios_institucionais" not in before
+    assert [entry["log_acionamento_event_id"] for entry in after["litigios_institucionais"]] == ["evt_lit"]
+    assert after["meta"]["has_active_litigio"] is True
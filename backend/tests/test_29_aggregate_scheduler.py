@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from app.services.aggregate_scheduler import AggregateScheduler
+
+
+@pytest.mark.asyncio
+async def test_jobs_of_one_aggregate_run_in_order_without_overlapping():
+    scheduler = AggregateScheduler(lanes=4)
+    running, order = [], []
+
+    def job(n):
+        async def run():
+            running.append(n)
+            assert len(running) == 1
+            await asyncio.sleep(0.001 * (5 - n))
+            running.remove(n)
+            order.append(n)
+            return n
+        return run
+
+    results = await asyncio.gather(*(scheduler.submit("order:o1", job(n)) for n in range(5)))
+    assert results == [0, 1, 2, 3, 4]
+    assert order == [0, 1, 2, 3, 4]
+    await scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_different_lanes_run_in_parallel():
+    scheduler = AggregateScheduler(lanes=8)
+    keys = []
+    for n in range(100):
+        key = f"order:o{n}"
+        if scheduler.lane_of(key) not in {scheduler.lane_of(k) for k in keys}:
+            keys.append(key)
+        if len(keys) == 2:
+            break
+    both_started = asyncio.Event()
+    started = []
+
+    async def job():
+        started.append(1)
+        if len(started) == 2:
+            both_started.set()
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+
+    await asyncio.gather(*(scheduler.submit(key, job) for key in keys))
+    await scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_failure_is_returned_to_its_caller_and_lane_keeps_going():
+    scheduler = AggregateScheduler(lanes=1)
+
+    async def boom():
+        raise ValueError("bad event")
+
+    async def ok():
+        return "ok"
+
+    first, second = await asyncio.gather(scheduler.submit("a", boom), scheduler.submit("a", ok), return_exceptions=True)
+    assert isinstance(first, ValueError) and second == "ok"
+    assert scheduler.queue_depths() == [0]
+    await scheduler.close()
+    with pytest.raises(RuntimeError):
+        await scheduler.submit("a", ok)
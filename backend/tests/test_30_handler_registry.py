@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+from app.services.handler_registry import RATE_WINDOW_SECONDS, STATE_HANDLER_RATE, HandlerRegistry, HandlerSpec, HandlerStats
+
+
+class StockData(BaseModel):
+    product_id: str
+    delta: int
+
+
+class Service:
+    def __init__(self):
+        self.applied = []
+
+    async def handle_stock(self, event, result, data):
+        self.applied.append((event.id, data.delta))
+
+    async def handle_broken(self, event, result, data):
+        raise RuntimeError("handler bug")
+
+
+def event(event_type, data, event_id="evt_1"):
+    return SimpleNamespace(id=event_id, type=event_type, data=data)
+
+
+def registry():
+    reg = HandlerRegistry()
+    reg.register(HandlerSpec("stock_moved", Service.handle_stock, data_model=StockData, target_collection="inventory"))
+    reg.register(HandlerSpec("broken", Service.handle_broken))
+    return reg
+
+
+@pytest.mark.asyncio
+async def test_dispatch_validates_data_once_and_calls_the_handler():
+    reg, service = registry(), Service()
+    assert await reg.dispatch(service, event("stock_moved", {"product_id": "p1", "delta": -2}), None) is True
+    assert service.applied == [("evt_1", -2)]
+    assert await reg.dispatch(service, event("unknown", {}), None) is False
+    assert reg.get("stock_moved").target_collection == "inventory"
+
+
+def test_registering_a_type_twice_is_rejected():
+    reg = registry()
+    with pytest.raises(ValueError):
+        reg.register(HandlerSpec("broken", Service.handle_broken))
+
+
+@pytest.mark.asyncio
+async def test_errors_and_malformed_data_are_counted_and_raised():
+    reg, service = registry(), Service()
+    with pytest.raises(RuntimeError):
+        await reg.dispatch(service, event("broken", {}), None)
+    with pytest.raises(Exception):
+        await reg.dispatch(service, event("stock_moved", {"product_id": "p1"}), None)
+    await reg.dispatch(service, event("stock_moved", {"product_id": "p1", "delta": 1}), None)
+
+    stats = {s["event_type"]: s for s in reg.slowest()}
+    assert stats["broken"]["errors"] == 1 and stats["broken"]["calls"] == 1
+    assert stats["stock_moved"]["errors"] == 1 and stats["stock_moved"]["calls"] == 2
+    assert len(reg.slowest(limit=1)) == 1
+
+
+def test_rate_is_computed_on_read_and_decays_when_events_stop(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.services.handler_registry.time.monotonic", lambda: now[0])
+    stats = HandlerStats("rate_probe")
+    for _ in range(20):
+        stats.observe(0.001, failed=False)
+    now[0] += 1
+    for _ in range(10):
+        stats.observe(0.001, failed=False)
+
+    assert stats.events_per_second() == 30 / RATE_WINDOW_SECONDS
+    gauge = {sample.labels["event_type"]: sample.value for metric in STATE_HANDLER_RATE.collect() for sample in metric.samples}
+    assert gauge["rate_probe"] == 30 / RATE_WINDOW_SECONDS
+    now[0] += RATE_WINDOW_SECONDS - 1
+    assert stats.events_per_second() == 10 / RATE_WINDOW_SECONDS
+    now[0] += 1
+    assert stats.summary()["events_per_second"] == 0.0
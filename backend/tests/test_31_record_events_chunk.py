@@ -0,0 +1,225 @@
+import asyncio
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from loguru import logger
+from pymongo.errors import BulkWriteError
+
+import app.services.log_service as log_service_module
+from app.api.ingest import _record_chunk
+from app.services.aggregate_scheduler import AggregateScheduler
+from app.services.log_service import BULK_IDEMPOTENCY_KEY_ERROR, LogService, broadcast_frames
+
+
+class FakeLogs:
+    """`logs` collection whose ordered insert_many fails on the documents with a duplicate id."""
+
+    def __init__(self, duplicate_ids=()):
+        self.duplicate_ids = set(duplicate_ids)
+        self.calls = []
+        self.docs = []
+
+    async def insert_many(self, documents, ordered=True):
+        self.calls.append([doc["id"] for doc in documents])
+        for index, doc in enumerate(documents):
+            if doc["id"] in self.duplicate_ids:
+                raise BulkWriteError({"writeErrors": [{"index": index, "errmsg": f"E11000 duplicate key: {doc['id']}"}]})
+            self.docs.append(doc)
+
+
+class FakeAllocator:
+    def __init__(self):
+        self.value = 0
+
+    async def assign(self, documents):
+        for doc in documents:
+            self.value += 1
+            doc["seq"] = self.value
+
+    async def wait_for_fence(self, seq, **kwargs):
+        return None
+
+
+class Draft(SimpleNamespace):
+    def model_dump(self, mode=None):
+        return {"id": self.id, "seq": self.seq, "data": self.data}
+
+    def model_copy(self, deep=False):
+        return Draft(**vars(self))
+
+
+def draft(event_id, aggregate="o1", size=0, meta=None):
+    return Draft(id=event_id, timestamp="2025-01-01T00:00:00Z", seq=None, meta=meta, data={"order_id": aggregate, "note": "x" * size})
+
+
+class SchedulingUpdater:
+    """State updater running its updates on a real AggregateScheduler, slower for earlier events."""
+
+    def __init__(self, failing_ids=()):
+        self.scheduler = AggregateScheduler(lanes=8)
+        self.failing_ids = set(failing_ids)
+        self.applied = []
+
+    async def update_state_ordered(self, event, aggregate_key=None):
+        async def job():
+            await asyncio.sleep(0.001 * (10 - int(event.id.split("_")[1])))
+            if event.id in self.failing_ids:
+                raise RuntimeError("handler exploded")
+            self.applied.append((aggregate_key, event.id))
+            return SimpleNamespace(suggested_consequence_events=[{"for": event.id}])
+        return await self.scheduler.submit(aggregate_key, job)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    broadcasts = []
+
+    async def broadcast(message):
+        broadcasts.append(message)
+
+    async def to_log_documents(self, event_drafts):
+        return [{"id": d.id, "aggregate_key": f"order:{d.data['order_id']}"} for d in event_drafts]
+
+    async def after_logs_written(db, documents):
+        return None
+
+    monkeypatch.setattr(log_service_module, "logger", logger)
+    monkeypatch.setattr(log_service_module, "get_sequence_allocator", lambda db: allocator)
+    monkeypatch.setattr(log_service_module, "_after_logs_written", after_logs_written)
+    monkeypatch.setattr(log_service_module.ws_manager, "broadcast", broadcast)
+    monkeypatch.setattr(LogService, "_to_log_documents", to_log_documents)
+    allocator = FakeAllocator()
+
+    def build(logs, updater):
+        svc = LogService({"logs": logs}, updater)
+        scheduled = []
+        svc._schedule_consequence_events = lambda event, outcome, tasks, log: scheduled.append(event.id)
+        return svc, scheduled, broadcasts
+    return build
+
+
+def test_broadcast_frames_cap_events_and_bytes():
+    events = [{"id": f"e{n}", "pad": "x" * 10} for n in range(5)]
+    assert [len(frame) for frame in broadcast_frames(events, max_events=2, max_bytes=10_000)] == [2, 2, 1]
+
+    size = len(orjson.dumps(events[0]))
+    assert [len(frame) for frame in broadcast_frames(events, max_events=100, max_bytes=size * 3)] == [3, 2]
+
+    big = {"id": "big", "pad": "x" * 500}
+    frames = broadcast_frames([events[0], big, events[1]], max_events=100, max_bytes=100)
+    assert frames == [[events[0]], [big], [events[1]]]
+
+
+@pytest.mark.asyncio
+async def test_partial_bulk_write_error_resubmits_the_untried_tail(service):
+    logs = FakeLogs(duplicate_ids={"evt_1", "evt_3"})
+    svc, _, _ = service(logs, SchedulingUpdater())
+    documents = [{"id": f"evt_{n}"} for n in range(5)]
+
+    errors = await svc._insert_log_documents_ordered(documents)
+
+    assert errors[0] is None and errors[2] is None and errors[4] is None
+    assert "evt_1" in errors[1] and "evt_3" in errors[3]
+    assert logs.calls == [["evt_0", "evt_1", "evt_2", "evt_3", "evt_4"], ["evt_2", "evt_3", "evt_4"], ["evt_4"]]
+    assert [doc["id"] for doc in logs.docs] == ["evt_0", "evt_2", "evt_4"]
+
+
+@pytest.mark.asyncio
+async def test_state_updates_keep_per_aggregate_order_and_report_per_event(service):
+    updater = SchedulingUpdater(failing_ids={"evt_4"})
+    svc, scheduled, broadcasts = service(FakeLogs(duplicate_ids={"evt_2"}), updater)
+    drafts = [draft("evt_0", "o1"), draft("evt_1", "o2"), draft("evt_2", "o1"),
+              draft("evt_3", "o1"), draft("evt_4", "o2"), draft("evt_5", "o2")]
+
+    errors = await svc.record_events_chunk(drafts, background_tasks=None)
+
+    assert errors[0] is None and errors[1] is None and errors[3] is None and errors[5] is None
+    assert "duplicate key" in errors[2]
+    assert errors[4] == "State update failed: handler exploded"
+    assert [event_id for key, event_id in updater.applied if key == "order:o1"] == ["evt_0", "evt_3"]
+    assert [event_id for key, event_id in updater.applied if key == "order:o2"] == ["evt_1", "evt_5"]
+    assert scheduled == ["evt_0", "evt_1", "evt_3", "evt_5"]
+    # Events that failed to persist are not announced; state-update failures are (they are in `logs`).
+    assert [e["id"] for m in broadcasts for e in m["payload"]["events"]] == ["evt_0", "evt_1", "evt_3", "evt_4", "evt_5"]
+    await updater.scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_chunk_is_announced_in_capped_frames(service, monkeypatch):
+    monkeypatch.setattr(log_service_module.settings, "INGEST_BROADCAST_MAX_EVENTS", 2, raising=False)
+    monkeypatch.setattr(log_service_module.settings, "INGEST_BROADCAST_MAX_BYTES", 10_000, raising=False)
+    updater = SchedulingUpdater()
+    svc, _, broadcasts = service(FakeLogs(), updater)
+
+    await svc.record_events_chunk([draft(f"evt_{n}", f"o{n}") for n in range(5)], background_tasks=None)
+
+    assert [m["type"] for m in broadcasts] == ["new_log_events_batch_v2"] * 3
+    assert [m["payload"]["count"] for m in broadcasts] == [2, 2, 1]
+    assert [e["id"] for m in broadcasts for e in m["payload"]["events"]] == [f"evt_{n}" for n in range(5)]
+    await updater.scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_ingest_reports_each_line_with_its_own_outcome(service):
+    updater = SchedulingUpdater(failing_ids={"evt_3"})
+    svc, _, _ = service(FakeLogs(duplicate_ids={"evt_1"}), updater)
+    chunk = [(line_no, draft(f"evt_{n}", "o1")) for n, line_no in enumerate((2, 3, 5, 6))]
+
+    created, lines = await _record_chunk(svc, chunk, background_tasks=None)
+
+    results = [orjson.loads(line) for line in lines]
+    assert created == 2
+    assert [(r["line"], r["status"], r["id"]) for r in results] == [
+        (2, "created", "evt_0"), (3, "failed", "evt_1"), (5, "created", "evt_2"), (6, "failed", "evt_3"),
+    ]
+    assert "duplicate key" in results[1]["error"]
+    assert results[3]["error"] == "State update failed: handler exploded"
+    await updater.scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_drafts_with_an_idempotency_key_are_rejected_and_the_rest_written(service):
+    updater = SchedulingUpdater()
+    logs = FakeLogs()
+    svc, _, _ = service(logs, updater)
+    drafts = [draft("evt_0"), draft("evt_1", meta={"idempotency_key": "k1"}), draft("evt_2")]
+
+    errors = await svc.record_events_chunk(drafts, background_tasks=None)
+
+    assert errors == [None, BULK_IDEMPOTENCY_KEY_ERROR, None]
+    assert [doc["id"] for doc in logs.docs] == ["evt_0", "evt_2"]
+    assert [event_id for _, event_id in updater.applied] == ["evt_0", "evt_2"]
+    await updater.scheduler.close()
+
+
+class FakeIdempotencyStore:
+    def __init__(self):
+        self.completed = []
+        self.released = []
+
+    async def complete(self, key, fingerprint, log_event_id, result):
+        self.completed.append((key, log_event_id))
+
+    async def release(self, key):
+        self.released.append(key)
+
+
+class FindOneLogs:
+    def __init__(self, ids):
+        self.ids = set(ids)
+
+    async def find_one(self, query, projection=None):
+        return {"_id": 1} if query["id"] in self.ids else None
+
+
+@pytest.mark.asyncio
+async def test_failed_keyed_recording_completes_the_key_once_the_log_is_persisted(service):
+    store = FakeIdempotencyStore()
+    persisted, _, _ = service(FindOneLogs({"evt_1"}), SchedulingUpdater())
+    await persisted._settle_failed_claim(store, "user|k1", "fp", draft("evt_1"), logger)
+    assert store.completed == [("user|k1", "evt_1")] and store.released == []
+
+    not_persisted, _, _ = service(FindOneLogs(()), SchedulingUpdater())
+    await not_persisted._settle_failed_claim(store, "user|k2", "fp", draft("evt_2"), logger)
+    assert store.completed == [("user|k1", "evt_1")] and store.released == ["user|k2"]
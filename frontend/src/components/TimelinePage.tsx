@@ -23,9 +23,9 @@ const TimelinePage: React.FC = () => {
     setError(null);
     try {
       const currentSkip = page * limit;
-      const response = await apiClient.get<TimelineQueryResponse>(`/timeline?limit=${limit}&skip=${currentSkip}&sortOrder=desc`);
+      const response = await apiClient.get<TimelineQueryResponse>(`/timeline?limit=${limit}&skip=${currentSkip}&sortOrder=desc&count_mode=estimated`);
       setEvents(response.data.events);
-      setTotalCount(response.data.total_count);
+      setTotalCount(response.data.total_count ?? 0);
       setCurrentPage(page);
     } catch (err: any) {
       setError(err.message || 'Failed to fetch timeline');
@@ -8,7 +8,7 @@ const TimelinePage: React.FC = () => {
   const [events, setEvents] = useState<LogEvent[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
-  const [totalCount, setTotalCount] = useState(0);
+  const [hasMore, setHasMore] = useState(false);
   const [skip, setSkip] = useState(0);
   const limit = 20;
   const { logEvents: wsLogEvents } = useWebSocket();
@@ -17,9 +17,9 @@ const TimelinePage: React.FC = () => {
     try {
       setLoading(true);
       setError(null);
-      const response = await apiClient.get<TimelineQueryResponse>(`/timeline?limit=${limit}&skip=${currentSkip}`);
+      const response = await apiClient.get<TimelineQueryResponse>(`/timeline?limit=${limit}&skip=${currentSkip}&count_mode=none`);
       setEvents(currentSkip === 0 ? response.data.events : prev => [...prev, ...response.data.events]);
-      setTotalCount(response.data.total_count);
+      setHasMore(response.data.has_more ?? false);
     } catch (err: any) {
       setError(err.message || 'Failed to fetch timeline');
     } finally {
@@ -43,7 +43,7 @@ const TimelinePage: React.FC = () => {
 
   const handleLoadMore = () => {
     const newSkip = skip + limit;
-    if (newSkip < totalCount) {
+    if (hasMore) {
       setSkip(newSkip);
       fetchTimeline(newSkip);
     }
@@ -58,9 +58,9 @@ const TimelinePage: React.FC = () => {
       {events.map(event => (
         <LogEventCard key={event.id} event={event} />
       ))}
-      {events.length < totalCount && !loading && (
+      {hasMore && !loading && (
         <button onClick={handleLoadMore} style={{ marginTop: '1rem', padding: '0.5rem 1rem' }}>
-          Load More ({events.length}/{totalCount})
+          Load More ({events.length})
         </button>
       )}
       {loading && skip > 0 && <p>Loading more events...</p>}
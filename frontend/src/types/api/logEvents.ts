@@ -17,7 +17,10 @@ export interface LogEvent {
 
 export interface TimelineQueryResponse {
   events: LogEvent[];
-  total_count: number;
+  total_count: number | null;
+  count_mode?: 'exact' | 'estimated' | 'none';
+  has_more?: boolean;
   limit: number;
   skip: number;
+  next_cursor?: string | null;
 }
@@ -23,9 +23,12 @@ export const logEventSchema = z.object({
 // Timeline query response schema
 export const timelineQueryResponseSchema = z.object({
   events: z.array(logEventSchema),
-  total_count: z.number().int().nonnegative(),
+  total_count: z.number().int().nonnegative().nullable(),
+  count_mode: z.enum(['exact', 'estimated', 'none']).optional(),
+  has_more: z.boolean().optional(),
   limit: z.number().int().positive(),
   skip: z.number().int().nonnegative(),
+  next_cursor: z.string().nullable().optional(),
 });
 
 // Type inference from schemas
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# scripts/backfill_aggregate_keys.py
+
+"""
+Preenche `aggregate_key` (usado pelas consultas de current-state com `as_of`)
+nos logs gravados antes do campo existir, e re-chaveia os acionamentos
+(`data.target_log_id`) com o agregado do log acionado, como são gravados hoje.
+Pode ser interrompido e reexecutado: só grava chaves que mudaram.
+
+Uso:
+    python scripts/backfill_aggregate_keys.py [--batch-size 1000]
+"""
+
+import argparse
+import asyncio
+from loguru import logger
+
+from app.core.db import mongo_connector
+from app.services.state_history import backfill_aggregate_keys
+
+
+async def run(batch_size: int) -> None:
+    db = await mongo_connector.get_database()
+    updated = await backfill_aggregate_keys(db, batch_size=batch_size)
+    logger.success(f"✅ aggregate_key preenchido em {updated} eventos")
+    await mongo_connector.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preenche aggregate_key nos logs antigos.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    logger.info("▶️ Iniciando backfill de aggregate_key...")
+    asyncio.run(run(batch_size=args.batch_size))
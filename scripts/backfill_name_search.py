@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# scripts/backfill_name_search.py
+
+"""
+Preenche os campos de busca indexada (`<campo>_normalized` e `<campo>_trigrams`)
+em current_state_inventory (name) e current_state_orders (order_ref) gravados
+antes deles existirem. Pode ser interrompido e reexecutado: só processa
+documentos que ainda não têm os campos. Documentos sem os campos não aparecem
+nas buscas 'contains'/'prefix'; só depois do backfill mude NAME_SEARCH_MATCH_MODE
+para 'contains'.
+
+Uso:
+    python scripts/backfill_name_search.py [--batch-size 1000]
+"""
+
+import argparse
+import asyncio
+from loguru import logger
+
+from app.core.db import mongo_connector
+from app.services.name_search import backfill_name_search_fields
+from app.services.state_updater import NAME_SEARCH_FIELDS
+
+
+async def run(batch_size: int) -> None:
+    db = await mongo_connector.get_database()
+    for collection_name, field in NAME_SEARCH_FIELDS.items():
+        updated = await backfill_name_search_fields(db, collection_name, field, batch_size=batch_size)
+        logger.success(f"✅ {collection_name}.{field}: campos de busca preenchidos em {updated} documentos")
+    await mongo_connector.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preenche os campos de busca por nome/order_ref.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    logger.info("▶️ Iniciando backfill dos campos de busca por nome...")
+    asyncio.run(run(batch_size=args.batch_size))
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# scripts/backfill_rollups.py
+
+"""
+Recalcula os rollups do /timeline/stats (coleção log_rollups) a partir de `logs`,
+no servidor ($dateTrunc + $merge, MongoDB 5.0+). Use intervalos alinhados a dias
+inteiros e fora da janela de escrita ao vivo.
+
+Uso:
+    python scripts/backfill_rollups.py [--start 2024-01-01] [--end 2024-07-01]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+from loguru import logger
+
+from app.core.db import mongo_connector
+from app.services.rollups import backfill_rollups
+
+
+async def run(start: datetime = None, end: datetime = None) -> None:
+    db = await mongo_connector.get_database()
+    await backfill_rollups(db, start=start, end=end)
+    logger.success("✅ Rollups recalculados")
+    await mongo_connector.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recalcula os rollups do /timeline/stats.")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="início (UTC, inclusivo), ex.: 2024-01-01")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="fim (UTC, exclusivo), ex.: 2024-07-01")
+    args = parser.parse_args()
+    logger.info("▶️ Iniciando backfill de rollups...")
+    asyncio.run(run(start=args.start, end=args.end))
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# scripts/backfill_search_tokens.py
+
+"""
+Preenche `search_tokens` (índice do /timeline/search) nos logs gravados antes
+da indexação por tokens existir. Pode ser interrompido e reexecutado: só
+processa documentos que ainda não têm o campo.
+
+Uso:
+    python scripts/backfill_search_tokens.py [--batch-size 1000] [--limit N]
+"""
+
+import argparse
+import asyncio
+from loguru import logger
+
+from app.core.db import mongo_connector
+from app.services.search_tokens import backfill_search_tokens
+
+
+async def run(batch_size: int, limit: int = None) -> None:
+    db = await mongo_connector.get_database()
+    updated = await backfill_search_tokens(db, batch_size=batch_size, limit=limit)
+    logger.success(f"✅ search_tokens preenchido em {updated} eventos")
+    await mongo_connector.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preenche search_tokens nos logs antigos.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=None, help="máximo de eventos nesta execução")
+    args = parser.parse_args()
+    logger.info("▶️ Iniciando backfill de search_tokens...")
+    asyncio.run(run(batch_size=args.batch_size, limit=args.limit))
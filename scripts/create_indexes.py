@@ -2,29 +2,46 @@
 # scripts/create_indexes.py
 
 """
-Cria índices no MongoDB para otimização e TTL:
- - users.email: índice único
- - log_events.timestamp: expira após 30 dias
+Reconcilia os índices do MongoDB com o registro declarativo em
+app/core/indexes.py (INDEX_REGISTRY):
+ - cria em background os índices que faltam
+ - reporta índices cuja definição mudou (recriados só com --drop-mismatched)
+ - reporta índices fora do registro (nunca removidos)
+
+Uso:
+    python scripts/create_indexes.py [--dry-run] [--drop-mismatched]
 """
 
+import argparse
 import asyncio
 from loguru import logger
 
 from app.core.db import mongo_connector
+from app.core.indexes import ensure_indexes
 
 
-async def create_indexes() -> None:
+async def create_indexes(drop_mismatched: bool = False, dry_run: bool = False) -> None:
     db = await mongo_connector.get_database()
+    report = await ensure_indexes(db, drop_mismatched=drop_mismatched, dry_run=dry_run)
 
-    logger.info("🔍 Criando índice único em users.email")
-    await db.users.create_index("email", unique=True)
+    for label, names in (
+        ("criados" if not dry_run else "a criar", report.created),
+        ("recriados" if not dry_run else "a recriar", report.rebuilt),
+        ("divergentes", report.mismatched),
+        ("fora do registro", report.unmanaged),
+        ("em dia", report.up_to_date),
+    ):
+        if names:
+            logger.info(f"🔍 {label}: {', '.join(names)}")
 
-    logger.info("🔍 Criando TTL index em log_events.timestamp (30 dias)")
-    await db.log_events.create_index("timestamp", expireAfterSeconds=30 * 24 * 3600)
-
-    logger.success("✅ Índices criados com sucesso")
+    logger.success("✅ Reconciliação de índices concluída")
+    await mongo_connector.close()
 
 
 if __name__ == "__main__":
-    logger.info("▶️ Iniciando criação de índices...")
-    asyncio.run(create_indexes())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Reconcilia os índices do MongoDB com o registro.")
+    parser.add_argument("--dry-run", action="store_true", help="apenas reporta, não altera nada")
+    parser.add_argument("--drop-mismatched", action="store_true", help="recria índices cuja definição mudou")
+    args = parser.parse_args()
+    logger.info("▶️ Iniciando reconciliação de índices...")
+    asyncio.run(create_indexes(drop_mismatched=args.drop_mismatched, dry_run=args.dry_run))
@@ -59,6 +59,32 @@ def send_log_event(
     except Exception as e:
         logger.error(f"An error occurred: {e}")
 
+@app_cli.command("bulk-ingest")
+def bulk_ingest_ndjson(
+    ndjson_file: Annotated[Path, typer.Argument(exists=True, readable=True, help="NDJSON file, one LogEvent draft per line")],
+    chunk_size: Annotated[int, typer.Option()] = 500,
+):
+    api_url = f"http://localhost:{settings.API_PORT_FOR_TESTS or 8001}{settings.API_V1_STR}/ingest/logs"
+    admin_token = get_admin_token_for_cli()
+    headers = {"Authorization": f"Bearer {admin_token}", "Content-Type": "application/x-ndjson"}
+    counts = {}
+    try:
+        with ndjson_file.open("rb") as body, httpx.Client(timeout=None) as client:
+            with client.stream("POST", api_url, params={"chunk_size": chunk_size}, content=body, headers=headers) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    result = json.loads(line)
+                    counts[result["status"]] = counts.get(result["status"], 0) + 1
+                    if result["status"] != "created":
+                        logger.warning(f"Line {result['line']}: {result['status']} - {result.get('error')}")
+        logger.success(f"Bulk ingestion finished: {counts}")
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Bulk ingestion failed. Status: {e.response.status_code}")
+    except Exception as e:
+        logger.error(f"An error occurred: {e}")
+
 @app_cli.command("ws-listen")
 async def listen_to_websockets(
     token: Annotated[Optional[str], typer.Option(help="JWT access token. If not provided, uses default admin token.")] = None
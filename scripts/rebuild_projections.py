@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# scripts/rebuild_projections.py
+
+"""
+Reconstrói as coleções de current-state (current_state_inventory e
+current_state_orders) reaplicando `logs` em ordem de `seq` pelo
+StateUpdaterService, em coleções sombra (`<coleção>__rebuild`):
+ - replay particionado por agregado (produto, pedido) num pool de processos
+ - escritas em bulk, com checkpoint por partição (retomável com o mesmo --run-id)
+ - rodadas de catch-up para os eventos gravados durante o replay
+ - índices do registro criados nas sombras e troca atômica por renameCollection
+
+O tráfego ao vivo continua nas coleções atuais até a troca. A troca ergue uma
+barreira de escrita no contador de `seq`: eventos numerados depois dela esperam
+(ingestão continua, só a atualização de estado aguarda), os anteriores são
+reaplicados nas sombras antes do renameCollection. Nenhuma atualização ao vivo
+se perde na troca.
+
+Uso:
+    python scripts/rebuild_projections.py [--run-id ID] [--partitions 4] [--batch-size 1000] [--no-swap]
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from loguru import logger
+
+from app.core.db import mongo_connector
+from app.core.indexes import INDEX_REGISTRY
+from app.core.settings import settings
+from app.models import LogEvent
+from app.services.projection_rebuild import rebuild_projections, shadow_name
+from app.services.state_updater import CS_INVENTORY_COLLECTION, CS_ORDERS_COLLECTION, StateUpdaterService
+from app.utils.index_manager import reconcile_indexes
+
+COLLECTIONS = [CS_INVENTORY_COLLECTION, CS_ORDERS_COLLECTION]
+
+
+async def build_shadow_indexes(db) -> None:
+    registry = {shadow_name(name): INDEX_REGISTRY.get(name, []) for name in COLLECTIONS}
+    report = await reconcile_indexes(db, registry)
+    logger.info(f"🔍 Índices criados nas sombras: {report.created}")
+
+
+async def run(run_id: str, partitions: int, batch_size: int, swap: bool) -> None:
+    db = await mongo_connector.get_database()
+    result = await rebuild_projections(
+        db, settings.MONGO_URL, run_id, COLLECTIONS,
+        state_updater_factory=StateUpdaterService, event_factory=LogEvent,
+        partitions=partitions, batch_size=batch_size,
+        settle_seconds=settings.SEQUENCE_GAP_SETTLE_SECONDS,
+        prepare_shadows=build_shadow_indexes, swap=swap,
+    )
+    if result["swapped"]:
+        logger.success(f"✅ Rebuild {run_id}: {result['applied']} eventos reaplicados até seq {result['caught_up_to']}, coleções trocadas")
+    else:
+        logger.success(f"✅ Rebuild {run_id}: sombras prontas até seq {result['caught_up_to']}; rode de novo com --run-id {run_id} para trocar")
+    await mongo_connector.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstrói as coleções de current-state a partir de logs.")
+    parser.add_argument("--run-id", default=None, help="retoma (ou nomeia) uma execução; padrão: timestamp atual")
+    parser.add_argument("--partitions", type=int, default=4, help="processos de replay (partições por agregado)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--no-swap", action="store_true", help="só prepara as sombras, sem trocar as coleções")
+    args = parser.parse_args()
+    run_id = args.run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    logger.info(f"▶️ Iniciando rebuild das projeções (run {run_id})...")
+    asyncio.run(run(run_id, partitions=args.partitions, batch_size=args.batch_size, swap=not args.no_swap))